@@ -0,0 +1,818 @@
+# benchmark.py
+import os
+import sys
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import platform
+import random
+import shutil
+import struct
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# dll-check2.py is not an importable module name
+_spec = importlib.util.spec_from_file_location("dll_check2", os.path.join(script_dir, "dll-check2.py"))
+dc = importlib.util.module_from_spec(_spec)
+sys.modules["dll_check2"] = dc  # so its classes pickle (daemon replies, -j workers)
+_spec.loader.exec_module(dc)
+
+BENCH_FORMAT = 2
+
+DEFAULT_CORPUS = {'dlls': 20, 'types': 40, 'members': 12, 'depth': 6, 'seed': 1}
+
+HELP = """
+.NET DLL Inspector v{ver} -- Benchmark
+======================================================================
+Generates a deterministic corpus of synthetic assemblies, times every
+phase of a scan and the usual query mixes, and compares the result
+with a stored baseline.
+
+USAGE
+  python benchmark.py [options]
+
+OPTIONS
+  --corpus <dir>      Corpus directory (default: {log_dir}/bench/corpus)
+  --dlls <n>          Assemblies in the corpus (default: {dlls})
+  --types <n>         Public types per assembly (default: {types})
+  --members <n>       Members per type (default: {members})
+  --depth <n>         Longest base class chain inside one assembly (default: {depth})
+  --seed <n>          Corpus seed (default: {seed})
+  --backend <list>    Comma separated: meta, clr, index (default: all available)
+  --repeat <n>        Runs per measurement, the fastest one counts (default: 3)
+  --out <file>        Results file (default: {log_dir}/bench/<timestamp>.json)
+  --baseline <file>   Compare against a previous results file
+  --threshold <pct>   Slowdown that counts as a regression (default: 15)
+  --save-baseline <f> Also write the results to <f> for later runs
+
+Exit status is 1 when --baseline finds a regression.
+"""
+
+# ============================================================
+# ASSEMBLY WRITER
+# ============================================================
+
+# Tables whose rows must be sorted (ECMA-335 II.22), same mask the C# compiler emits
+SORTED_TABLES = 0x000016003301FA00
+
+FILE_ALIGNMENT = 0x200
+SECTION_RVA = 0x2000
+CLI_HEADER_SIZE = 72
+
+# Every method shares one tiny body ("ret"), placed right after the CLI header
+METHOD_BODY = bytes([(1 << 2) | 0x2, 0x2A])
+METHOD_RVA = SECTION_RVA + CLI_HEADER_SIZE
+
+
+def compress(n):
+    if n < 0x80:
+        return bytes([n])
+    if n < 0x4000:
+        return struct.pack('>H', 0x8000 | n)
+    return struct.pack('>I', 0xC0000000 | n)
+
+
+def pad4(data):
+    return data + b'\0' * (-len(data) % 4)
+
+
+class MetadataBuilder:
+
+    def __init__(self):
+        self.strings = bytearray(b'\0')
+        self.blobs = bytearray(b'\0')
+        self.guids = bytearray()
+        self.tables = defaultdict(list)
+        self._strings = {'': 0}
+        self._blobs = {b'': 0}
+
+    def string(self, s):
+        idx = self._strings.get(s)
+        if idx is None:
+            idx = self._strings[s] = len(self.strings)
+            self.strings += s.encode('utf-8') + b'\0'
+        return idx
+
+    def blob(self, data):
+        data = bytes(data)
+        idx = self._blobs.get(data)
+        if idx is None:
+            idx = self._blobs[data] = len(self.blobs)
+            self.blobs += compress(len(data)) + data
+        return idx
+
+    def guid(self, data):
+        self.guids += data
+        return len(self.guids) // 16
+
+    def add(self, table, *row):
+        self.tables[table].append(row)
+        return len(self.tables[table])
+
+    def row_count(self, table):
+        return len(self.tables[table])
+
+    @staticmethod
+    def coded(kind, table, row):
+        bits, tables = dc.CODED_INDEXES[kind]
+        return row << bits | tables.index(table)
+
+    def _table_stream(self):
+        for table, key in ((dc.TBL_INTERFACEIMPL, lambda r: (r[0], r[1])),
+                           (dc.TBL_METHODSEMANTICS, lambda r: r[2]),
+                           (dc.TBL_GENERICPARAM, lambda r: (r[2], r[0])),
+                           (dc.TBL_CUSTOMATTRIBUTE, lambda r: r[0])):
+            self.tables[table].sort(key=key)
+
+        counts = [len(self.tables.get(t, ())) for t in range(64)]
+        heap_sizes = ((0x01 if len(self.strings) >= 0x10000 else 0)
+                      | (0x02 if len(self.guids) // 16 >= 0x10000 else 0)
+                      | (0x04 if len(self.blobs) >= 0x10000 else 0))
+        widths = {
+            'S': 4 if heap_sizes & 0x01 else 2,
+            'G': 4 if heap_sizes & 0x02 else 2,
+            'B': 4 if heap_sizes & 0x04 else 2,
+        }
+        for name, (bits, tables) in dc.CODED_INDEXES.items():
+            largest = max(counts[t] for t in tables if t is not None)
+            widths['C:' + name] = 2 if largest < (1 << (16 - bits)) else 4
+
+        valid = sum(1 << t for t in range(64) if counts[t])
+        out = bytearray(struct.pack('<IBBBBQQ', 0, 2, 0, heap_sizes, 1, valid, SORTED_TABLES))
+        out += b''.join(struct.pack('<I', counts[t]) for t in range(64) if counts[t])
+        for table in range(64):
+            if not counts[table]:
+                continue
+            fmt = '<'
+            for kind in dc.TABLE_SCHEMAS[table]:
+                if kind in ('1', '2', '4'):
+                    w = int(kind)
+                elif kind.startswith('T:'):
+                    w = 2 if counts[int(kind[2:], 16)] < 0x10000 else 4
+                else:
+                    w = widths[kind]
+                fmt += {1: 'B', 2: 'H', 4: 'I'}[w]
+            row = struct.Struct(fmt)
+            for values in self.tables[table]:
+                out += row.pack(*values)
+        return bytes(out)
+
+    def build(self):
+        version = b'v4.0.30319\0\0'
+        streams = [('#~', self._table_stream()), ('#Strings', bytes(self.strings)),
+                   ('#US', b'\0'), ('#GUID', bytes(self.guids)), ('#Blob', bytes(self.blobs))]
+        streams = [(name, pad4(data)) for name, data in streams]
+        headers_size = 16 + len(version) + 4 + sum(8 + len(pad4(name.encode('ascii') + b'\0'))
+                                                  for name, _ in streams)
+        out = bytearray(struct.pack('<IHHII', 0x424A5342, 1, 1, 0, len(version)) + version)
+        out += struct.pack('<HH', 0, len(streams))
+        offset = headers_size
+        for name, data in streams:
+            out += struct.pack('<II', offset, len(data)) + pad4(name.encode('ascii') + b'\0')
+            offset += len(data)
+        for _, data in streams:
+            out += data
+        return bytes(out)
+
+
+def write_pe(path, metadata, timestamp):
+    # Minimal IL-only PE32 image: headers + one .text section holding the
+    # CLI header, the shared method body and the metadata
+    md_rva = SECTION_RVA + len(pad4(bytes(CLI_HEADER_SIZE) + METHOD_BODY))
+    cli = struct.pack('<IHH' + 'I' * 16, CLI_HEADER_SIZE, 2, 5, md_rva, len(metadata), 1, *([0] * 13))
+    text = pad4(cli + METHOD_BODY) + metadata
+    raw_size = len(text) + (-len(text) % FILE_ALIGNMENT)
+    image_size = SECTION_RVA + len(text) + (-len(text) % SECTION_RVA)
+
+    dos = bytearray(0x80)
+    dos[0:2] = b'MZ'
+    struct.pack_into('<I', dos, 0x3C, 0x80)
+    coff = struct.pack('<HHIIIHH', 0x14C, 1, timestamp, 0, 0, 224, 0x2022)
+    optional = struct.pack('<HBB' + 'I' * 9 + 'H' * 6 + 'I' * 4 + 'HH' + 'I' * 6,
+                           0x10B, 8, 0, raw_size, 0, 0, 0, SECTION_RVA, 0, 0x10000000,
+                           SECTION_RVA, FILE_ALIGNMENT, 4, 0, 0, 0, 4, 0,
+                           0, image_size, FILE_ALIGNMENT, 0, 3, 0x8540,
+                           0x100000, 0x1000, 0x100000, 0x1000, 0, 16)
+    directories = bytearray(16 * 8)
+    struct.pack_into('<II', directories, 14 * 8, SECTION_RVA, CLI_HEADER_SIZE)
+    section = struct.pack('<8sIIIIIIHHI', b'.text', len(text), SECTION_RVA, raw_size,
+                          FILE_ALIGNMENT, 0, 0, 0, 0, 0x60000020)
+
+    headers = bytes(dos) + b'PE\0\0' + coff + optional + bytes(directories) + section
+    with open(path, 'wb') as f:
+        f.write(headers + b'\0' * (FILE_ALIGNMENT - len(headers)))
+        f.write(text + b'\0' * (raw_size - len(text)))
+
+
+# ============================================================
+# SYNTHETIC CORPUS
+# ============================================================
+
+ET_VOID, ET_BOOL, ET_I4, ET_I8, ET_R8, ET_STRING, ET_OBJECT = 0x01, 0x02, 0x08, 0x0A, 0x0D, 0x0E, 0x1C
+PRIMITIVES = (ET_BOOL, ET_I4, ET_I4, ET_I8, ET_R8, ET_STRING, ET_STRING, ET_OBJECT)
+
+VERBS = ("Get", "Set", "Find", "Update", "Create", "Remove", "Load", "Save", "Apply", "Compute")
+NOUNS = ("Item", "Value", "Name", "Count", "Block", "Grid", "Entity", "Power", "State", "Target")
+PARAM_NAMES = ("value", "count", "target", "name", "index", "source", "options")
+
+ENCODED_TAGS = {dc.TBL_TYPEDEF: 0, dc.TBL_TYPEREF: 1, dc.TBL_TYPESPEC: 2}
+
+
+def encode_type(t):
+    # Synthetic type references: ('prim', et) ('class'|'value', table, row)
+    # ('inst', table, row, arg) ('var', n) ('mvar', n) ('array', t) ('byref', t)
+    kind = t[0]
+    if kind == 'prim':
+        return bytes([t[1]])
+    if kind in ('class', 'value'):
+        return bytes([0x12 if kind == 'class' else 0x11]) + compress(t[2] << 2 | ENCODED_TAGS[t[1]])
+    if kind == 'inst':
+        return b'\x15\x12' + compress(t[2] << 2 | ENCODED_TAGS[t[1]]) + b'\x01' + encode_type(t[3])
+    if kind in ('var', 'mvar'):
+        return bytes([0x13 if kind == 'var' else 0x1E]) + compress(t[1])
+    if kind == 'array':
+        return b'\x1D' + encode_type(t[1])
+    return b'\x10' + encode_type(t[1])
+
+
+class CorpusAssembly:
+
+    def __init__(self, index, spec, previous):
+        self.name = "Bench.Lib{i:02d}".format(i=index)
+        self.rng = random.Random(spec['seed'] * 100003 + index)
+        self.spec = spec
+        self.previous = previous
+        self.mb = MetadataBuilder()
+        self._typerefs = {}
+        self.classes = []
+        self.interfaces = []
+
+    def typeref(self, scope, namespace, name):
+        key = (scope, namespace, name)
+        row = self._typerefs.get(key)
+        if row is None:
+            row = self._typerefs[key] = self.mb.add(
+                dc.TBL_TYPEREF, self.mb.coded('ResolutionScope', dc.TBL_ASSEMBLYREF, scope),
+                self.mb.string(name), self.mb.string(namespace))
+        return row
+
+    def plan(self):
+        n = self.spec['types']
+        n_generic = max(1, n // 10)
+        n_interface = max(1, n // 10)
+        n_struct = n // 5
+        n_class = max(1, n - n_generic - n_interface - n_struct)
+        kinds = ['interface'] * n_interface + ['generic'] * n_generic + ['struct'] * n_struct + ['class'] * n_class
+        names = {'interface': "IMarker{k}", 'generic': "Box{k}`1", 'struct': "Data{k}", 'class': "Entity{k}"}
+        seen = defaultdict(int)
+        types = []
+        for row, kind in enumerate(kinds, start=2):
+            k = seen[kind]
+            seen[kind] += 1
+            types.append({'row': row, 'kind': kind, 'name': names[kind].format(k=k),
+                          'ns': "{a}.Ns{n}".format(a=self.name, n=k % 3)})
+        return types
+
+    def build(self, path, timestamp):
+        mb = self.mb
+        rng = self.rng
+        mb.add(dc.TBL_MODULE, 0, mb.string(self.name + ".dll"),
+               mb.guid(hashlib.md5("{n}:{s}".format(n=self.name, s=self.spec['seed']).encode('ascii')).digest()),
+               0, 0)
+        mb.add(dc.TBL_ASSEMBLY, 0x8004, 1, 0, 0, 0, 0, 0, mb.string(self.name), 0)
+        runtime = mb.add(dc.TBL_ASSEMBLYREF, 4, 0, 0, 0, 0, mb.blob(bytes.fromhex('b03f5f7f11d50a3a')),
+                         mb.string("System.Runtime"), 0, 0)
+        prev_scope = None
+        if self.previous is not None:
+            prev_scope = mb.add(dc.TBL_ASSEMBLYREF, 1, 0, 0, 0, 0, 0, mb.string(self.previous.name), 0, 0)
+        object_ref = ('class', dc.TBL_TYPEREF, self.typeref(runtime, "System", "Object"))
+        valuetype_ref = self.typeref(runtime, "System", "ValueType")
+
+        mb.add(dc.TBL_TYPEDEF, 0, mb.string("<Module>"), 0, 0, 1, 1)
+        types = self.plan()
+        generics = [t for t in types if t['kind'] == 'generic']
+        structs = [t for t in types if t['kind'] == 'struct']
+
+        pool = [('prim', et) for et in PRIMITIVES]
+        pool += [('class', dc.TBL_TYPEDEF, t['row']) for t in types if t['kind'] == 'class'][:8]
+        pool += [('value', dc.TBL_TYPEDEF, t['row']) for t in structs][:4]
+        pool += [('inst', dc.TBL_TYPEDEF, g['row'], ('prim', ET_I4)) for g in generics]
+        pool += [('array', ('prim', ET_STRING)), ('array', ('prim', ET_I4))]
+        if self.previous is not None:
+            for c in self.previous.classes[:4]:
+                pool.append(('class', dc.TBL_TYPEREF, self.typeref(prev_scope, c['ns'], c['name'])))
+
+        depth = self.spec['depth']
+        for t in types:
+            extends = 0
+            describe = None
+            if t['kind'] == 'struct':
+                extends = mb.coded('TypeDefOrRef', dc.TBL_TYPEREF, valuetype_ref)
+            elif t['kind'] == 'generic':
+                extends = mb.coded('TypeDefOrRef', dc.TBL_TYPEREF, object_ref[2])
+            elif t['kind'] == 'class':
+                extends, t['depth'], describe = self._base(t, generics, prev_scope, object_ref, depth)
+                self.classes.append(t)
+            else:
+                self.interfaces.append(t)
+
+            flags = {'interface': 0xA1, 'generic': 0x100001, 'struct': 0x100109, 'class': 0x100001}[t['kind']]
+            mb.add(dc.TBL_TYPEDEF, flags, mb.string(t['name']), mb.string(t['ns']), extends,
+                   mb.row_count(dc.TBL_FIELD) + 1, mb.row_count(dc.TBL_METHODDEF) + 1)
+
+            if t['kind'] == 'generic':
+                mb.add(dc.TBL_GENERICPARAM, 0, 0, mb.coded('TypeOrMethodDef', dc.TBL_TYPEDEF, t['row']),
+                       mb.string("T"))
+            if t['kind'] == 'class':
+                self._interfaces(t, prev_scope)
+            if t['kind'] != 'interface':
+                self._members(t, pool, describe)
+
+        self._attributes(types, runtime)
+        self.mb = None
+        write_pe(path, mb.build(), timestamp)
+
+    def _base(self, t, generics, prev_scope, object_ref, depth):
+        # Returns (Extends coded index, chain depth, 'new' or 'override' for Describe())
+        mb = self.mb
+        rng = self.rng
+        position = len(self.classes)
+        if position % depth:
+            parent = self.classes[-1]
+            return mb.coded('TypeDefOrRef', dc.TBL_TYPEDEF, parent['row']), parent['depth'] + 1, 'override'
+
+        roll = rng.random()
+        candidates = [c for c in self.previous.classes if c['depth'] < depth] if self.previous else []
+        if candidates and roll < 0.3:
+            parent = rng.choice(candidates)
+            row = self.typeref(prev_scope, parent['ns'], parent['name'])
+            return mb.coded('TypeDefOrRef', dc.TBL_TYPEREF, row), parent['depth'] + 1, 'override'
+        if roll < 0.5:
+            g = rng.choice(generics)
+            spec = mb.add(dc.TBL_TYPESPEC, mb.blob(encode_type(
+                ('inst', dc.TBL_TYPEDEF, g['row'], rng.choice((('prim', ET_I4), ('prim', ET_STRING)))))))
+            return mb.coded('TypeDefOrRef', dc.TBL_TYPESPEC, spec), 1, 'new'
+        return mb.coded('TypeDefOrRef', dc.TBL_TYPEREF, object_ref[2]), 0, 'new'
+
+    def _interfaces(self, t, prev_scope):
+        mb = self.mb
+        rng = self.rng
+        if rng.random() < 0.5:
+            iface = self.interfaces[len(self.classes) % len(self.interfaces)]
+            mb.add(dc.TBL_INTERFACEIMPL, t['row'], mb.coded('TypeDefOrRef', dc.TBL_TYPEDEF, iface['row']))
+        if self.previous is not None and rng.random() < 0.2:
+            iface = rng.choice(self.previous.interfaces)
+            row = self.typeref(prev_scope, iface['ns'], iface['name'])
+            mb.add(dc.TBL_INTERFACEIMPL, t['row'], mb.coded('TypeDefOrRef', dc.TBL_TYPEREF, row))
+
+    def _members(self, t, pool, describe):
+        mb = self.mb
+        rng = self.rng
+        generic = t['kind'] == 'generic'
+        struct_type = t['kind'] == 'struct'
+        if generic:
+            pool = pool + [('var', 0)] * 3
+        field_pool = [('prim', et) for et in PRIMITIVES] if struct_type else pool
+        used = set()
+        t['methods'] = []
+
+        def unique(name):
+            base, n = name, 2
+            while name in used:
+                name, n = "{b}{n}".format(b=base, n=n), n + 1
+            used.add(name)
+            return name
+
+        def method(name, flags, ret, params, generic_params=0):
+            flags |= 0x0086
+            sig = bytes([(0x10 if generic_params else 0) | (0 if flags & 0x0010 else 0x20)])
+            if generic_params:
+                sig += compress(generic_params)
+            sig += compress(len(params)) + encode_type(ret) + b''.join(encode_type(p) for p in params)
+            row = mb.add(dc.TBL_METHODDEF, METHOD_RVA, 0, flags, mb.string(name), mb.blob(sig),
+                         mb.row_count(dc.TBL_PARAM) + 1)
+            t['methods'].append((row, flags, params))
+            for seq, _ in enumerate(params, start=1):
+                mb.add(dc.TBL_PARAM, 0, seq, mb.string(PARAM_NAMES[(seq - 1) % len(PARAM_NAMES)]))
+            if generic_params:
+                mb.add(dc.TBL_GENERICPARAM, 0, 0, mb.coded('TypeOrMethodDef', dc.TBL_METHODDEF, row),
+                       mb.string("U"))
+            return row
+
+        kinds = [rng.choice('FMMMMP') for _ in range(self.spec['members'])]
+        if generic:
+            kinds = ['F', 'M', 'M', 'P'] + kinds[4:]
+
+        for i, kind in enumerate(k for k in kinds if k == 'F'):
+            static = rng.random() < 0.2
+            ftype = ('var', 0) if generic and i == 0 else rng.choice(field_pool)
+            mb.add(dc.TBL_FIELD, 0x0006 | (0x0010 if static else 0),
+                   mb.string(unique(rng.choice(NOUNS) + ("Value" if generic and i == 0 else ""))),
+                   mb.blob(b'\x06' + encode_type(ftype)))
+
+        if describe:
+            method("Describe", 0x0040 | (0x0100 if describe == 'new' else 0), ('prim', ET_STRING), [])
+
+        properties = []
+        for i, kind in enumerate(kinds):
+            if kind == 'M':
+                static = rng.random() < 0.2
+                if generic and i == 1:
+                    method("Get", 0, ('var', 0), [])
+                elif generic and i == 2:
+                    method("Set", 0, ('prim', ET_VOID), [('var', 0)])
+                elif not generic and rng.random() < 0.1:
+                    method(unique("Convert" + rng.choice(NOUNS)), 0x0010 if static else 0,
+                           ('mvar', 0), [('mvar', 0), rng.choice(pool)], generic_params=1)
+                else:
+                    params = [rng.choice(pool) for _ in range(rng.choice((0, 1, 1, 2, 2, 3)))]
+                    if params and rng.random() < 0.1:
+                        params[-1] = ('byref', params[-1])
+                    ret = ('prim', ET_VOID) if rng.random() < 0.4 else rng.choice(pool)
+                    method(unique(rng.choice(VERBS) + rng.choice(NOUNS)), 0x0010 if static else 0,
+                           ret, params)
+            elif kind == 'P':
+                static = rng.random() < 0.1
+                ptype = ('var', 0) if generic and i == 3 else rng.choice(pool)
+                name = unique("Current" if generic and i == 3 else rng.choice(NOUNS) + "Info")
+                getter = method("get_" + name, 0x0800 | (0x0010 if static else 0), ptype, [])
+                properties.append((name, static, ptype, getter))
+
+        if properties:
+            mb.add(dc.TBL_PROPERTYMAP, t['row'], mb.row_count(dc.TBL_PROPERTY) + 1)
+            for name, static, ptype, getter in properties:
+                row = mb.add(dc.TBL_PROPERTY, 0, mb.string(name),
+                             mb.blob(bytes([0x08 if static else 0x28, 0]) + encode_type(ptype)))
+                t.setdefault('properties', []).append((name, row))
+                mb.add(dc.TBL_METHODSEMANTICS, 0x0002, getter, mb.coded('HasSemantics', dc.TBL_PROPERTY, row))
+
+    def _attributes(self, types, runtime):
+        # Attributes from System.Runtime on some types and members, [Extension] on every static
+        # class method with parameters. No random draws: the rest of the corpus stays as it was.
+        mb = self.mb
+        ctors = {}
+
+        def typeref_code(namespace, name):
+            return compress(self.typeref(runtime, namespace, name) << 2 | ENCODED_TAGS[dc.TBL_TYPEREF])
+
+        def attribute(table, row, namespace, name, params, fixed, named=()):
+            # params: encoded constructor parameter types; fixed / named: encoded values
+            ctor = ctors.get((namespace, name))
+            if ctor is None:
+                parent = mb.coded('MemberRefParent', dc.TBL_TYPEREF, self.typeref(runtime, namespace, name))
+                sig = b'\x20' + compress(len(params)) + bytes([ET_VOID]) + b''.join(params)
+                ctor = ctors[(namespace, name)] = mb.add(dc.TBL_MEMBERREF, parent, mb.string(".ctor"), mb.blob(sig))
+            value = b'\x01\x00' + b''.join(fixed) + struct.pack('<H', len(named)) + b''.join(named)
+            mb.add(dc.TBL_CUSTOMATTRIBUTE, mb.coded('HasCustomAttribute', table, row),
+                   mb.coded('CustomAttributeType', dc.TBL_MEMBERREF, ctor), mb.blob(value))
+
+        def text(value):
+            if value is None:
+                return b'\xff'
+            data = value.encode('utf-8')
+            return compress(len(data)) + data
+
+        def enum(namespace, name):
+            return b'\x11' + typeref_code(namespace, name)
+
+        classes = [t for t in types if t['kind'] == 'class']
+        for i, t in enumerate(classes):
+            if i % 3 == 0:
+                # [Obsolete("Use Entity1", true)], [Obsolete(null, false)], ...
+                replacement = None if i % 6 == 3 else "Use " + classes[(i + 1) % len(classes)]['name']
+                attribute(dc.TBL_TYPEDEF, t['row'], "System", "ObsoleteAttribute",
+                          [bytes([ET_STRING]), bytes([ET_BOOL])], [text(replacement), bytes([i % 2 == 0])])
+            for row, flags, params in t['methods']:
+                if flags & 0x0010 and params:
+                    attribute(dc.TBL_METHODDEF, row, "System.Runtime.CompilerServices", "ExtensionAttribute", [], [])
+
+        for t in types:
+            if t['kind'] == 'interface':
+                # [EditorBrowsable(EditorBrowsableState.Never)]
+                attribute(dc.TBL_TYPEDEF, t['row'], "System.ComponentModel", "EditorBrowsableAttribute",
+                          [enum("System.ComponentModel", "EditorBrowsableState")], [struct.pack('<i', 1)])
+            elif t['kind'] == 'struct':
+                # [DebuggerDisplay("{Value}", Name = "Data0")]
+                attribute(dc.TBL_TYPEDEF, t['row'], "System.Diagnostics", "DebuggerDisplayAttribute",
+                          [bytes([ET_STRING])], [text("{Value}")],
+                          [b'\x54' + bytes([ET_STRING]) + text("Name") + text(t['name'])])
+            elif t['kind'] == 'generic':
+                # [DebuggerTypeProxy(typeof(Entity0))] on the type, [MemberNotNull(new[] {...})] on Get(),
+                # [DebuggerBrowsable(DebuggerBrowsableState.Never)] on Current
+                attribute(dc.TBL_TYPEDEF, t['row'], "System.Diagnostics", "DebuggerTypeProxyAttribute",
+                          [b'\x12' + typeref_code("System", "Type")],
+                          [text("{ns}.{n}, {a}".format(ns=classes[0]['ns'], n=classes[0]['name'], a=self.name))])
+                attribute(dc.TBL_METHODDEF, t['methods'][0][0], "System.Diagnostics.CodeAnalysis",
+                          "MemberNotNullAttribute", [b'\x1d' + bytes([ET_STRING])],
+                          [struct.pack('<I', 2) + text("Value") + text("Current")])
+                for name, row in t.get('properties', ()):
+                    if name == "Current":
+                        attribute(dc.TBL_PROPERTY, row, "System.Diagnostics", "DebuggerBrowsableAttribute",
+                                  [enum("System.Diagnostics", "DebuggerBrowsableState")], [struct.pack('<i', 0)])
+
+
+def corpus_spec(args):
+    spec = dict(DEFAULT_CORPUS)
+    for key in spec:
+        value = dc.get_arg_value(args, '--' + key)
+        if value is not None:
+            spec[key] = max(1, int(value))
+    return spec
+
+
+def generate_corpus(directory, spec):
+    # Rebuilt only when the parameters (or the writer) changed
+    manifest_path = os.path.join(directory, "corpus.json")
+    manifest = dict(spec, format=BENCH_FORMAT)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return False
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    previous = None
+    for i in range(spec['dlls']):
+        asm = CorpusAssembly(i, spec, previous)
+        asm.build(os.path.join(directory, asm.name + ".dll"), 0x5F000000 + i)
+        previous = asm
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return True
+
+
+# ============================================================
+# MEASUREMENTS
+# ============================================================
+
+# (name, inspect_dll keyword arguments) -- the query mixes of a typical session
+QUERY_MIXES = (
+    ('s', {'search_term': "Entity"}),
+    ('s_f', {'search_term': "Entity", 'member_filter': "Get"}),
+    ('d_a', {'deep_mode': True}),
+    ('x', {'search_term': "Data1", 'deep_mode': True, 'exact_mode': True}),
+    ('query', {'member_filter': "returns:int AND arity:1", 'deep_mode': True}),
+)
+
+
+def list_corpus(corpus):
+    return [os.path.join(corpus, f) for f in dc.select_dlls(sorted(os.listdir(corpus)), True)]
+
+
+def clear_caches():
+    dc._type_names.clear()
+    dc._node_names.clear()
+    dc._queries.clear()
+
+
+def measure_phases(backend_name, corpus, work_dir):
+    # One full deep scan split into its phases; member enumeration includes
+    # building the type names, formatting covers the report lines only
+    clock = time.perf_counter
+    timings = {}
+
+    started = clock()
+    dll_paths = list_corpus(corpus)
+    timings['list'] = clock() - started
+
+    backend = dc.get_backend(backend_name)
+    started = clock()
+    assemblies = [backend.load(path) for path in dll_paths]
+    timings['load'] = clock() - started
+
+    started = clock()
+    types = [(t, backend.type_info(t)) for asm in assemblies for t in backend.public_types(asm)]
+    timings['types'] = clock() - started
+
+    match = dc.compile_query(None, members=True).match_name
+    started = clock()
+    matches = [dc.TypeMatch(info, backend.fields(t, match) + backend.methods(t, match)
+                            + backend.properties(t, match))
+               for t, info in types]
+    timings['members'] = clock() - started
+
+    started = clock()
+    lines = []
+    for m in matches:
+        lines.append("\n" + dc.format_type_header(m.info) + "\n")
+        lines.extend(dc.format_member(rec) + "\n" for rec in m.members)
+    timings['format'] = clock() - started
+
+    started = clock()
+    with open(os.path.join(work_dir, "phases.txt"), "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    timings['write'] = clock() - started
+
+    counts = {'dlls': len(dll_paths), 'types': len(types), 'members': sum(len(m.members) for m in matches)}
+    return timings, counts
+
+
+def run_query(backend, dll_paths, log_path, query):
+    # The report loop of main(), without progress output
+    total = 0
+    with open(log_path, "w", encoding="utf-8") as f:
+        writer = dc.TextWriter(f)
+        writer.begin(os.path.dirname(dll_paths[0]), query.get('search_term'), query.get('member_filter'))
+        for path in dll_paths:
+            version, matches = dc.inspect_dll(path, backend=backend, **query)
+            matched = False
+            for match in matches:
+                if not matched:
+                    matched = True
+                    total += 1
+                    writer.file(os.path.basename(path), version)
+                writer.type_match(os.path.basename(path), version, match)
+        writer.end(total)
+    return total
+
+
+def measure_queries(backend_name, corpus, work_dir):
+    # Every mix gets a fresh backend, as if it were a separate run of the tool
+    clock = time.perf_counter
+    timings = {}
+    dll_paths = list_corpus(corpus)
+    dll_files = [os.path.basename(p) for p in dll_paths]
+
+    if backend_name == 'index':
+        index = dc.MemberIndex(os.path.join(work_dir, "index.sqlite"))
+        live = dc.get_backend('meta')
+        started = clock()
+        index.refresh(corpus, dll_files, live)
+        timings['build'] = clock() - started
+        started = clock()
+        index.refresh(corpus, dll_files, live)
+        timings['refresh'] = clock() - started
+
+    for name, query in QUERY_MIXES:
+        clear_caches()
+        started = clock()
+        backend = dc.IndexBackend(index) if backend_name == 'index' else dc.get_backend(backend_name)
+        matched = run_query(backend, dll_paths, os.path.join(work_dir, name + ".txt"), query)
+        timings['query.' + name] = clock() - started
+        if not matched:
+            # An empty result only times the scan, not the query
+            raise RuntimeError("query mix '{n}' matched nothing in the corpus".format(n=name))
+
+    if backend_name == 'meta':
+        started = clock()
+        graph = dc.DependencyGraph(corpus, dll_files)
+        graph.load_order()
+        graph.cycles()
+        timings['deps'] = clock() - started
+    return timings
+
+
+def measure(backend_name, corpus):
+    # Runs in a fresh process so every backend starts cold
+    work_dir = tempfile.mkdtemp(prefix="dll-bench-")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings, counts = ({}, None) if backend_name == 'index' else measure_phases(backend_name, corpus, work_dir)
+            timings = dict(('phase.' + k, v) for k, v in timings.items())
+            clear_caches()
+            timings.update(measure_queries(backend_name, corpus, work_dir))
+        return timings, counts
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_benchmark(corpus, backends, repeat):
+    ctx = multiprocessing.get_context('spawn')
+    results = {}
+    counts = None
+    for backend_name in backends:
+        runs = []
+        for r in range(repeat):
+            print("\r[{b}] run {i}/{n}".format(b=backend_name, i=r + 1, n=repeat).ljust(30), end="", flush=True)
+            with ctx.Pool(1) as pool:
+                timings, run_counts = pool.apply(measure, (backend_name, corpus))
+            runs.append(timings)
+            counts = counts or run_counts
+        for key in runs[0]:
+            results["{b}.{k}".format(b=backend_name, k=key)] = round(min(run[key] for run in runs), 6)
+    print()
+    return results, counts
+
+
+# ============================================================
+# BASELINE
+# ============================================================
+
+def compare(results, baseline, threshold, noise=0.005):
+    # A key regresses when it is threshold% slower and the difference exceeds
+    # the noise floor (seconds); keys the baseline lacks are listed only
+    rows = []
+    regressions = 0
+    for key in sorted(results):
+        old, new = baseline.get(key), results[key]
+        if old is None:
+            rows.append((key, old, new, None, "new"))
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        slower = change > threshold and new - old > noise
+        regressions += slower
+        rows.append((key, old, new, change, "REGRESSION" if slower else ""))
+    return rows, regressions
+
+
+def print_compare(rows, threshold):
+    print("\n{k:<28} {o:>10} {n:>10} {c:>9}".format(k="Measurement", o="Baseline", n="Now", c="Change"))
+    print("-" * 70)
+    for key, old, new, change, note in rows:
+        print("{k:<28} {o:>10} {n:>10} {c:>9} {note}".format(
+            k=key,
+            o="{v:.4f}".format(v=old) if old is not None else "-",
+            n="{v:.4f}".format(v=new) if new is not None else "-",
+            c="{v:+.1f}%".format(v=change) if change is not None else "",
+            note=note))
+    print("(regression threshold: +{t:g}%)".format(t=threshold))
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    args = sys.argv[1:]
+    cfg = dc.load_config()
+    log_dir_full = os.path.join(script_dir, cfg['log_dir'])
+
+    if "-h" in args or "--help" in args:
+        print(HELP.format(ver=dc.VERSION, log_dir=cfg['log_dir'], **DEFAULT_CORPUS))
+        return 0
+
+    spec = corpus_spec(args)
+    corpus = os.path.abspath(dc.get_arg_value(args, "--corpus") or os.path.join(log_dir_full, "bench", "corpus"))
+    started = time.perf_counter()
+    if generate_corpus(corpus, spec):
+        print("Corpus generated: {d} ({n} DLLs, {t:.2f}s)".format(
+            d=corpus, n=spec['dlls'], t=time.perf_counter() - started))
+    else:
+        print("Corpus: {d}".format(d=corpus))
+
+    available = ['meta', 'index'] + (['clr'] if dc.HAS_CLR else [])
+    backends = (dc.get_arg_value(args, "--backend") or ",".join(available)).split(",")
+    unknown = [b for b in backends if b not in ('meta', 'clr', 'index')]
+    if unknown:
+        print("Unknown backend(s): {b}".format(b=", ".join(unknown)))
+        return 2
+
+    repeat = max(1, int(dc.get_arg_value(args, "--repeat") or 3))
+    results, counts = run_benchmark(corpus, backends, repeat)
+
+    report = {
+        'format': BENCH_FORMAT,
+        'version': dc.VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus': spec,
+        'counts': counts,
+        'repeat': repeat,
+        'timings': results,
+    }
+
+    out_path = dc.get_arg_value(args, "--out")
+    if not out_path:
+        out_dir = os.path.join(log_dir_full, "bench")
+        out_path = os.path.join(out_dir, datetime.now().strftime("%Y-%m-%d_%H%M%S") + ".json")
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    for path in filter(None, (out_path, dc.get_arg_value(args, "--save-baseline"))):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if counts:
+        print("Corpus size: {dlls} DLLs, {types} types, {members} members".format(**counts))
+    baseline_path = dc.get_arg_value(args, "--baseline")
+    if not baseline_path:
+        for key, value in sorted(results.items()):
+            print("  {k:<28} {v:.4f}s".format(k=key, v=value))
+        print("Results saved: {f}".format(f=out_path))
+        return 0
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get('corpus') != spec:
+        print("[!] Baseline was measured on a different corpus: {c}".format(c=baseline.get('corpus')))
+    threshold = float(dc.get_arg_value(args, "--threshold") or 15)
+    rows, regressions = compare(results, baseline['timings'], threshold)
+    print_compare(rows, threshold)
+    print("Results saved: {f}".format(f=out_path))
+    if regressions:
+        print("\n[!] {n} measurement(s) regressed.".format(n=regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
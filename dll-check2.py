@@ -1,12 +1,34 @@
 # dll-check2.py
 import os
 import sys
-import clr
 import configparser
+import csv
+import fnmatch
+import hashlib
+import importlib.util
+import json
+import mmap
+import multiprocessing
 import re
+import shlex
+import struct
 import subprocess
 import shutil
+import sqlite3
+import time
+import uuid
+from collections import Counter, deque, namedtuple
+from itertools import groupby
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from types import GeneratorType
+
+# pythonnet is imported by ClrBackend only; starting the runtime is slow and
+# not needed for --backend meta or when a daemon answers the query
+HAS_CLR = importlib.util.find_spec("clr") is not None
 
 # --- CONFIG ---
 
@@ -85,13 +107,47 @@ HELP_SHORT = """
 ======================================================================
 OPTION              DESCRIPTION
 ----------------------------------------------------------------------
--s <term>           Filter TYPE names (Namespace.TypeName)
--f <term>           Filter MEMBER names (methods, properties, fields)
--x                  Exact word match (no substring)
+-s <query>          Filter TYPE names (Namespace.TypeName); "A B" = A AND B
+-f <query>          Filter MEMBERS by name/signature (syntax: --help:extend)
+-x                  Exact word match for plain terms (no substring)
 -e                  Include properties
 -d                  Deep mode (fields + properties)
+--declared          Declared members only; each base type's members listed once
 -a                  Scan ALL DLL files (ignore config keywords)
---deps              Show dependency graph
+-w                  Scan all [WORKSPACE] roots; identical DLLs inspected once
+--deps              Dependency graph, load order, cycles, missing references
+--deps:dot          Save the dependency graph as Graphviz DOT (also :json)
+--deps-of <dll>     Everything a DLL depends on (transitively)
+--rdeps <dll>       Everything that depends on a DLL (transitively)
+--backend <name>    Assembly reader: clr (pythonnet) or meta (no .NET needed)
+--uses <type>       Members that return/take/expose a type (from the index)
+--attr <name>       Types/members carrying a custom attribute (from the index)
+--attr:args <name>  Same, with the attribute's constructor arguments
+--with-ext          Also list extension methods for each type, from any DLL (index)
+--derived <type>    Every type deriving from a class, across all DLLs
+--implements <i>    Every type implementing an interface
+--ancestors <type>  Base-class chain and interfaces of a type
+--fuzzy <name> [N]  Top N names similar to a misspelt name, with scores (index)
+--reindex           Rebuild the member index for the scanned DLLs
+--no-index          Skip the member index, inspect DLLs directly
+--no-prefilter      Inspect every DLL, even without a matching name in it
+--no-cache          Rescan even if the same query has a cached log
+-j <N>              Scan with N worker processes (0 = one per CPU)
+--isolate [N]       Load DLLs in worker processes, replaced after N DLLs each
+--mem-limit <MB>    Replace a worker once its memory passes MB (with --isolate)
+-v                  Verbose: timing and cache statistics
+--profile [N]       Per-DLL load/scan/write times, counts, errors; top N slowest
+--profile:json      Also save the per-DLL profile as JSON (:cprofile = pstats)
+--format <fmt>      Log format: text (default), jsonl or csv
+--serve             Keep DLLs loaded; later runs are answered by this daemon
+--serve:stop        Stop the running daemon
+--repl              Interactive query prompt with the DLLs kept loaded
+--watch [S]         Poll every S sec; re-inspect changed DLLs, refresh query logs
+--save-query <name> Save this run's -s/-f/-x/-e/-d under a name for --watch
+--batch <file>      Run many -s/-f queries in one pass, one log per query
+--diff <old> <new>  API diff: old dir (or .snap / jsonl log) vs new dir
+--export-snapshot   Save the API of the selected DLLs as a compact .snap file
+--snapshot <file>   Query a .snap file instead of DLLs (no .NET, no DLLs needed)
 -y                  Use default path from config
 -o                  Open generated log in VSCode
 --clear             Delete all generated inspect log files/directory
@@ -108,13 +164,47 @@ HELP_EXTENDED = """
 ======================================================================
 OPTION              DESCRIPTION
 ----------------------------------------------------------------------
--s <term>           Filter TYPE names (Namespace.TypeName)
--f <term>           Filter MEMBER names (methods, properties, fields)
--x                  Exact word match (no substring)
+-s <query>          Filter TYPE names (Namespace.TypeName); "A B" = A AND B
+-f <query>          Filter MEMBERS by name and signature (see QUERY SYNTAX)
+-x                  Exact word match for plain terms (no substring)
 -e                  Include properties
 -d                  Deep mode (fields + properties)
+--declared          Declared members only; each base type's members listed once
 -a                  Scan ALL DLL files (ignore config keywords)
---deps              Show dependency graph
+-w                  Scan all [WORKSPACE] roots; identical DLLs inspected once
+--deps              Dependency graph, load order, cycles, missing references
+--deps:dot          Save the dependency graph as Graphviz DOT (also :json)
+--deps-of <dll>     Everything a DLL depends on (transitively)
+--rdeps <dll>       Everything that depends on a DLL (transitively)
+--backend <name>    Assembly reader: clr (pythonnet) or meta (no .NET needed)
+--uses <type>       Members that return/take/expose a type (from the index)
+--attr <name>       Types/members carrying a custom attribute (from the index)
+--attr:args <name>  Same, with the attribute's constructor arguments
+--with-ext          Also list extension methods for each type, from any DLL (index)
+--derived <type>    Every type deriving from a class, across all DLLs
+--implements <i>    Every type implementing an interface
+--ancestors <type>  Base-class chain and interfaces of a type
+--fuzzy <name> [N]  Top N names similar to a misspelt name, with scores (index)
+--reindex           Rebuild the member index for the scanned DLLs
+--no-index          Skip the member index, inspect DLLs directly
+--no-prefilter      Inspect every DLL, even without a matching name in it
+--no-cache          Rescan even if the same query has a cached log
+-j <N>              Scan with N worker processes (0 = one per CPU)
+--isolate [N]       Load DLLs in worker processes, replaced after N DLLs each
+--mem-limit <MB>    Replace a worker once its memory passes MB (with --isolate)
+-v                  Verbose: timing and cache statistics
+--profile [N]       Per-DLL load/scan/write times, counts, errors; top N slowest
+--profile:json      Also save the per-DLL profile as JSON (:cprofile = pstats)
+--format <fmt>      Log format: text (default), jsonl or csv
+--serve             Keep DLLs loaded; later runs are answered by this daemon
+--serve:stop        Stop the running daemon
+--repl              Interactive query prompt with the DLLs kept loaded
+--watch [S]         Poll every S sec; re-inspect changed DLLs, refresh query logs
+--save-query <name> Save this run's -s/-f/-x/-e/-d under a name for --watch
+--batch <file>      Run many -s/-f queries in one pass, one log per query
+--diff <old> <new>  API diff: old dir (or .snap / jsonl log) vs new dir
+--export-snapshot   Save the API of the selected DLLs as a compact .snap file
+--snapshot <file>   Query a .snap file instead of DLLs (no .NET, no DLLs needed)
 -y                  Use default path from config
 -o                  Open generated log in VSCode
 --clear             Delete all generated inspect log files/directory
@@ -154,6 +244,12 @@ PROPERTY / FIELD DETAIL LEVELS
   Deep mode, additionally filter members by "Id".
   Output: only fields/properties/methods whose name contains "Id". Very narrow.
 
+-s MyRefinery* -d -a --declared
+  Each type lists only the members it declares, then "... inherits N member(s)
+  from <base>". The base types follow once per log, each with its own members, so
+  MyFunctionalBlock / MyCubeBlock / Object are not repeated under every subclass.
+  A member that overrides a base member is listed under the base that declares it.
+
 ECONOMY / CONTRACT EXAMPLES
 
 -s EconomyContract -y -o
@@ -184,6 +280,41 @@ STORE / ECONOMY BLOCK EXAMPLES
 -s StoreBlock -f Insert -d -y -o
   Deep scan, only members matching "Insert". Finds insertion methods for store items.
 
+QUERY SYNTAX
+
+  Plain words match as substrings (whole words with -x), case-insensitive.
+  Word*  Wo?d    Glob, matched against the whole name ("Namespace.Type" or bare type name)
+  /^Get\\w+Id$/   Regular expression, searched anywhere in the name
+  A AND B, A B   Both must match      A OR B   Either matches
+                 (-s "Contract Block" finds ContractBlock, MyContractBlock, ...:
+                 each word anywhere in the name, not the text "Contract Block")
+  NOT A          A must not match     ( ... )  Grouping
+  Member-only filters for -f (type names match as whole words):
+  returns:<t>    Method return type / field or property type (alias: type:)
+  param:<t>      Any parameter of that type
+  static, instance  Static or instance members only (also is:static)
+  kind:<k>       field, method or property (fields need -d, properties -e/-d)
+  arity:<n>      Methods with exactly n parameters
+
+-s "MyContract* AND NOT Description" -f "Get* AND returns:long"
+  Contract types except the description classes, getters returning long.
+
+-s ContractBlock -f "param:MyContractDescription OR arity:0" -d
+  Members taking a MyContractDescription, or parameterless methods.
+
+-s /^Sandbox\\.Game\\.Entities\\./ -f "static kind:method"
+  Static methods of every type in the Sandbox.Game.Entities namespace.
+
+WORKSPACE (SEVERAL FOLDERS)
+
+-s ContractBlock -w
+  Scan every folder listed under [WORKSPACE] in config_check.ini, e.g.
+    bin64 = D:/SE/Bin64
+    plugins = D:/Torch/Plugins/**      (/** = include sub-folders)
+  Identical files (size + SHA-256) are inspected once. Copies of an assembly
+  with different content are reported as version conflicts. FILE lines show
+  root/relative/path.dll, and a WORKSPACE section lists every copy.
+
 ALL DLL SCAN
 
 -s ContractBlock -a -y
@@ -193,15 +324,195 @@ ALL DLL SCAN
 DEPENDENCY GRAPH
 
 --deps -y
-  Print which DLLs reference which other DLLs (filtered by config keywords).
-  Useful for understanding plugin dependency chains.
+  Print which DLLs reference which other DLLs (filtered by config keywords),
+  then a load order, reference cycles and references not found in the folder.
+  Read from the AssemblyRef metadata table; no assembly is loaded.
+
+--rdeps VRage.Math -y -a
+  Every DLL that depends on VRage.Math, directly (->) or transitively (..).
+  "What breaks if VRage.Math changes".
+
+--deps-of Sandbox.Game -y -a
+  Everything Sandbox.Game.dll needs, transitively.
+
+--deps:dot -y -a
+  Save the graph as Graphviz DOT (--deps:json for JSON) next to the logs.
+
+WHERE IS A TYPE USED
+
+--uses MyContractDescription -y -a
+  Every method returning or taking MyContractDescription and every field/property
+  of that type, in all DLLs, including List<MyContractDescription> and arrays.
+  Answered from the member index (no reflection pass). Combine with -s / -f:
+  --uses MyContractDescription -f "returns:MyContractDescription" -y -a
+
+CUSTOM ATTRIBUTES
+
+--attr MySessionComponentDescriptor -y -a
+  Every type and member carrying [MySessionComponentDescriptor], read from the
+  metadata (nothing is instantiated). Types are listed with their members per -e/-d.
+
+--attr:args Command -f Reload -y
+  Same for [Command], showing the arguments, e.g. [@] Command("reload", Level = 2)
+
+EXTENSION METHODS
+
+-s MyCubeGrid -x --with-ext -y -a
+  MyCubeGrid's members plus every extension method usable on it, from any scanned
+  DLL: this MyCubeGrid, this MyEntity (a base class), this IMyEntity (an interface).
+  -f also filters the extension methods:
+  -s MyCubeGrid -x -f GetBlocksOfType --with-ext -y -a
+
+TYPE HIERARCHY
+
+--derived MyFunctionalBlock -y -a
+  Every type deriving (directly or indirectly) from MyFunctionalBlock, in any DLL.
+  Add -s to narrow the result, e.g. -s Sandbox.Game.Entities.Blocks
+
+--implements IMyTerminalBlock -y -a
+  Every type implementing IMyTerminalBlock (also through a base class).
+
+--ancestors MyContractBlock -y -a
+  Base-class chain (with the DLL defining each base) and all interfaces.
+  Names may be bare (MyContractBlock) or full (Sandbox.Game.Entities.Blocks.MyContractBlock).
+
+FUZZY SEARCH
+
+-y -a --fuzzy ContractBlok
+  The 20 type / member names closest to a half-remembered name (ContractBlock,
+  MyContractBlock, ...), scored by shared trigrams, with kind, type and DLL.
+  Answered from the member index in milliseconds; the log lists every owner.
+
+-y -a --fuzzy GetContracts 5 -s Sandbox.Game
+  Top 5 only, and only names declared by types matching -s.
+
+MEMBER INDEX
+
+-s ContractBlock -y
+  The first run inspects every DLL and stores its types/members in LogDir/index.sqlite.
+  Later runs only re-inspect DLLs whose size, timestamp or MVID changed.
+
+-s ContractBlock -y --reindex
+  Force every scanned DLL to be re-inspected (e.g. after switching backends).
+
+-s ContractBlock -a -y --reindex -j 8
+  Re-inspect with 8 worker processes. Output order is the same as a serial run;
+  a DLL that crashes its worker is reported and skipped.
+
+-s ContractBlock -a -d -y --reindex --isolate 20 --mem-limit 1500
+  Load the DLLs in worker processes that are replaced after 20 DLLs each, or as
+  soon as one passes 1500 MB. Everything a worker loaded is freed with it, so
+  memory stays flat on a full install; -v shows the peak worker memory.
+
+RESULT CACHE
+
+-s ContractBlock -f Get -y -o
+  Repeating a query whose flags and DLLs (name, size, timestamp) are unchanged
+  prints the earlier log instead of scanning; -o still opens it.
+
+-s ContractBlock -f Get -y --no-cache
+  Scan anyway and cache the new log in place of the old one.
+
+OUTPUT FORMATS
+
+-s ContractBlock -d -y --format jsonl
+  One JSON object per member (dll, version, namespace, type, kind, static,
+  type_name, name, params). Written while scanning; nothing is buffered per DLL.
+
+-s ContractBlock -d -y --format csv
+  Same fields as CSV with a header row, e.g. for spreadsheets.
+
+API DIFF
+
+-a -e --diff D:/SE_backup/Bin64 D:/SE/Bin64
+  Added / removed / changed types and members between two installs, grouped by DLL
+  and namespace. DLLs with identical content (SHA-256) are skipped without loading.
+
+-d --diff 2026-03-10_112229_All.jsonl D:/SE/Bin64 -s Contract -f Get
+  Compare against a saved "--format jsonl -d" log, narrowed with -s / -f.
+
+-a -d --diff SE_1.204.snap D:/SE/Bin64
+  Compare against a snapshot (below); DLLs with the same SHA-256 are skipped.
+
+API SNAPSHOTS
+
+-y -a --export-snapshot SE_1.204.snap
+  Write types, members, signatures, base chains, interfaces, references and
+  versions of the selected DLLs into one binary file (a few MB for a full install).
+  Without a file name it is saved in the log directory.
+
+-s ContractBlock -f Get -d --snapshot SE_1.204.snap
+  Run the usual -s/-f/-e/-d/-x query against the memory-mapped snapshot: no game
+  install, no pythonnet, no .NET. -a / FilterKeywords select the DLLs in it.
+
+DAEMON / REPL
+
+-y -a --serve
+  Load the DLLs once and keep them in memory. Leave it running in a terminal.
+
+-s ContractBlock -f Get -y -a
+  While a daemon serves the same directory (and -a selection) this run is forwarded
+  to it: no .NET start-up, no DLL loading, the log is written as usual.
+
+--serve:stop
+  Stop the daemon.
+
+-y --repl
+  Interactive prompt; type queries such as: -s StoreBlock -f Insert -d
+
+WATCH MODE
+
+-s ContractBlock -f Get -d -y --save-query contracts
+  Run the query and keep it in config_check.ini under [QUERIES] as "contracts".
+
+-y -a --watch
+  Load the DLLs once, write LogDir/Watch_<name>.txt for every saved query (plus
+  -s / -f if given), then poll the folder every 2 seconds. After a build only the
+  added / modified DLLs are re-inspected and the Watch_ logs are rewritten.
+
+BATCH QUERIES
+
+-y -a --batch contracts.txt
+  contracts.txt holds one query per line, e.g.
+      blocks = -s ContractBlock -f Get -d
+      -s MyContract* -f "returns:bool" -x
+      economy = -s Store* -f Insert -e --format jsonl
+  (# starts a comment; a line without "name =" is named after its -s / -f).
+  Every DLL is loaded and its types and members enumerated once for all queries;
+  each query gets <ts>_Batch_contracts_<name>.txt and <ts>_Batch_contracts.txt
+  lists the queries with their matched files, types and log names.
+
+PROFILING
+
+-s ContractBlock -y -a --profile 20
+  Table of the 20 slowest DLLs: load, scan and write time, types, members,
+  matched types, KB written and errors that the scan would otherwise swallow.
+  A profiled search reads the DLLs themselves, not the member index.
+
+-s ContractBlock -y -a --profile:json --profile:cprofile
+  Save the full per-DLL profile (.profile.json) and a cProfile dump (.prof)
+  next to the log. cProfile covers this process only, not -j workers.
+
+--deps -y -a --profile
+  Metadata read time and errors per DLL for the dependency graph.
+
+BACKENDS
+
+-s ContractBlock -y --backend meta
+  Read the DLL metadata directly (no .NET runtime, nothing is loaded into the CLR).
+  Default when pythonnet is not installed; works on Linux without Mono/.NET.
+
+-s ContractBlock -y --backend clr
+  Load assemblies through pythonnet reflection (the classic behaviour).
 
 ======================================================================
 NOTE ON LOG FILES
 ----------------------------------------------------------------------
 All logs are saved with a timestamp prefix in the configured log directory.
 Example filename: 2026-03-10_112229_ContractBlock_f_GetContract.txt
-Use --clear to delete all generated logs at once.
+Least recently used logs are deleted automatically once the cached logs pass the
+CacheMaxMB / CacheMaxFiles / CacheMaxDays limits in the config (0 = no limit).
+Use --clear to delete all generated logs (and the member index) at once.
 ======================================================================
 """.format(ver=VERSION)
 
@@ -215,7 +526,11 @@ def load_config():
         'DefaultPath': os.path.join(script_dir, "Dependencies"),
         'FilterKeywords': "Torch,Sandbox,VRage,SpaceEngineers,Discord",
         'LogDir': ".inspect",
-        'VSCodePath': r"c:\dev\VSCode\bin\code.cmd"
+        'IndexFile': "index.sqlite",
+        'VSCodePath': r"c:\dev\VSCode\bin\code.cmd",
+        'CacheMaxMB': "200",
+        'CacheMaxFiles': "300",
+        'CacheMaxDays': "30"
     }
 
     updated = False
@@ -241,11 +556,52 @@ def load_config():
         'path': config.get('SETTINGS', 'DefaultPath'),
         'keywords': config.get('SETTINGS', 'FilterKeywords').split(','),
         'log_dir': config.get('SETTINGS', 'LogDir'),
-        'vscode_path': config.get('SETTINGS', 'VSCodePath')
+        'index_file': config.get('SETTINGS', 'IndexFile'),
+        'vscode_path': config.get('SETTINGS', 'VSCodePath'),
+        'cache_max_mb': config.getfloat('SETTINGS', 'CacheMaxMB', fallback=0),
+        'cache_max_files': config.getint('SETTINGS', 'CacheMaxFiles', fallback=0),
+        'cache_max_days': config.getfloat('SETTINGS', 'CacheMaxDays', fallback=0)
     }
 
 
-cfg = load_config()
+# Loaded by main(): importing this file (benchmark.py, the tests) must not create config_check.ini
+cfg = None
+
+
+def workspace_roots():
+    # [WORKSPACE] name = path; a trailing /** also scans every sub-folder
+    if not config.has_section('WORKSPACE'):
+        return []
+    roots = []
+    for name in config.options('WORKSPACE'):
+        path = config.get('WORKSPACE', name).strip()
+        recursive = path.endswith(('/**', '\\**'))
+        if recursive:
+            path = path[:-3]
+        roots.append((name, os.path.abspath(path), recursive))
+    return roots
+
+
+def saved_queries():
+    if not config.has_section('QUERIES'):
+        return []
+    return [(name, config.get('QUERIES', name)) for name in config.options('QUERIES')]
+
+
+def save_query(name, args):
+    # Stores the query flags of this run under [QUERIES]; --watch keeps their logs up to date
+    words = []
+    for flag in ("-s", "-f", "--format"):
+        value = get_arg_value(args, flag)
+        if value:
+            words += [flag, value]
+    words += [flag for flag in ("-x", "-e", "-d") if flag in args]
+    if not config.has_section('QUERIES'):
+        config.add_section('QUERIES')
+    config.set('QUERIES', name, shlex.join(words).replace('%', '%%'))
+    with open(config_file, 'w') as f:
+        config.write(f)
+    return " ".join(words)
 
 
 # ============================================================
@@ -262,52 +618,282 @@ def detect_keywords_from_directory(dll_list):
     return sorted(roots)
 
 
-def get_timestamp_log_path(directory, search_term, member_filter):
+def select_dlls(files, scan_all):
+    dlls = [f for f in files if f.lower().endswith(".dll")]
+    if scan_all:
+        return dlls
+    return [f for f in dlls if any(k.lower() in f.lower() for k in cfg['keywords'])]
+
+
+def get_timestamp_log_path(directory, search_term, member_filter, extension=".txt"):
     ts = datetime.now().strftime("%Y-%m-%d_%H%M%S")
     clean_s = re.sub(r'[^\w]', '', search_term) if search_term else "All"
     clean_f = "_f_" + re.sub(r'[^\w]', '', member_filter) if member_filter else ""
-    base_name = "{ts}_{s}{f}.txt".format(ts=ts, s=clean_s, f=clean_f)
+    base_name = "{ts}_{s}{f}{e}".format(ts=ts, s=clean_s, f=clean_f, e=extension)
     return os.path.join(directory, base_name)
 
 
-def exact_or_contains(value, term, exact):
-    if not term:
-        return True
-    if exact:
-        pattern = r'\b' + re.escape(term) + r'\b'
-        return re.search(pattern, value, re.IGNORECASE)
-    return term.lower() in value.lower()
+def open_log(log_path):
+    vscode_cmd = cfg['vscode_path']
+    if os.path.exists(vscode_cmd):
+        subprocess.run([vscode_cmd, log_path], shell=True)
+    else:
+        os.startfile(log_path)
+
+
+def get_arg_value(args, flag):
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return None
+
+
+TYPE_ALIASES = {
+    "Int64": "long",
+    "UInt64": "ulong",
+    "Int32": "int",
+    "UInt32": "uint",
+    "Single": "float",
+    "Double": "double",
+    "Boolean": "bool",
+    "String": "string"
+}
+
+
+class CacheStats:
+    __slots__ = ('hits', 'misses')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def describe(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return "{h}/{t} hits ({r:.1f}%)".format(h=self.hits, t=total, r=rate)
+
+
+TYPE_NAME_STATS = CacheStats()
+MEMBER_CACHE_STATS = CacheStats()
+
+# System.Type -> formatted name; pythonnet hashes/compares types by CLR identity
+_type_names = {}
 
 
 def format_type_name(t):
     if t is None:
         return "void"
 
-    name = t.Name
-    mappings = {
-        "Int64": "long",
-        "UInt64": "ulong",
-        "Int32": "int",
-        "UInt32": "uint",
-        "Single": "float",
-        "Double": "double",
-        "Boolean": "bool",
-        "String": "string"
-    }
+    cached = _type_names.get(t)
+    if cached is not None:
+        TYPE_NAME_STATS.hits += 1
+        return cached
+    TYPE_NAME_STATS.misses += 1
 
-    if name in mappings:
-        return mappings[name]
+    name = t.Name
+    text = name
 
-    if '`' in name:
+    if name in TYPE_ALIASES:
+        text = TYPE_ALIASES[name]
+    elif '`' in name:
         base_name = name.split('`')[0]
         try:
             gen_args = t.GetGenericArguments()
             args_names = [format_type_name(a) for a in gen_args]
-            return "{base}<{args}>".format(base=base_name, args=', '.join(args_names))
+            text = "{base}<{args}>".format(base=base_name, args=', '.join(args_names))
         except:
-            return name
+            pass
+
+    _type_names[t] = text
+    return text
+
+
+# ============================================================
+# QUERY ENGINE
+# ============================================================
+
+class QueryError(Exception):
+    pass
+
+
+QUERY_TOKEN = re.compile(r'\(|\)|(?:\w+:)?/(?:\\.|[^/\\])*/|[^\s()]+')
+
+MEMBER_KINDS = {
+    'field': 'F', 'f': 'F',
+    'method': 'M', 'm': 'M',
+    'property': 'P', 'prop': 'P', 'p': 'P',
+}
+
+
+def compile_pattern(term, exact):
+    # Returns test(text, text_lower) for a plain word, a glob (* ?) or a /regex/
+    if len(term) >= 2 and term.startswith('/') and term.endswith('/'):
+        try:
+            rx = re.compile(term[1:-1], re.IGNORECASE)
+        except re.error as e:
+            raise QueryError("bad regex {t}: {e}".format(t=term, e=e))
+        return lambda text, lower: rx.search(text) is not None
+    if '*' in term or '?' in term:
+        rx = re.compile(fnmatch.translate(term), re.IGNORECASE)
+        return lambda text, lower: rx.match(text) is not None
+    if exact:
+        rx = re.compile(r'\b' + re.escape(term) + r'\b', re.IGNORECASE)
+        return lambda text, lower: rx.search(text) is not None
+    term = term.lower()
+    return lambda text, lower: term in lower
+
+
+class _QueryParser:
+    # expr := or ; or := and ('OR' and)* ; and := not (['AND'] not)* ; not := 'NOT' not | atom
+
+    def __init__(self, tokens, exact, members):
+        self.tokens = tokens
+        self.pos = 0
+        self.exact = exact
+        self.members = members
+        self.uses_signature = False
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def parse(self):
+        test = self.parse_or()
+        if self.peek() is not None:
+            raise QueryError("unexpected '{t}'".format(t=self.peek()))
+        return test
+
+    def parse_or(self):
+        tests = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.take()
+            tests.append(self.parse_and())
+        if len(tests) == 1:
+            return tests[0]
+        return lambda c: any(t(c) for t in tests)
+
+    def parse_and(self):
+        tests = [self.parse_not()]
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.take()
+            tests.append(self.parse_not())
+        if len(tests) == 1:
+            return tests[0]
+        return lambda c: all(t(c) for t in tests)
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            test = self.parse_not()
+            return lambda c: not test(c)
+        return self.parse_atom()
+
+    def parse_atom(self):
+        tok = self.take()
+        if tok is None:
+            raise QueryError("unexpected end of expression")
+        if tok == '(':
+            test = self.parse_or()
+            if self.take() != ')':
+                raise QueryError("missing ')'")
+            return test
+        if tok in (')', 'AND', 'OR'):
+            raise QueryError("unexpected '{t}'".format(t=tok))
+        return self.leaf(tok)
+
+    def leaf(self, tok):
+        key, sep, value = tok.partition(':')
+        if tok.startswith('/') or not sep:
+            if self.members and tok in ('static', 'instance'):
+                return self.signature('is', tok)
+            pattern = compile_pattern(tok, self.exact)
+            if '*' in tok or '?' in tok:
+                # globs are anchored, so also try the bare type name for "Namespace.Type" candidates
+                return lambda c: pattern(c[0], c[1]) or pattern(c[2], c[3])
+            return lambda c: pattern(c[0], c[1])
+        if not self.members:
+            raise QueryError("'{t}' is a member filter, use it with -f".format(t=tok))
+        return self.signature(key.lower(), value)
 
-    return name
+    def signature(self, key, value):
+        self.uses_signature = True
+        if not value:
+            raise QueryError("missing value for '{k}:'".format(k=key))
+
+        if key == 'is':
+            if value not in ('static', 'instance'):
+                raise QueryError("is: expects static or instance")
+            want = value == 'static'
+            return lambda c: c[4] is not None and c[4].is_static == want
+
+        if key == 'kind':
+            kind = MEMBER_KINDS.get(value.lower())
+            if kind is None:
+                raise QueryError("kind: expects field, method or property")
+            return lambda c: c[4] is not None and c[4].kind == kind
+
+        if key == 'arity':
+            try:
+                arity = int(value)
+            except ValueError:
+                raise QueryError("arity: expects a number")
+            return lambda c: c[4] is not None and c[4].params is not None and len(c[4].params) == arity
+
+        # type names in signatures match as whole words, so returns:long skips ulong
+        pattern = compile_pattern(value, True)
+        if key in ('returns', 'type'):
+            return lambda c: c[4] is not None and pattern(c[4].type_name, c[4].type_name.lower())
+        if key == 'param':
+            return lambda c: c[4] is not None and any(pattern(t, t.lower()) for t, _ in c[4].params or ())
+        raise QueryError("unknown filter '{k}:'".format(k=key))
+
+
+class Query:
+
+    def __init__(self, text, exact=False, members=True):
+        self.text = text
+        self.uses_signature = False
+        self._test = None
+        tokens = QUERY_TOKEN.findall(text or "")
+        if tokens:
+            parser = _QueryParser(tokens, exact, members)
+            self._test = parser.parse()
+            self.uses_signature = parser.uses_signature
+
+    def match_type(self, info):
+        if self._test is None:
+            return True
+        full = "{ns}.{name}".format(ns=info.namespace, name=info.name)
+        return self._test((full, full.lower(), info.name, info.name.lower(), None))
+
+    def match_name(self, name):
+        # Cheap pre-filter on the bare member name, before any signature is formatted
+        if self._test is None or self.uses_signature:
+            return True
+        lower = name.lower()
+        return self._test((name, lower, name, lower, None))
+
+    def match_member(self, rec):
+        if self._test is None:
+            return True
+        lower = rec.name.lower()
+        return self._test((rec.name, lower, rec.name, lower, rec))
+
+
+_queries = {}
+
+
+def compile_query(text, exact=False, members=True):
+    key = (text, exact, members)
+    query = _queries.get(key)
+    if query is None:
+        query = Query(text, exact, members)
+        _queries[key] = query
+    return query
 
 
 # ============================================================
@@ -319,9 +905,32 @@ PARAM_DESCRIPTIONS = {
     '-o': "Open generated log in VSCode after scan",
     '-d': "Deep mode: include fields + properties in output",
     '-e': "Include properties in output (lighter than -d)",
+    '--declared': "List declared members per type; each base type's members once",
+    '--with-ext': "List the extension methods available for each type (from the index)",
     '-x': "Exact word match (no substring matching)",
     '-a': "Scan ALL DLL files (ignore config keyword filter)",
+    '-w': "Scan every [WORKSPACE] root, identical DLLs only once",
     '--deps': "Show dependency graph between DLL files",
+    '--deps:dot': "Save the dependency graph as Graphviz DOT",
+    '--deps:json': "Save the dependency graph as JSON",
+    '--reindex': "Re-inspect every DLL instead of reusing the member index",
+    '--no-index': "Inspect DLLs directly, bypassing the member index",
+    '--no-prefilter': "Inspect every DLL, even those whose names cannot match",
+    '--no-cache': "Rescan instead of reusing a cached log of the same query",
+    '-v': "Verbose: print timing and cache statistics",
+    '--isolate': "Load DLLs in short-lived worker processes (bounded memory)",
+    '--mem-limit': "Replace a worker process once it uses more memory than this (MB)",
+    '--profile': "Profile every DLL: times, counts, swallowed errors",
+    '--profile:json': "Save the per-DLL profile as JSON next to the log",
+    '--profile:cprofile': "Save a cProfile dump next to the log",
+    '--serve': "Keep the DLLs loaded and answer queries from other runs",
+    '--repl': "Interactive query prompt over the loaded DLLs",
+    '--watch': "Re-inspect changed DLLs and refresh the saved query logs",
+    '--save-query': "Save the -s/-f/-x/-e/-d of this run as a named query",
+    '--batch': "Answer every query in the file with one pass over the DLLs",
+    '--diff': "Compare the API surface of two DLL directories (or a jsonl snapshot)",
+    '--export-snapshot': "Save the API of the selected DLLs as a binary snapshot",
+    '--snapshot': "Query a binary API snapshot instead of the DLLs",
 }
 
 
@@ -334,9 +943,30 @@ def print_active_params(args, cfg, search_term, member_filter):
                 d = d.format(path=cfg['path'])
             active.append("  {f:<8} {d}".format(f=flag, d=d))
     if search_term:
-        active.append("  {f:<8} Searching TYPE names containing: \"{v}\"".format(f='-s', v=search_term))
+        active.append("  {f:<8} Searching TYPE names matching: \"{v}\"".format(f='-s', v=search_term))
     if member_filter:
-        active.append("  {f:<8} Filtering MEMBER names containing: \"{v}\"".format(f='-f', v=member_filter))
+        active.append("  {f:<8} Filtering MEMBERS matching: \"{v}\"".format(f='-f', v=member_filter))
+    jobs_value = get_arg_value(args, '-j')
+    if '-j' in args:
+        active.append("  {f:<8} Scanning with {v} worker process(es)".format(
+            f='-j', v=jobs_value if jobs_value and jobs_value != '0' else "one per CPU"))
+    for flag, text in (('--uses', "Listing members whose signature mentions {v}"),
+                       ('--attr', "Listing types and members carrying [{v}]"),
+                       ('--attr:args', "Listing types and members carrying [{v}], with arguments"),
+                       ('--derived', "Listing every type deriving from {v}"),
+                       ('--implements', "Listing every type implementing {v}"),
+                       ('--ancestors', "Listing base classes and interfaces of {v}"),
+                       ('--fuzzy', "Ranking type/member names similar to {v}"),
+                       ('--deps-of', "Listing everything {v} depends on"),
+                       ('--rdeps', "Listing everything that depends on {v}")):
+        if flag in args:
+            active.append("  {f:<8} {t}".format(f=flag, t=text.format(v=get_arg_value(args, flag))))
+    output_format = get_arg_value(args, '--format')
+    if output_format:
+        active.append("  {f:<8} Writing results as {v}".format(f='--format', v=output_format))
+    backend_name = get_arg_value(args, '--backend')
+    if backend_name:
+        active.append("  {f:<8} Reading assemblies with the \"{v}\" backend".format(f='--backend', v=backend_name))
 
     if active:
         print("\nActive parameters:")
@@ -355,248 +985,4537 @@ def print_active_params(args, cfg, search_term, member_filter):
 
 
 # ============================================================
-# DEPENDENCIES
+# METADATA READER (ECMA-335)
 # ============================================================
 
-def build_dependency_map(directory, dll_files):
-    import System.Reflection as Reflection
-    dep_map = {}
+class MetadataError(Exception):
+    pass
 
-    for dll in dll_files:
-        try:
-            asm = Reflection.Assembly.LoadFrom(os.path.join(directory, dll))
-            refs = [r.Name + ".dll" for r in asm.GetReferencedAssemblies()]
-            dep_map[dll] = refs
-        except:
-            dep_map[dll] = []
 
-    return dep_map
+TBL_MODULE = 0x00
+TBL_TYPEREF = 0x01
+TBL_TYPEDEF = 0x02
+TBL_FIELDPTR = 0x03
+TBL_FIELD = 0x04
+TBL_METHODPTR = 0x05
+TBL_METHODDEF = 0x06
+TBL_PARAMPTR = 0x07
+TBL_PARAM = 0x08
+TBL_INTERFACEIMPL = 0x09
+TBL_MEMBERREF = 0x0A
+TBL_CUSTOMATTRIBUTE = 0x0C
+TBL_PROPERTYMAP = 0x15
+TBL_PROPERTYPTR = 0x16
+TBL_PROPERTY = 0x17
+TBL_METHODSEMANTICS = 0x18
+TBL_TYPESPEC = 0x1B
+TBL_ASSEMBLY = 0x20
+TBL_ASSEMBLYREF = 0x23
+TBL_EXPORTEDTYPE = 0x27
+TBL_NESTEDCLASS = 0x29
+TBL_GENERICPARAM = 0x2A
+TBL_GENERICPARAMCONSTRAINT = 0x2C
 
+# Coded index kinds: (tag bits, tables in tag order)
+CODED_INDEXES = {
+    'TypeDefOrRef': (2, (0x02, 0x01, 0x1B)),
+    'HasConstant': (2, (0x04, 0x08, 0x17)),
+    'HasCustomAttribute': (5, (0x06, 0x04, 0x01, 0x02, 0x08, 0x09, 0x0A, 0x00, 0x0E, 0x17, 0x14,
+                               0x11, 0x1A, 0x1B, 0x20, 0x23, 0x26, 0x27, 0x28, 0x2A, 0x2C, 0x2B)),
+    'HasFieldMarshal': (1, (0x04, 0x08)),
+    'HasDeclSecurity': (2, (0x02, 0x06, 0x20)),
+    'MemberRefParent': (3, (0x02, 0x01, 0x1A, 0x06, 0x1B)),
+    'HasSemantics': (1, (0x14, 0x17)),
+    'MethodDefOrRef': (1, (0x06, 0x0A)),
+    'MemberForwarded': (1, (0x04, 0x06)),
+    'Implementation': (2, (0x26, 0x23, 0x27)),
+    'CustomAttributeType': (3, (None, None, 0x06, 0x0A, None)),
+    'ResolutionScope': (2, (0x00, 0x1A, 0x23, 0x01)),
+    'TypeOrMethodDef': (1, (0x02, 0x06)),
+}
 
-# ============================================================
-# INSPECT
-# ============================================================
+# Table layouts (ECMA-335 II.22). Column kinds: 1/2/4 = fixed width,
+# S/G/B = #Strings/#GUID/#Blob index, T:xx = table index, C:Name = coded index.
+TABLE_SCHEMAS = {
+    0x00: ('2', 'S', 'G', 'G', 'G'),
+    0x01: ('C:ResolutionScope', 'S', 'S'),
+    0x02: ('4', 'S', 'S', 'C:TypeDefOrRef', 'T:04', 'T:06'),
+    0x03: ('T:04',),
+    0x04: ('2', 'S', 'B'),
+    0x05: ('T:06',),
+    0x06: ('4', '2', '2', 'S', 'B', 'T:08'),
+    0x07: ('T:08',),
+    0x08: ('2', '2', 'S'),
+    0x09: ('T:02', 'C:TypeDefOrRef'),
+    0x0A: ('C:MemberRefParent', 'S', 'B'),
+    0x0B: ('1', '1', 'C:HasConstant', 'B'),
+    0x0C: ('C:HasCustomAttribute', 'C:CustomAttributeType', 'B'),
+    0x0D: ('C:HasFieldMarshal', 'B'),
+    0x0E: ('2', 'C:HasDeclSecurity', 'B'),
+    0x0F: ('2', '4', 'T:02'),
+    0x10: ('4', 'T:04'),
+    0x11: ('B',),
+    0x12: ('T:02', 'T:14'),
+    0x13: ('T:14',),
+    0x14: ('2', 'S', 'C:TypeDefOrRef'),
+    0x15: ('T:02', 'T:17'),
+    0x16: ('T:17',),
+    0x17: ('2', 'S', 'B'),
+    0x18: ('2', 'T:06', 'C:HasSemantics'),
+    0x19: ('T:02', 'C:MethodDefOrRef', 'C:MethodDefOrRef'),
+    0x1A: ('S',),
+    0x1B: ('B',),
+    0x1C: ('2', 'C:MemberForwarded', 'S', 'T:1A'),
+    0x1D: ('4', 'T:04'),
+    0x1E: ('4', '4'),
+    0x1F: ('4',),
+    0x20: ('4', '2', '2', '2', '2', '4', 'B', 'S', 'S'),
+    0x21: ('4',),
+    0x22: ('4', '4', '4'),
+    0x23: ('2', '2', '2', '2', '4', 'B', 'S', 'S', 'B'),
+    0x24: ('4', 'T:23'),
+    0x25: ('4', '4', '4', 'T:23'),
+    0x26: ('4', 'S', 'B'),
+    0x27: ('4', '4', 'S', 'S', 'C:Implementation'),
+    0x28: ('4', '4', 'S', 'C:Implementation'),
+    0x29: ('T:02', 'T:02'),
+    0x2A: ('2', '2', 'C:TypeOrMethodDef', 'S'),
+    0x2B: ('C:MethodDefOrRef', 'B'),
+    0x2C: ('T:2A', 'C:TypeDefOrRef'),
+}
 
-def inspect_dll(dll_path, search_term=None, member_filter=None,
-                ext_mode=False, deep_mode=False, exact_mode=False):
+# Signature element types that map straight onto a System.* type name
+ELEMENT_TYPE_NAMES = {
+    0x01: 'Void', 0x02: 'Boolean', 0x03: 'Char', 0x04: 'SByte', 0x05: 'Byte',
+    0x06: 'Int16', 0x07: 'UInt16', 0x08: 'Int32', 0x09: 'UInt32', 0x0A: 'Int64',
+    0x0B: 'UInt64', 0x0C: 'Single', 0x0D: 'Double', 0x0E: 'String',
+    0x16: 'TypedReference', 0x18: 'IntPtr', 0x19: 'UIntPtr', 0x1C: 'Object',
+}
 
-    results = []
-    version = "Unknown"
+# Type nodes produced by the signature decoder:
+#   ('N', namespace, path, assembly, generic_args)  named type, path is "Outer+Inner" for nested types
+#   ('V', name, index) / ('M', name, index)        type / method generic parameter
+#   ('S', inner, suffix)                             array, pointer or by-ref ("[]", "[,]", "*", "&")
+PRIMITIVE_NODES = dict((et, ('N', 'System', n, None, ())) for et, n in ELEMENT_TYPE_NAMES.items())
 
-    try:
-        import System.Reflection as Reflection
-        from System.Reflection import ReflectionTypeLoadException
 
-        assembly = Reflection.Assembly.LoadFrom(os.path.abspath(dll_path))
-        version = assembly.GetName().Version
+def read_compressed(blob, pos):
+    b = blob[pos]
+    if b < 0x80:
+        return b, pos + 1
+    if b < 0xC0:
+        return ((b & 0x3F) << 8) | blob[pos + 1], pos + 2
+    return ((b & 0x1F) << 24) | (blob[pos + 1] << 16) | (blob[pos + 2] << 8) | blob[pos + 3], pos + 4
 
+
+class MetadataReader:
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
         try:
-            types = assembly.GetTypes()
-        except ReflectionTypeLoadException as e:
-            types = [t for t in e.Types if t is not None]
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise MetadataError("empty file")
+        try:
+            self._parse_headers()
+        except (struct.error, IndexError, KeyError):
+            self.close()
+            raise MetadataError("corrupt or truncated image")
+        except MetadataError:
+            self.close()
+            raise
 
-        for t in types:
-            if not t.IsPublic:
-                continue
+        self._strings = {}
+        self._rows = {}
+        self._typedef_nodes = {}
+        self._typeref_nodes = {}
+        self._typespec_nodes = {}
+        self._type_index = None
+        self._generic_params = None
+        self._generic_constraints = None
+        self._property_map = None
+        self._semantics = None
+        self._interfaces = None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    # --- PE / metadata root ---
+
+    def _parse_headers(self):
+        mm = self._map
+        if mm[:2] != b'MZ':
+            raise MetadataError("not a PE image")
+        pe = struct.unpack_from('<I', mm, 0x3C)[0]
+        if mm[pe:pe + 4] != b'PE\0\0':
+            raise MetadataError("not a PE image")
+        nsections, opt_size = struct.unpack_from('<2xH12xH', mm, pe + 4)
+        opt = pe + 24
+        magic = struct.unpack_from('<H', mm, opt)[0]
+        dirs = opt + (96 if magic == 0x10B else 112)
+        if struct.unpack_from('<I', mm, dirs - 4)[0] < 15:
+            raise MetadataError("not a .NET assembly")
+
+        self._sections = [struct.unpack_from('<8xIIII', mm, opt + opt_size + 40 * i)
+                          for i in range(nsections)]
+
+        cli_rva = struct.unpack_from('<I', mm, dirs + 14 * 8)[0]
+        if not cli_rva:
+            raise MetadataError("not a .NET assembly")
+        md_rva = struct.unpack_from('<I', mm, self._offset(cli_rva) + 8)[0]
+        md = self._offset(md_rva)
+        if struct.unpack_from('<I', mm, md)[0] != 0x424A5342:
+            raise MetadataError("bad metadata signature")
+
+        pos = md + 16 + struct.unpack_from('<I', mm, md + 12)[0]
+        nstreams = struct.unpack_from('<H', mm, pos + 2)[0]
+        pos += 4
+        streams = {}
+        for _ in range(nstreams):
+            off, size = struct.unpack_from('<II', mm, pos)
+            end = mm.find(b'\0', pos + 8)
+            streams[mm[pos + 8:end].decode('ascii')] = (md + off, size)
+            pos += 8 + ((end - pos - 8 + 4) & ~3)
+
+        self._str_off, self._str_size = streams['#Strings']
+        self._blob_off = streams.get('#Blob', (0, 0))[0]
+        self._guid_off = streams.get('#GUID', (0, 0))[0]
+        self._parse_tables(streams['#~'][0] if '#~' in streams else streams['#-'][0])
 
-            type_full = "{ns}.{name}".format(ns=t.Namespace, name=t.Name)
+    def _offset(self, rva):
+        for vsize, vaddr, raw_size, raw_ptr in self._sections:
+            if vaddr <= rva < vaddr + max(vsize, raw_size):
+                return rva - vaddr + raw_ptr
+        raise MetadataError("RVA 0x{r:x} outside all sections".format(r=rva))
 
-            if not exact_or_contains(type_full, search_term, exact_mode):
+    def _parse_tables(self, pos):
+        mm = self._map
+        heap_sizes = mm[pos + 6]
+        valid = struct.unpack_from('<Q', mm, pos + 8)[0]
+        pos += 24
+        self.row_counts = [0] * 64
+        for i in range(64):
+            if valid >> i & 1:
+                self.row_counts[i] = struct.unpack_from('<I', mm, pos)[0]
+                pos += 4
+        if heap_sizes & 0x40:
+            pos += 4
+
+        counts = self.row_counts
+        widths = {
+            'S': 4 if heap_sizes & 0x01 else 2,
+            'G': 4 if heap_sizes & 0x02 else 2,
+            'B': 4 if heap_sizes & 0x04 else 2,
+        }
+        for name, (bits, tables) in CODED_INDEXES.items():
+            largest = max(counts[t] for t in tables if t is not None)
+            widths['C:' + name] = 2 if largest < (1 << (16 - bits)) else 4
+
+        self._tables = {}
+        for table in range(64):
+            if not counts[table]:
                 continue
+            schema = TABLE_SCHEMAS.get(table)
+            if schema is None:
+                # Every table up to 0x2C is known, so an unknown one (added by a later
+                # runtime) is stored after all the tables read here: no need to size it
+                break
+            fmt = '<'
+            for kind in schema:
+                if kind in ('1', '2', '4'):
+                    w = int(kind)
+                elif kind.startswith('T:'):
+                    w = 2 if counts[int(kind[2:], 16)] < 0x10000 else 4
+                else:
+                    w = widths[kind]
+                fmt += {1: 'B', 2: 'H', 4: 'I'}[w]
+            row = struct.Struct(fmt)
+            self._tables[table] = (pos, row)
+            pos += row.size * counts[table]
 
-            flags = (Reflection.BindingFlags.Public |
-                     Reflection.BindingFlags.Instance |
-                     Reflection.BindingFlags.Static |
-                     Reflection.BindingFlags.FlattenHierarchy)
+    # --- heaps / tables ---
 
-            temp_items = []
+    def rows(self, table):
+        rows = self._rows.get(table)
+        if rows is None:
+            if table in self._tables:
+                pos, row = self._tables[table]
+                rows = list(row.iter_unpack(self._map[pos:pos + row.size * self.row_counts[table]]))
+            else:
+                rows = []
+            self._rows[table] = rows
+        return rows
 
-            if deep_mode:
-                for f in t.GetFields(flags):
-                    if exact_or_contains(f.Name, member_filter, exact_mode):
-                        prefix = "[ST] " if f.IsStatic else ""
-                        temp_items.append("  [F] {p}{ft} {n}".format(
-                            p=prefix, ft=format_type_name(f.FieldType), n=f.Name))
+    def strings_heap(self):
+        return self._map[self._str_off:self._str_off + self._str_size]
 
-            for m in t.GetMethods(flags):
-                if m.IsSpecialName:
-                    continue
-                if exact_or_contains(m.Name, member_filter, exact_mode):
-                    params = ", ".join(
-                        "{t} {n}".format(t=format_type_name(p.ParameterType), n=p.Name)
-                        for p in m.GetParameters()
-                    )
-                    prefix = "[ST] " if m.IsStatic else ""
-                    temp_items.append("  - {p}{rt} {n}({params})".format(
-                        p=prefix, rt=format_type_name(m.ReturnType), n=m.Name, params=params))
+    def string(self, idx):
+        s = self._strings.get(idx)
+        if s is None:
+            start = self._str_off + idx
+            s = self._map[start:self._map.find(b'\0', start)].decode('utf-8', 'replace')
+            self._strings[idx] = s
+        return s
 
-            if ext_mode or deep_mode:
-                for p in t.GetProperties(flags):
-                    if exact_or_contains(p.Name, member_filter, exact_mode):
-                        prefix = "[ST] " if any(a.IsStatic for a in p.GetAccessors()) else ""
-                        temp_items.append("  [P] {p}{pt} {n}".format(
-                            p=prefix, pt=format_type_name(p.PropertyType), n=p.Name))
-
-            if temp_items:
-                t_type = "Struct" if t.IsValueType else "Class"
-                base_info = " : {n}".format(n=t.BaseType.Name) if t.BaseType and t.BaseType.Name != "Object" else ""
-                results.append("\n[NS: {ns}] -> {tt}: {tn}{bi}".format(
-                    ns=t.Namespace, tt=t_type, tn=t.Name, bi=base_info))
-                results.extend(temp_items)
-
-    except:
-        pass
+    def blob(self, idx):
+        length, pos = read_compressed(self._map, self._blob_off + idx)
+        return self._map[pos:pos + length]
 
-    return version, results
+    def guid(self, idx):
+        if not idx:
+            return None
+        off = self._guid_off + (idx - 1) * 16
+        return str(uuid.UUID(bytes_le=self._map[off:off + 16]))
 
+    @staticmethod
+    def decode_coded(kind, value):
+        bits, tables = CODED_INDEXES[kind]
+        return tables[value & ((1 << bits) - 1)], value >> bits
 
-# ============================================================
-# CLEAR
-# ============================================================
+    def _list_range(self, table, row, column, target, ptr_table):
+        rows = self.rows(table)
+        start = rows[row - 1][column]
+        end = rows[row][column] if row < len(rows) else self.row_counts[target] + 1
+        if self.row_counts[ptr_table]:
+            ptrs = self.rows(ptr_table)
+            return [ptrs[i - 1][0] for i in range(start, end)]
+        return range(start, end)
 
-def do_clear():
-    log_dir_full = os.path.join(script_dir, cfg['log_dir'])
-    if not os.path.exists(log_dir_full):
-        print("[--clear] Log directory does not exist: {d}".format(d=log_dir_full))
-        return
-    count = 0
-    for fname in os.listdir(log_dir_full):
-        fpath = os.path.join(log_dir_full, fname)
-        if os.path.isfile(fpath):
-            os.remove(fpath)
-            count += 1
-    # Optionally remove the directory itself if empty
-    try:
-        os.rmdir(log_dir_full)
-        print("[--clear] Removed {c} file(s) and deleted directory: {d}".format(c=count, d=log_dir_full))
-    except OSError:
-        print("[--clear] Removed {c} file(s) from: {d}".format(c=count, d=log_dir_full))
+    # --- assembly identity ---
 
+    @property
+    def assembly_name(self):
+        asm = self.rows(TBL_ASSEMBLY)
+        if asm:
+            return self.string(asm[0][7])
+        return os.path.splitext(os.path.basename(self.path))[0]
 
-# ============================================================
-# MAIN
-# ============================================================
+    @property
+    def version(self):
+        asm = self.rows(TBL_ASSEMBLY)
+        if not asm:
+            return "Unknown"
+        return "{0}.{1}.{2}.{3}".format(*asm[0][1:5])
 
-def main():
+    @property
+    def mvid(self):
+        return self.guid(self.rows(TBL_MODULE)[0][2])
 
-    args = sys.argv[1:]
-    joined = " ".join(args)
+    def assembly_refs(self):
+        return [self.string(r[6]) for r in self.rows(TBL_ASSEMBLYREF)]
 
-    # --- HELP VARIANTS ---
-    if "--help:rules:pb" in args:
-        print(HELP_RULES_PB)
-        return
+    # --- types ---
 
-    if "--help:rules:plugin" in args:
-        print(HELP_RULES_PLUGIN)
-        return
+    def typedef(self, row):
+        return self.rows(TBL_TYPEDEF)[row - 1]
 
-    if "--help:rules:mod" in args:
-        print(HELP_RULES_MOD)
-        return
+    def typedef_node(self, row):
+        node = self._typedef_nodes.get(row)
+        if node is None:
+            ns, path = self._typedef_names()[row - 1]
+            node = ('N', ns, path, self.assembly_name, ())
+            self._typedef_nodes[row] = node
+        return node
 
-    if "--help:extend" in args:
-        print(HELP_EXTENDED)
-        return
+    def _typedef_names(self):
+        if self._type_index is None:
+            enclosing = dict(self.rows(TBL_NESTEDCLASS))
+            names = []
+            for row, td in enumerate(self.rows(TBL_TYPEDEF), start=1):
+                path = self.string(td[1])
+                ns = self.string(td[2])
+                outer = enclosing.get(row)
+                while outer:
+                    otd = self.typedef(outer)
+                    path = self.string(otd[1]) + '+' + path
+                    ns = self.string(otd[2])
+                    outer = enclosing.get(outer)
+                names.append((ns, path))
+            self._type_index = names
+            self._type_lookup = dict((n, i) for i, n in enumerate(names, start=1))
+        return self._type_index
 
-    if "-h" in args or "--help" in args:
-        print(HELP_SHORT)
-        return
+    def find_typedef(self, ns, path):
+        self._typedef_names()
+        return self._type_lookup.get((ns, path))
 
-    # --- CLEAR ---
-    if "--clear" in args:
-        do_clear()
-        return
+    def find_forwarder(self, ns, path):
+        # ExportedType rows pointing at another assembly (type forwarders)
+        if '+' in path:
+            return None
+        for flags, _, name, tns, impl in self.rows(TBL_EXPORTEDTYPE):
+            if self.string(name) == path and self.string(tns) == ns:
+                table, row = self.decode_coded('Implementation', impl)
+                if table == TBL_ASSEMBLYREF and row:
+                    return self.string(self.rows(TBL_ASSEMBLYREF)[row - 1][6])
+        return None
 
-    # --- PARSE STANDARD FLAGS ---
-    ext_mode   = "-e" in args
-    deep_mode  = "-d" in args
-    exact_mode = "-x" in args
-    scan_all   = "-a" in args
-    deps_mode  = "--deps" in args
-    use_default = "-y" in args
-    open_vscode = "-o" in args
+    def typeref_node(self, row):
+        node = self._typeref_nodes.get(row)
+        if node is None:
+            scope, name, ns = self.rows(TBL_TYPEREF)[row - 1]
+            table, srow = self.decode_coded('ResolutionScope', scope)
+            path = self.string(name)
+            ns = self.string(ns)
+            asm = self.assembly_name
+            if table == TBL_ASSEMBLYREF and srow:
+                asm = self.string(self.rows(TBL_ASSEMBLYREF)[srow - 1][6])
+            elif table == TBL_TYPEREF and srow:
+                outer = self.typeref_node(srow)
+                ns, path, asm = outer[1], outer[2] + '+' + path, outer[3]
+            node = ('N', ns, path, asm, ())
+            self._typeref_nodes[row] = node
+        return node
 
-    search_term  = args[args.index("-s") + 1] if "-s" in args and args.index("-s") + 1 < len(args) else None
-    member_filter = args[args.index("-f") + 1] if "-f" in args and args.index("-f") + 1 < len(args) else None
+    def type_from_coded(self, value, tvars=(), mvars=()):
+        table, row = self.decode_coded('TypeDefOrRef', value)
+        if not row:
+            return None
+        if table == TBL_TYPEDEF:
+            return self.typedef_node(row)
+        if table == TBL_TYPEREF:
+            return self.typeref_node(row)
+        sig = self.blob(self.rows(TBL_TYPESPEC)[row - 1][0])
+        return self.decode_type(sig, 0, tvars, mvars)[0]
 
-    print("--- .NET DLL Inspector v{v} ---".format(v=VERSION))
+    def interface_impls(self, row):
+        # TypeDefOrRef values of the interfaces a typedef lists directly
+        if self._interfaces is None:
+            self._interfaces = {}
+            for cls, iface in self.rows(TBL_INTERFACEIMPL):
+                self._interfaces.setdefault(cls, []).append(iface)
+        return self._interfaces.get(row, ())
 
-    # Print active param summary
-    print_active_params(args, cfg, search_term, member_filter)
+    def generic_param_names(self, table, row):
+        if self._generic_params is None:
+            params = {}
+            for number, _, owner, name in self.rows(TBL_GENERICPARAM):
+                params.setdefault(self.decode_coded('TypeOrMethodDef', owner), []).append(
+                    (number, self.string(name)))
+            self._generic_params = dict((k, [n for _, n in sorted(v)]) for k, v in params.items())
+        return self._generic_params.get((table, row), ())
 
-    target_dir = os.path.abspath(cfg['path']) if use_default else input("Path: ").strip()
+    def generic_param_constraints(self, table, row, number):
+        # (flags, TypeDefOrRef values of the constraints) of one generic parameter of a type or method
+        if self._generic_constraints is None:
+            params = {}
+            for gp, (n, flags, owner, _) in enumerate(self.rows(TBL_GENERICPARAM), start=1):
+                params[gp] = self.decode_coded('TypeOrMethodDef', owner) + (n, flags)
+            constraints = dict((key, (key[3], [])) for key in params.values())
+            for gp, value in self.rows(TBL_GENERICPARAMCONSTRAINT):
+                if gp in params:
+                    constraints[params[gp]][1].append(value)
+            self._generic_constraints = dict((key[:3], value) for key, value in constraints.items())
+        return self._generic_constraints.get((table, row, number), (0, ()))
 
-    if not os.path.isdir(target_dir):
-        print("Invalid directory.")
-        return
+    # --- members ---
 
-    all_dlls = [f for f in os.listdir(target_dir) if f.lower().endswith(".dll")]
-    detected = detect_keywords_from_directory(all_dlls)
-    print('Found Keywords: "{kw}"'.format(kw=",".join(detected)))
-
-    dll_files = all_dlls if scan_all else [
-        f for f in all_dlls
-        if any(k.lower() in f.lower() for k in cfg['keywords'])
-    ]
-
-    if deps_mode:
-        dep_map = build_dependency_map(target_dir, dll_files)
-        print("\nDEPENDENCIES:\n")
-        for dll, refs in dep_map.items():
-            print(dll)
-            for r in refs:
-                if r in dll_files:
-                    print("  -> {r}".format(r=r))
-        return
+    def field_rows(self, type_row):
+        return self._list_range(TBL_TYPEDEF, type_row, 4, TBL_FIELD, TBL_FIELDPTR)
 
-    log_dir_full = os.path.join(script_dir, cfg['log_dir'])
-    if not os.path.exists(log_dir_full):
-        os.makedirs(log_dir_full)
+    def method_rows(self, type_row):
+        return self._list_range(TBL_TYPEDEF, type_row, 5, TBL_METHODDEF, TBL_METHODPTR)
 
-    log_path = get_timestamp_log_path(log_dir_full, search_term, member_filter)
+    def param_names(self, method_row):
+        names = {}
+        params = self.rows(TBL_PARAM)
+        for p in self._list_range(TBL_METHODDEF, method_row, 5, TBL_PARAM, TBL_PARAMPTR):
+            _, seq, name = params[p - 1]
+            names[seq] = self.string(name)
+        return names
 
-    total_matches = 0
+    def property_rows(self, type_row):
+        if self._property_map is None:
+            self._property_map = dict((parent, i) for i, (parent, _) in
+                                      enumerate(self.rows(TBL_PROPERTYMAP), start=1))
+        map_row = self._property_map.get(type_row)
+        if map_row is None:
+            return ()
+        return self._list_range(TBL_PROPERTYMAP, map_row, 1, TBL_PROPERTY, TBL_PROPERTYPTR)
 
-    with open(log_path, "w", encoding="utf-8") as f:
-        f.write("REPORT: {d}\nSEARCH: {s} | FILTER: {mf}\n".format(
-            d=target_dir, s=search_term, mf=member_filter))
-        f.write("=" * 60 + "\n")
+    def property_accessors(self, property_row):
+        if self._semantics is None:
+            semantics = {}
+            for _, method, assoc in self.rows(TBL_METHODSEMANTICS):
+                table, row = self.decode_coded('HasSemantics', assoc)
+                if table == TBL_PROPERTY:
+                    semantics.setdefault(row, []).append(method)
+            self._semantics = semantics
+        return self._semantics.get(property_row, ())
 
-        for index, dll in enumerate(dll_files, start=1):
-            print("\r[{i}/{t}] Analyzing {dll}".format(
-                i=index, t=len(dll_files), dll=dll[:30].ljust(30)), end="", flush=True)
-
-            version, matches = inspect_dll(
-                os.path.join(target_dir, dll),
-                search_term,
-                member_filter,
-                ext_mode,
-                deep_mode,
-                exact_mode
-            )
-
-            if matches:
-                total_matches += 1
-                f.write("\nFILE: {dll} (v{v})\n".format(dll=dll, v=version))
-                f.write("-" * 60 + "\n")
-                f.write("\n".join(matches) + "\n")
+    # --- signatures ---
 
-        if total_matches == 0:
-            f.write("\nNo results found.\n")
+    def decode_type(self, sig, pos, tvars=(), mvars=()):
+        et = sig[pos]
+        pos += 1
+        while et in (0x1F, 0x20, 0x45):
+            if et != 0x45:
+                _, pos = read_compressed(sig, pos)
+            et = sig[pos]
+            pos += 1
 
-    if total_matches == 0:
-        print("\n\n[!] No results found. (Log: {f})".format(f=os.path.basename(log_path)))
-    else:
-        print("\n\nDONE! {n} file(s) matched.".format(n=total_matches))
-        print("Results saved: {f}".format(f=os.path.basename(log_path)))
+        node = PRIMITIVE_NODES.get(et)
+        if node is not None:
+            return node, pos
+        if et in (0x11, 0x12):
+            value, pos = read_compressed(sig, pos)
+            return self.type_from_coded(value, tvars, mvars), pos
+        if et == 0x15:
+            value, pos = read_compressed(sig, pos + 1)
+            generic = self.type_from_coded(value, tvars, mvars)
+            count, pos = read_compressed(sig, pos)
+            args = []
+            for _ in range(count):
+                arg, pos = self.decode_type(sig, pos, tvars, mvars)
+                args.append(arg)
+            return generic[:4] + (tuple(args),), pos
+        if et in (0x13, 0x1E):
+            n, pos = read_compressed(sig, pos)
+            names = tvars if et == 0x13 else mvars
+            name = names[n] if n < len(names) else ('!' if et == 0x13 else '!!') + str(n)
+            return ('V' if et == 0x13 else 'M', name, n), pos
+        if et in (0x0F, 0x10, 0x1D):
+            inner, pos = self.decode_type(sig, pos, tvars, mvars)
+            return ('S', inner, {0x0F: '*', 0x10: '&', 0x1D: '[]'}[et]), pos
+        if et == 0x14:
+            inner, pos = self.decode_type(sig, pos, tvars, mvars)
+            rank, pos = read_compressed(sig, pos)
+            for _ in range(2):
+                count, pos = read_compressed(sig, pos)
+                for _ in range(count):
+                    _, pos = read_compressed(sig, pos)
+            return ('S', inner, '[*]' if rank == 1 else '[' + ',' * (rank - 1) + ']'), pos
+        if et == 0x1B:
+            _, _, pos = self.decode_method_sig(sig, tvars, mvars, pos)
+            return PRIMITIVE_NODES[0x18], pos
+        raise MetadataError("unsupported signature element 0x{e:02x}".format(e=et))
 
-    if open_vscode:
-        vscode_cmd = cfg['vscode_path']
-        if os.path.exists(vscode_cmd):
-            subprocess.run([vscode_cmd, log_path], shell=True)
+    def decode_method_sig(self, sig, tvars=(), mvars=(), pos=0):
+        conv = sig[pos]
+        pos += 1
+        if conv & 0x10:
+            _, pos = read_compressed(sig, pos)
+        count, pos = read_compressed(sig, pos)
+        ret, pos = self.decode_type(sig, pos, tvars, mvars)
+        params = []
+        for _ in range(count):
+            if sig[pos] == 0x41:
+                pos += 1
+            p, pos = self.decode_type(sig, pos, tvars, mvars)
+            params.append(p)
+        return ret, params, pos
+
+    def decode_field_sig(self, sig, tvars=()):
+        return self.decode_type(sig, 1, tvars)[0]
+
+    def decode_property_sig(self, sig, tvars=()):
+        count, pos = read_compressed(sig, 1)
+        prop_type, pos = self.decode_type(sig, pos, tvars)
+        params = []
+        for _ in range(count):
+            p, pos = self.decode_type(sig, pos, tvars)
+            params.append(p)
+        return prop_type, params
+
+
+def node_raw_name(node):
+    kind = node[0]
+    if kind == 'N':
+        return node[2].rsplit('+', 1)[-1]
+    if kind == 'S':
+        return node_raw_name(node[1]) + node[2]
+    return node[1]
+
+
+def node_full_name(node):
+    # Namespace.Name as Type.Namespace + Type.Name report it (generic arity kept, no arguments)
+    return node[1] + '.' + node_raw_name(node) if node[1] else node_raw_name(node)
+
+
+def node_key(node):
+    kind = node[0]
+    if kind == 'N':
+        key = node[1] + '.' + node[2]
+        if node[4]:
+            key += '<' + ','.join(node_key(a) for a in node[4]) + '>'
+        return key
+    if kind == 'S':
+        return node_key(node[1]) + node[2]
+    return ('!' if kind == 'V' else '!!') + str(node[2])
+
+
+def substitute_node(node, targs):
+    if not targs:
+        return node
+    kind = node[0]
+    if kind == 'V':
+        return targs[node[2]] if node[2] < len(targs) else node
+    if kind == 'N' and node[4]:
+        return node[:4] + (tuple(substitute_node(a, targs) for a in node[4]),)
+    if kind == 'S':
+        return ('S', substitute_node(node[1], targs), node[2])
+    return node
+
+
+_node_names = {}
+
+
+def format_node(node):
+    # Mirrors format_type_name() so both backends produce identical lines
+    text = _node_names.get(node)
+    if text is not None:
+        TYPE_NAME_STATS.hits += 1
+    else:
+        TYPE_NAME_STATS.misses += 1
+        name = node_raw_name(node)
+        if name in TYPE_ALIASES:
+            text = TYPE_ALIASES[name]
+        elif '`' in name:
+            # Like Type.GetGenericArguments() on arrays/by-refs, take the element's arguments
+            inner = node
+            while inner[0] == 'S':
+                inner = inner[1]
+            args = inner[4] if inner[0] == 'N' else ()
+            text = "{base}<{args}>".format(
+                base=name.split('`')[0], args=', '.join(format_node(a) for a in args))
         else:
-            os.startfile(log_path)
+            text = name
+        _node_names[node] = text
+    return text
+
+
+class MetadataResolver:
+
+    CORE_LIBRARIES = ("System.Private.CoreLib", "mscorlib", "netstandard", "System.Runtime")
+
+    def __init__(self):
+        self.search_dirs = []
+        self._by_path = {}
+        self._by_name = {}
+
+    def open_path(self, path):
+        path = os.path.abspath(path)
+        reader = self._by_path.get(path)
+        if reader is None:
+            reader = MetadataReader(path)
+            self._by_path[path] = reader
+            self._by_name.setdefault(reader.assembly_name.lower(), reader)
+            directory = os.path.dirname(path)
+            if directory not in self.search_dirs:
+                self.search_dirs.append(directory)
+        return reader
+
+    def open_assembly(self, name):
+        key = name.lower()
+        if key in self._by_name:
+            return self._by_name[key]
+        reader = None
+        for directory in self.search_dirs:
+            for ext in (".dll", ".exe"):
+                candidate = os.path.join(directory, name + ext)
+                if os.path.isfile(candidate):
+                    try:
+                        reader = self.open_path(candidate)
+                    except (OSError, MetadataError):
+                        reader = None
+                    break
+            if reader is not None:
+                break
+        self._by_name[key] = reader
+        return reader
+
+    def resolve(self, node, _depth=0):
+        # Returns (reader, typedef row) for a named type node, following forwarders
+        if node[0] != 'N' or _depth > 8:
+            return None
+        names = (node[3],) if node[3] else self.CORE_LIBRARIES
+        for asm in names:
+            reader = self.open_assembly(asm)
+            if reader is None:
+                continue
+            row = reader.find_typedef(node[1], node[2])
+            if row:
+                return reader, row
+            target = reader.find_forwarder(node[1], node[2])
+            if target:
+                return self.resolve(node[:3] + (target,) + node[4:], _depth + 1)
+        return None
+
+    def close(self):
+        for reader in self._by_path.values():
+            reader.close()
+        self._by_path.clear()
+        self._by_name.clear()
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+
+TypeInfo = namedtuple('TypeInfo', 'namespace name is_value_type base_name')
+MemberRecord = namedtuple('MemberRecord', 'kind name is_static type_name params')
+# With --declared, members holds only what the type declares itself and base is an Ancestor
+# the other `inherited` matching members come from; Ancestor entries are shared by all subclasses.
+# With --attr, attributes holds (member key or None for the type, attribute text) pairs.
+# With --with-ext, extensions holds (declaring type, dll, MemberRecord) for each extension method.
+TypeMatch = namedtuple('TypeMatch', 'info members inherited base attributes extensions', defaults=(0, None, (), ()))
+Ancestor = namedtuple('Ancestor', 'info members inherited base')
+
+BACKENDS = ('clr', 'meta')
+DEFAULT_BACKEND = 'clr' if HAS_CLR else 'meta'
+
+
+def format_member(rec):
+    prefix = "[ST] " if rec.is_static else ""
+    if rec.kind == 'F':
+        return "  [F] {p}{ft} {n}".format(p=prefix, ft=rec.type_name, n=rec.name)
+    if rec.kind == 'P':
+        return "  [P] {p}{pt} {n}".format(p=prefix, pt=rec.type_name, n=rec.name)
+    params = ", ".join("{t} {n}".format(t=t, n=n) for t, n in rec.params)
+    return "  - {p}{rt} {n}({params})".format(p=prefix, rt=rec.type_name, n=rec.name, params=params)
+
+
+def type_full_name(info):
+    return "{ns}.{n}".format(ns=info.namespace, n=info.name) if info.namespace else info.name
+
+
+class TypeMembers:
+    # Per-type record lists, each kind filled on first use
+    __slots__ = ('fields', 'methods', 'properties')
+
+    def __init__(self):
+        self.fields = None
+        self.methods = None
+        self.properties = None
+
+
+class ClrBackend:
+
+    name = 'clr'
+
+    def __init__(self):
+        import clr  # noqa: F401  (pythonnet)
+        import System.Reflection as Reflection
+        self._reflection = Reflection
+        self._flags = (Reflection.BindingFlags.Public |
+                       Reflection.BindingFlags.Instance |
+                       Reflection.BindingFlags.Static |
+                       Reflection.BindingFlags.FlattenHierarchy)
+        self._members = {}
+
+    def load(self, path):
+        return self._reflection.Assembly.LoadFrom(os.path.abspath(path))
+
+    def version(self, asm):
+        return asm.GetName().Version
+
+    def mvid(self, asm):
+        return str(asm.ManifestModule.ModuleVersionId)
+
+    def references(self, asm):
+        return [r.Name for r in asm.GetReferencedAssemblies()]
+
+    def public_types(self, asm):
+        try:
+            types = asm.GetTypes()
+        except self._reflection.ReflectionTypeLoadException as e:
+            types = [t for t in e.Types if t is not None]
+        return [t for t in types if t.IsPublic]
+
+    def type_info(self, t):
+        base = t.BaseType
+        return TypeInfo(t.Namespace, t.Name, t.IsValueType, base.Name if base else None)
+
+    def base_type(self, t):
+        # Generic bases in their open form, as the type itself is listed
+        base = t.BaseType
+        if base is not None and base.IsGenericType and not base.IsGenericTypeDefinition:
+            base = base.GetGenericTypeDefinition()
+        return base
+
+    def hierarchy(self, t):
+        # (base chain from the direct base up to System.Object, every implemented interface)
+        bases = []
+        base = t.BaseType
+        while base is not None:
+            bases.append(clr_full_name(base))
+            base = base.BaseType
+        return bases, sorted(set(clr_full_name(i) for i in t.GetInterfaces()))
+
+    def members(self, t):
+        # All public members of a type, read across the interop boundary once per type
+        cached = self._members.get(t)
+        if cached is not None:
+            MEMBER_CACHE_STATS.hits += 1
+            return cached
+        MEMBER_CACHE_STATS.misses += 1
+        cached = TypeMembers()
+        self._members[t] = cached
+        return cached
+
+    def fields(self, t, match):
+        entry = self.members(t)
+        if entry.fields is None:
+            entry.fields = [MemberRecord('F', f.Name, f.IsStatic, format_type_name(f.FieldType), None)
+                            for f in t.GetFields(self._flags)]
+        return [r for r in entry.fields if match(r.name)]
+
+    def methods(self, t, match):
+        entry = self.members(t)
+        if entry.methods is None:
+            entry.methods = []
+            for m in t.GetMethods(self._flags):
+                if m.IsSpecialName:
+                    continue
+                params = tuple((format_type_name(p.ParameterType), p.Name) for p in m.GetParameters())
+                entry.methods.append(MemberRecord('M', m.Name, m.IsStatic, format_type_name(m.ReturnType), params))
+        return [r for r in entry.methods if match(r.name)]
+
+    def properties(self, t, match):
+        entry = self.members(t)
+        if entry.properties is None:
+            entry.properties = []
+            for p in t.GetProperties(self._flags):
+                is_static = any(a.IsStatic for a in p.GetAccessors())
+                entry.properties.append(MemberRecord('P', p.Name, is_static, format_type_name(p.PropertyType), None))
+        return [r for r in entry.properties if match(r.name)]
+
+
+def clr_full_name(t):
+    return "{ns}.{n}".format(ns=t.Namespace, n=t.Name) if t.Namespace else t.Name
+
+
+def _object_members(value_type):
+    obj = ('System.Object',)
+    to_string = (MemberRecord('M', 'ToString', False, 'string', ()), ('ToString', ()), True, True)
+    equals = (MemberRecord('M', 'Equals', False, 'bool', (('Object', 'obj'),)), ('Equals', obj), True, True)
+    get_hash = (MemberRecord('M', 'GetHashCode', False, 'int', ()), ('GetHashCode', ()), True, True)
+    get_type = (MemberRecord('M', 'GetType', False, 'Type', ()), ('GetType', ()), False, False)
+    static_equals = (MemberRecord('M', 'Equals', True, 'bool', (('Object', 'objA'), ('Object', 'objB'))),
+                     ('Equals', obj * 2), False, False)
+    ref_equals = (MemberRecord('M', 'ReferenceEquals', True, 'bool', (('Object', 'objA'), ('Object', 'objB'))),
+                  ('ReferenceEquals', obj * 2), False, False)
+    if value_type:
+        methods = [equals, get_hash, to_string, get_type, static_equals, ref_equals]
+    else:
+        methods = [get_type, to_string, equals, static_equals, ref_equals, get_hash]
+    return [], methods, []
+
+
+# Used when System.Object / System.ValueType cannot be found next to the scanned DLLs
+FALLBACK_OBJECT_MEMBERS = _object_members(False)
+FALLBACK_VALUETYPE_MEMBERS = _object_members(True)
+
+
+class MetadataBackend:
+
+    name = 'meta'
+
+    def __init__(self):
+        self.resolver = MetadataResolver()
+        self._members = {}
+
+    def load(self, path):
+        return self.resolver.open_path(path)
+
+    def version(self, asm):
+        return asm.version
+
+    def mvid(self, asm):
+        return asm.mvid
+
+    def references(self, asm):
+        return asm.assembly_refs()
+
+    def public_types(self, asm):
+        return [(asm, row) for row, td in enumerate(asm.rows(TBL_TYPEDEF), start=1)
+                if td[0] & 0x7 == 0x1]
+
+    def base_node(self, reader, row, targs=()):
+        tvars = reader.generic_param_names(TBL_TYPEDEF, row)
+        base = reader.type_from_coded(reader.typedef(row)[3], tvars)
+        return substitute_node(base, targs) if base is not None else None
+
+    def type_info(self, t):
+        reader, row = t
+        node = reader.typedef_node(row)
+        base = self.base_node(reader, row)
+        is_value_type = (base is not None and base[1] == 'System' and base[2] in ('ValueType', 'Enum')
+                         and node[1:3] != ('System', 'Enum'))
+        return TypeInfo(node[1] or None, node_raw_name(node), is_value_type,
+                        node_raw_name(base) if base is not None else None)
+
+    def fields(self, t, match):
+        return [e[0] for e in self.collect_members(*t)[0] if match(e[0].name)]
+
+    def methods(self, t, match):
+        return [e[0] for e in self.collect_members(*t)[1] if match(e[0].name)]
+
+    def properties(self, t, match):
+        return [e[0] for e in self.collect_members(*t)[2] if match(e[0].name)]
+
+    def base_type(self, t):
+        # Direct base (generic ones in their open form), None when it is outside the resolvable DLLs
+        base = self.base_node(*t)
+        return self.resolver.resolve(base) if base is not None else None
+
+    def hierarchy(self, t):
+        reader, row = t
+        bases = []
+        interfaces = set()
+        current = (reader, row)
+        while current is not None and len(bases) < 64:
+            reader, row = current
+            tvars = reader.generic_param_names(TBL_TYPEDEF, row)
+            for value in reader.interface_impls(row):
+                self._collect_interfaces(reader.type_from_coded(value, tvars), interfaces)
+            base = self.base_node(reader, row)
+            if base is None:
+                break
+            bases.append(node_full_name(base))
+            current = self.resolver.resolve(base)
+            if current is None and bases[-1] != 'System.Object':
+                # Framework base outside the scanned folder; every class chain ends here
+                bases.append('System.Object')
+        return bases, sorted(interfaces)
+
+    def _collect_interfaces(self, node, found):
+        # The interface itself plus the interfaces it extends, like Type.GetInterfaces()
+        if node is None or node[0] != 'N' or node_full_name(node) in found:
+            return
+        found.add(node_full_name(node))
+        resolved = self.resolver.resolve(node)
+        if resolved is not None:
+            reader, row = resolved
+            tvars = reader.generic_param_names(TBL_TYPEDEF, row)
+            for value in reader.interface_impls(row):
+                self._collect_interfaces(reader.type_from_coded(value, tvars), found)
+
+    def collect_members(self, reader, row, targs=()):
+        # Public fields, methods and properties including the inherited ones,
+        # as (record, signature key, is_virtual, is_override) entries
+        key = (reader.path, row, targs)
+        cached = self._members.get(key)
+        if cached is not None:
+            return cached
+        self._members[key] = ([], [], [])
+
+        declared = self._declared_members(reader, row, targs)
+        fields, methods, props = declared
+
+        base = self.base_node(reader, row, targs)
+        if base is not None:
+            resolved = self.resolver.resolve(base)
+            if resolved is not None:
+                inherited = self.collect_members(resolved[0], resolved[1], base[4])
+            elif base[1] == 'System' and base[2] in ('ValueType', 'Enum'):
+                inherited = FALLBACK_VALUETYPE_MEMBERS
+            else:
+                inherited = FALLBACK_OBJECT_MEMBERS
+
+            fields.extend(inherited[0])
+            overrides = set(e[1] for e in methods if e[3])
+            methods.extend(e for e in inherited[1] if not (e[2] and e[1] in overrides))
+            # Properties hide by name and signature even without virtual/override
+            hidden = set(e[1] for e in props)
+            props.extend(e for e in inherited[2] if e[1] not in hidden)
+
+        self._members[key] = declared
+        return declared
+
+    def _declared_members(self, reader, row, targs):
+        tvars = reader.generic_param_names(TBL_TYPEDEF, row)
+        field_table = reader.rows(TBL_FIELD)
+        method_table = reader.rows(TBL_METHODDEF)
+        property_table = reader.rows(TBL_PROPERTY)
+        fields, methods, props = [], [], []
+
+        for f in reader.field_rows(row):
+            flags, name, sig = field_table[f - 1]
+            if flags & 0x7 != 0x6:
+                continue
+            try:
+                node = substitute_node(reader.decode_field_sig(reader.blob(sig), tvars), targs)
+            except (MetadataError, IndexError):
+                continue
+            fields.append((MemberRecord('F', reader.string(name), bool(flags & 0x10), format_node(node), None),
+                           None, False, False))
+
+        for m in reader.method_rows(row):
+            _, _, flags, name, sig, _ = method_table[m - 1]
+            if flags & 0x7 != 0x6 or flags & 0x800:
+                continue
+            mvars = reader.generic_param_names(TBL_METHODDEF, m)
+            try:
+                ret, params, _ = reader.decode_method_sig(reader.blob(sig), tvars, mvars)
+            except (MetadataError, IndexError):
+                continue
+            ret = substitute_node(ret, targs)
+            params = [substitute_node(p, targs) for p in params]
+            names = reader.param_names(m)
+            name = reader.string(name)
+            virtual = bool(flags & 0x40)
+            rec = MemberRecord('M', name, bool(flags & 0x10), format_node(ret),
+                               tuple((format_node(p), names.get(i, "")) for i, p in enumerate(params, start=1)))
+            methods.append((rec, (name, tuple(node_key(p) for p in params)),
+                            virtual, virtual and not flags & 0x100))
+
+        for p in reader.property_rows(row):
+            _, name, sig = property_table[p - 1]
+            accessors = [method_table[a - 1][2] for a in reader.property_accessors(p)]
+            public = [a for a in accessors if a & 0x7 == 0x6]
+            if not public:
+                continue
+            try:
+                node, params = reader.decode_property_sig(reader.blob(sig), tvars)
+            except (MetadataError, IndexError):
+                continue
+            node = substitute_node(node, targs)
+            params = [substitute_node(x, targs) for x in params]
+            name = reader.string(name)
+            virtual = any(a & 0x40 for a in accessors)
+            rec = MemberRecord('P', name, any(a & 0x10 for a in public), format_node(node), None)
+            props.append((rec, (name, rec.is_static, node_key(node), tuple(node_key(x) for x in params)),
+                          virtual, virtual and not any(a & 0x100 for a in accessors)))
+
+        return fields, methods, props
+
+    def close(self):
+        self.resolver.close()
+
+
+def get_backend(name):
+    if name == 'clr':
+        return ClrBackend()
+    return MetadataBackend()
+
+
+# ============================================================
+# CUSTOM ATTRIBUTES
+# ============================================================
+
+# Custom attribute blob element codes (ECMA-335 II.23.3): 0x50 = System.Type, 0x51 = boxed object,
+# 0x55 = enum, 0x1D = single-dimensional array
+ATTRIBUTE_CODES = dict((name, et) for et, name in ELEMENT_TYPE_NAMES.items() if 0x02 <= et <= 0x0E)
+ATTRIBUTE_CODES.update({'Type': 0x50, 'Object': 0x51})
+ATTRIBUTE_FORMATS = {0x02: '<?', 0x03: '<H', 0x04: '<b', 0x05: '<B', 0x06: '<h', 0x07: '<H', 0x08: '<i',
+                     0x09: '<I', 0x0A: '<q', 0x0B: '<Q', 0x0C: '<f', 0x0D: '<d'}
+EXTENSION_ATTRIBUTE = 'System.Runtime.CompilerServices.ExtensionAttribute'
+
+
+def attribute_short(name):
+    # "Torch.Commands.CommandAttribute" -> "command", the key --attr looks up
+    short = name.rsplit('.', 1)[-1].split('`')[0].lower()
+    return short[:-9] if short.endswith('attribute') and len(short) > 9 else short
+
+
+def format_attribute(name, args=None):
+    short = name.rsplit('.', 1)[-1]
+    short = short[:-9] if short.endswith('Attribute') and len(short) > 9 else short
+    return "{n}({a})".format(n=short, a=args) if args is not None else short
+
+
+class AttributeDecoder:
+    # Custom attributes of a DLL's public types and their public members, straight from the
+    # CustomAttribute table: the constructor signature gives the argument types, the value blob
+    # the arguments. Nothing is instantiated and no other assembly is loaded, so the underlying
+    # type of an enum defined elsewhere is taken to be int.
+    # Methods marked [Extension] are collected in `extensions` along the way.
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._method_owners = None
+        self.extensions = []
+
+    def read(self):
+        # [(namespace, type name, member or None, attribute type, arguments)]; a member is its
+        # loose_member_key() tuple and its ordinal among the type's members with that key (overloads
+        # that differ only in parameter types), arguments None when the blob could not be decoded
+        reader = self.reader
+        field_table = reader.rows(TBL_FIELD)
+        method_table = reader.rows(TBL_METHODDEF)
+        property_table = reader.rows(TBL_PROPERTY)
+        owners = {}
+        seen = Counter()
+
+        def member(owner, key):
+            # Members that share a loose key are numbered in declaration order, as the backends list them
+            seen[owner + key] += 1
+            return owner + ((key, seen[owner + key] - 1),)
+
+        for row, td in enumerate(reader.rows(TBL_TYPEDEF), start=1):
+            if td[0] & 0x7 != 0x1:
+                continue
+            node = reader.typedef_node(row)
+            owner = (node[1] or None, node_raw_name(node))
+            owners[(TBL_TYPEDEF, row)] = owner + (None,)
+            for f in reader.field_rows(row):
+                flags, name, _ = field_table[f - 1]
+                if flags & 0x7 == 0x6:
+                    owners[(TBL_FIELD, f)] = member(owner, ('F', reader.string(name), bool(flags & 0x10), None))
+            for m in reader.method_rows(row):
+                _, _, flags, name, sig, _ = method_table[m - 1]
+                if flags & 0x7 != 0x6 or flags & 0x800:
+                    continue
+                sig = reader.blob(sig)
+                count, _ = read_compressed(sig, read_compressed(sig, 1)[1] if sig[0] & 0x10 else 1)
+                names = reader.param_names(m)
+                owners[(TBL_METHODDEF, m)] = member(owner, ('M', reader.string(name), bool(flags & 0x10),
+                                                            tuple(names.get(i, "") for i in range(1, count + 1))))
+            for p in reader.property_rows(row):
+                public = [method_table[a - 1][2] for a in reader.property_accessors(p)
+                          if method_table[a - 1][2] & 0x7 == 0x6]
+                if public:
+                    owners[(TBL_PROPERTY, p)] = member(
+                        owner, ('P', reader.string(property_table[p - 1][1]), any(a & 0x10 for a in public), None))
+
+        found = []
+        for parent, ctor, value in reader.rows(TBL_CUSTOMATTRIBUTE):
+            parent = reader.decode_coded('HasCustomAttribute', parent)
+            owner = owners.get(parent)
+            if owner is None:
+                continue
+            try:
+                node, params = self.constructor(ctor)
+            except (MetadataError, IndexError, KeyError, struct.error):
+                continue
+            try:
+                args = self.arguments(params, reader.blob(value))
+            except (MetadataError, IndexError, KeyError, ValueError, AttributeError, struct.error):
+                args = None
+            found.append(owner + (node_full_name(node), args))
+            if parent[0] == TBL_METHODDEF and found[-1][3] == EXTENSION_ATTRIBUTE:
+                try:
+                    target = self.extension_targets(parent[1])
+                except (MetadataError, IndexError, KeyError, struct.error):
+                    target = None
+                if target:
+                    self.extensions.append(owner + (target,))
+        return found
+
+    def extension_targets(self, method_row):
+        # [Full names of the types the method extends]: its `this` parameter's type in its open
+        # generic form, or for `this T` the constraints of T; an unconstrained T extends object
+        reader = self.reader
+        mvars = reader.generic_param_names(TBL_METHODDEF, method_row)
+        _, params, _ = reader.decode_method_sig(reader.blob(reader.rows(TBL_METHODDEF)[method_row - 1][4]), (), mvars)
+        if not params:
+            return None
+        node = params[0]
+        while node[0] == 'S' and node[2] == '&':
+            node = node[1]
+        if node[0] == 'N':
+            targets = [node_full_name(node)]
+        elif node[0] == 'S':
+            targets = ['System.Array'] if node[2].startswith('[') else []
+        elif node[0] == 'M':
+            flags, constraints = reader.generic_param_constraints(TBL_METHODDEF, method_row, node[2])
+            targets = []
+            for value in constraints:
+                constraint = reader.type_from_coded(value, (), mvars)
+                if constraint is not None and constraint[0] == 'N' and node_full_name(constraint) not in targets:
+                    targets.append(node_full_name(constraint))
+            if not targets:
+                targets = ['System.ValueType' if flags & 0x8 else 'System.Object']
+        else:
+            targets = []
+        return targets
+
+    def constructor(self, ctor):
+        # (attribute type node, constructor parameter nodes)
+        reader = self.reader
+        table, row = reader.decode_coded('CustomAttributeType', ctor)
+        if table == TBL_MEMBERREF:
+            parent, _, sig = reader.rows(TBL_MEMBERREF)[row - 1]
+            parent_table, parent_row = reader.decode_coded('MemberRefParent', parent)
+            if parent_table == TBL_TYPEREF:
+                node = reader.typeref_node(parent_row)
+            elif parent_table == TBL_TYPEDEF:
+                node = reader.typedef_node(parent_row)
+            elif parent_table == TBL_TYPESPEC:
+                node = reader.decode_type(reader.blob(reader.rows(TBL_TYPESPEC)[parent_row - 1][0]), 0)[0]
+            else:
+                raise MetadataError("attribute constructor on table 0x{t:02x}".format(t=parent_table))
+        elif table == TBL_METHODDEF:
+            if self._method_owners is None:
+                self._method_owners = {}
+                for type_row in range(1, reader.row_counts[TBL_TYPEDEF] + 1):
+                    for m in reader.method_rows(type_row):
+                        self._method_owners[m] = type_row
+            node = reader.typedef_node(self._method_owners[row])
+            sig = reader.rows(TBL_METHODDEF)[row - 1][4]
+        else:
+            raise MetadataError("attribute constructor on table 0x{t:02x}".format(t=table))
+        _, params, _ = reader.decode_method_sig(reader.blob(sig))
+        return node, params
+
+    def arguments(self, params, blob):
+        # "1, \"text\", Name = true"
+        self.blob = blob
+        self.pos = 2
+        if struct.unpack_from('<H', blob, 0)[0] != 1:
+            raise MetadataError("bad custom attribute prolog")
+        args = [self.value(self.node_code(p)) for p in params]
+        for _ in range(self.unpack('<H')):
+            self.pos += 1
+            code = self.field_code()
+            name = self.ser_string()
+            args.append("{n} = {v}".format(n=name, v=self.value(code)))
+        return ", ".join(args)
+
+    def node_code(self, node):
+        # (element code, detail): array element code, or (name, underlying code) of an enum
+        if node[0] == 'S' and node[2] == '[]':
+            return 0x1D, self.node_code(node[1])
+        if node[0] != 'N':
+            raise MetadataError("unsupported attribute argument type")
+        if node[1] == 'System' and node[2] in ATTRIBUTE_CODES:
+            return ATTRIBUTE_CODES[node[2]], None
+        return 0x55, (node_raw_name(node), self.enum_code(node[1], node[2]))
+
+    def field_code(self):
+        code = self.unpack('<B')
+        if code == 0x1D:
+            return code, self.field_code()
+        if code == 0x55:
+            ns, _, path = self.ser_string().split(',')[0].strip().rpartition('.')
+            return code, (path.rsplit('+', 1)[-1], self.enum_code(ns, path))
+        return code, None
+
+    def enum_code(self, ns, path):
+        reader = self.reader
+        row = reader.find_typedef(ns, path)
+        if row is not None:
+            field_table = reader.rows(TBL_FIELD)
+            for f in reader.field_rows(row):
+                flags, _, sig = field_table[f - 1]
+                if not flags & 0x10:
+                    node = reader.decode_field_sig(reader.blob(sig))
+                    return ATTRIBUTE_CODES.get(node[2], 0x08) if node[0] == 'N' else 0x08
+        return 0x08
+
+    def value(self, code):
+        code, detail = code
+        if code == 0x1D:
+            count = self.unpack('<I')
+            if count == 0xFFFFFFFF:
+                return "null"
+            return "new[] {" + ", ".join(self.value(detail) for _ in range(count)) + "}"
+        if code == 0x51:
+            return self.value(self.field_code())
+        if code == 0x55:
+            name, underlying = detail
+            return "({n}){v}".format(n=name, v=self.unpack(ATTRIBUTE_FORMATS[underlying]))
+        if code in (0x0E, 0x50):
+            text = self.ser_string()
+            if text is None:
+                return "null"
+            return json.dumps(text, ensure_ascii=False) if code == 0x0E else "typeof({t})".format(t=text.split(',')[0])
+        number = self.unpack(ATTRIBUTE_FORMATS[code])
+        if code == 0x02:
+            return "true" if number else "false"
+        if code == 0x03:
+            return repr(chr(number))
+        return "{v:g}".format(v=number) if code in (0x0C, 0x0D) else str(number)
+
+    def unpack(self, fmt):
+        value = struct.unpack_from(fmt, self.blob, self.pos)[0]
+        self.pos += struct.calcsize(fmt)
+        return value
+
+    def ser_string(self):
+        if self.blob[self.pos] == 0xFF:
+            self.pos += 1
+            return None
+        length, self.pos = read_compressed(self.blob, self.pos)
+        text = bytes(self.blob[self.pos:self.pos + length]).decode('utf-8', 'replace')
+        if len(self.blob) < self.pos + length:
+            raise MetadataError("truncated custom attribute string")
+        self.pos += length
+        return text
+
+
+def read_attributes(path):
+    # (attributes, extension methods) as AttributeDecoder reads them
+    try:
+        reader = MetadataReader(path)
+    except (OSError, MetadataError):
+        return [], []
+    try:
+        decoder = AttributeDecoder(reader)
+        return decoder.read(), decoder.extensions
+    except (MetadataError, IndexError, struct.error):
+        return [], []
+    finally:
+        reader.close()
+
+
+# ============================================================
+# MEMBER INDEX
+# ============================================================
+
+INDEX_SCHEMA = 8
+
+INDEX_TABLES = """
+CREATE TABLE dlls (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER,
+    mvid TEXT,
+    backend TEXT,
+    version TEXT,
+    refs TEXT,
+    errors TEXT
+);
+CREATE TABLE types (
+    id INTEGER PRIMARY KEY,
+    dll_id INTEGER,
+    namespace TEXT,
+    name TEXT,
+    is_value_type INTEGER,
+    base_name TEXT
+);
+CREATE TABLE members (
+    type_id INTEGER,
+    kind TEXT,
+    name TEXT,
+    is_static INTEGER,
+    type_name TEXT,
+    params TEXT
+);
+CREATE TABLE type_uses (
+    type TEXT,
+    member_id INTEGER
+);
+CREATE TABLE type_ancestors (
+    type_id INTEGER,
+    depth INTEGER,
+    name TEXT,
+    short TEXT
+);
+CREATE TABLE type_interfaces (
+    type_id INTEGER,
+    name TEXT,
+    short TEXT
+);
+CREATE TABLE names (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    grams INTEGER
+);
+CREATE TABLE name_grams (
+    gram TEXT,
+    name_id INTEGER
+);
+CREATE TABLE attributes (
+    type_id INTEGER,
+    member_id INTEGER,
+    name TEXT,
+    short TEXT,
+    args TEXT
+);
+CREATE TABLE extensions (
+    member_id INTEGER,
+    target TEXT
+);
+CREATE INDEX types_by_dll ON types (dll_id);
+CREATE INDEX types_by_name ON types (name);
+CREATE INDEX members_by_type ON members (type_id, kind);
+CREATE INDEX uses_by_type ON type_uses (type);
+CREATE INDEX ancestors_by_name ON type_ancestors (short);
+CREATE INDEX ancestors_by_type ON type_ancestors (type_id);
+CREATE INDEX interfaces_by_name ON type_interfaces (short);
+CREATE INDEX interfaces_by_type ON type_interfaces (type_id);
+CREATE INDEX members_by_name ON members (name);
+CREATE INDEX grams_by_gram ON name_grams (gram);
+CREATE INDEX attributes_by_short ON attributes (short);
+CREATE INDEX attributes_by_type ON attributes (type_id);
+CREATE INDEX extensions_by_target ON extensions (target);
+CREATE INDEX extensions_by_member ON extensions (member_id);
+"""
+
+# Identifiers inside a formatted type name: List<MyContractDescription>[] -> List, MyContractDescription
+TYPE_TOKEN = re.compile(r'[A-Za-z_][\w`]*')
+
+
+def type_tokens(type_name):
+    return set(t.lower() for t in TYPE_TOKEN.findall(type_name))
+
+
+def short_type_name(name):
+    # "System.Collections.Generic.IList`1" -> "ilist", the key hierarchy queries look up
+    return name.rsplit('.', 1)[-1].split('`')[0].lower()
+
+
+def name_trigrams(name):
+    # "List`1" -> {"  l", " li", "lis", "ist", "st "}; the padding favours matching prefixes
+    key = "  " + name.split('`')[0].lower() + " "
+    return set(key[i:i + 3] for i in range(len(key) - 2))
+
+
+def index_member(kind, name, is_static, type_name, params):
+    return MemberRecord(kind, name, bool(is_static), type_name,
+                        tuple(tuple(p) for p in json.loads(params)) if params is not None else None)
+
+
+def index_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def read_mvid(path):
+    try:
+        reader = MetadataReader(path)
+    except (OSError, MetadataError):
+        return None
+    try:
+        return reader.mvid
+    except (MetadataError, IndexError, struct.error):
+        return None
+    finally:
+        reader.close()
+
+
+EMPTY_EXTRACT = ("Unknown", None, [], [], [], [], [], [])
+
+
+def extract_dll(dll_path, backend, with_attributes=False):
+    # Full public surface of one DLL: every public type with all of its members,
+    # plus a (base chain, interfaces) entry per type; with_attributes adds the custom
+    # attributes and extension methods, read in the same (worker) process. The error
+    # that cut the extraction short, if any, comes last.
+    version = "Unknown"
+    mvid = None
+    refs = []
+    types = []
+    hierarchy = []
+    errors = []
+
+    def every(name):
+        return True
+
+    try:
+        assembly = backend.load(dll_path)
+        version = str(backend.version(assembly))
+        mvid = backend.mvid(assembly)
+        refs = backend.references(assembly)
+        for t in backend.public_types(assembly):
+            members = list(backend.fields(t, every))
+            members.extend(backend.methods(t, every))
+            members.extend(backend.properties(t, every))
+            types.append((backend.type_info(t), members))
+            hierarchy.append(backend.hierarchy(t))
+    except Exception as e:
+        errors.append(error_text(e))
+        del types[len(hierarchy):]
+
+    attributes, extensions = read_attributes(dll_path) if with_attributes else ([], [])
+    return version, mvid, refs, types, hierarchy, attributes, extensions, errors
+
+
+class MemberIndex:
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db = sqlite3.connect(db_path)
+        self.hits = 0
+        self.misses = 0
+        self.deleted = False
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_SCHEMA:
+            self.db.executescript("DROP TABLE IF EXISTS dlls; DROP TABLE IF EXISTS types; "
+                                  "DROP TABLE IF EXISTS members; DROP TABLE IF EXISTS type_uses; "
+                                  "DROP TABLE IF EXISTS type_ancestors; DROP TABLE IF EXISTS type_interfaces; "
+                                  "DROP TABLE IF EXISTS names; DROP TABLE IF EXISTS name_grams; "
+                                  "DROP TABLE IF EXISTS attributes; DROP TABLE IF EXISTS extensions;"
+                                  + INDEX_TABLES)
+            self.db.execute("PRAGMA user_version = {v}".format(v=INDEX_SCHEMA))
+            self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def dll_row(self, path):
+        return self.db.execute("SELECT id, version, mvid, refs, errors FROM dlls WHERE path = ?",
+                               (index_key(path),)).fetchone()
+
+    def refresh(self, directory, dll_files, backend, reindex=False, jobs=1, recycle=None):
+        # Re-inspect only DLLs whose path/size/mtime (or MVID) fingerprint changed
+        stale = []
+        for dll in dll_files:
+            path = os.path.join(directory, dll)
+            key = index_key(path)
+            st = os.stat(path)
+            row = self.db.execute("SELECT id, size, mtime_ns, mvid, backend FROM dlls WHERE path = ?",
+                                  (key,)).fetchone()
+
+            if row and not reindex and row[4] == backend.name:
+                if (row[1], row[2]) == (st.st_size, st.st_mtime_ns):
+                    self.hits += 1
+                    continue
+                mvid = read_mvid(path)
+                if mvid and mvid == row[3]:
+                    self.db.execute("UPDATE dlls SET size = ?, mtime_ns = ? WHERE id = ?",
+                                    (st.st_size, st.st_mtime_ns, row[0]))
+                    self.hits += 1
+                    continue
+
+            stale.append((path, key, st, row[0] if row else None))
+
+        paths = [path for path, _, _, _ in stale]
+        extracted_dlls = map_dlls(extract_dll, paths, backend, jobs, "Indexing", (True,), recycle=recycle)
+        for (path, key, st, old_id), (_, extracted) in zip(stale, extracted_dlls):
+            self.misses += 1
+            if old_id:
+                self._delete(old_id)
+            self._store(key, st, backend.name, extracted or EMPTY_EXTRACT)
+            if extracted and extracted[-1]:
+                print("\n[!] {dll}: {e} (indexed up to the failure)".format(
+                    dll=os.path.basename(path), e=extracted[-1][0]))
+
+        self._prune()
+        if self.deleted:
+            self._prune_names()
+        self.db.commit()
+        if stale:
+            print()
+
+    def _store(self, key, st, backend_name, extracted):
+        version, mvid, refs, types, hierarchy, attributes, extensions, errors = extracted
+        cur = self.db.execute(
+            "INSERT INTO dlls (path, size, mtime_ns, mvid, backend, version, refs, errors) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, st.st_size, st.st_mtime_ns, mvid, backend_name, version, json.dumps(refs),
+             json.dumps(errors) if errors else None))
+        dll_id = cur.lastrowid
+        type_ids = {}
+        for (info, members), (bases, interfaces) in zip(types, hierarchy):
+            type_id = self.db.execute(
+                "INSERT INTO types (dll_id, namespace, name, is_value_type, base_name) VALUES (?, ?, ?, ?, ?)",
+                (dll_id, info.namespace, info.name, int(info.is_value_type), info.base_name)).lastrowid
+            type_ids.setdefault((info.namespace or None, info.name), type_id)
+            self.db.executemany(
+                "INSERT INTO type_ancestors (type_id, depth, name, short) VALUES (?, ?, ?, ?)",
+                [(type_id, depth, name, short_type_name(name)) for depth, name in enumerate(bases, start=1)])
+            self.db.executemany(
+                "INSERT INTO type_interfaces (type_id, name, short) VALUES (?, ?, ?)",
+                [(type_id, name, short_type_name(name)) for name in interfaces])
+            self.db.executemany(
+                "INSERT INTO members (type_id, kind, name, is_static, type_name, params) VALUES (?, ?, ?, ?, ?, ?)",
+                [(type_id, m.kind, m.name, int(m.is_static), m.type_name,
+                  json.dumps(m.params) if m.params is not None else None) for m in members])
+
+        # Inverted index: every type name mentioned in a member signature -> member
+        uses = []
+        rows = self.db.execute("SELECT m.rowid, m.type_name, m.params FROM members m "
+                               "JOIN types t ON t.id = m.type_id WHERE t.dll_id = ?", (dll_id,))
+        for member_id, type_name, params in rows:
+            names = type_tokens(type_name)
+            for param_type, _ in json.loads(params) if params is not None else ():
+                names |= type_tokens(param_type)
+            uses.extend((name, member_id) for name in names)
+        self.db.executemany("INSERT INTO type_uses (type, member_id) VALUES (?, ?)", uses)
+
+        # Attribute owners are matched to member rows by loose key and ordinal: the type's members
+        # are stored declared ones first, in declaration order
+        member_ids = {}
+
+        def member_row(type_id, member):
+            if type_id not in member_ids:
+                member_ids[type_id] = {}
+                for row in self.db.execute("SELECT rowid, kind, name, is_static, type_name, params FROM members "
+                                           "WHERE type_id = ? ORDER BY rowid", (type_id,)):
+                    member_ids[type_id].setdefault(loose_member_key(index_member(*row[1:])), []).append(row[0])
+            key, ordinal = member
+            rows = member_ids[type_id].get(key, ())
+            return rows[ordinal] if ordinal < len(rows) else None
+
+        # Custom attributes of the types and their members (--attr), read from the metadata in extract_dll
+        attribute_rows = []
+        for ns, type_name, member, name, args in attributes:
+            type_id = type_ids.get((ns, type_name))
+            if type_id is None:
+                continue
+            owner = member_row(type_id, member) if member else None
+            if member is None or owner is not None:
+                attribute_rows.append((type_id, owner, name, attribute_short(name), args))
+        self.db.executemany(
+            "INSERT INTO attributes (type_id, member_id, name, short, args) VALUES (?, ?, ?, ?, ?)", attribute_rows)
+
+        # Extension methods by the full name of each type they extend (--with-ext)
+        targets = set()
+        for ns, type_name, member, names in extensions:
+            owner = member_row(type_ids[(ns, type_name)], member) if (ns, type_name) in type_ids else None
+            if owner is not None:
+                targets.update((owner, name) for name in names)
+        self.db.executemany("INSERT INTO extensions (member_id, target) VALUES (?, ?)", sorted(targets))
+
+        # Trigram index over every distinct type / member name, shared by all DLLs (--fuzzy)
+        names = set(info.name for info, _ in types)
+        for _, members in types:
+            names.update(m.name for m in members)
+        for name in names:
+            grams = name_trigrams(name)
+            cur = self.db.execute("INSERT OR IGNORE INTO names (name, grams) VALUES (?, ?)", (name, len(grams)))
+            if cur.rowcount:
+                self.db.executemany("INSERT INTO name_grams (gram, name_id) VALUES (?, ?)",
+                                    [(gram, cur.lastrowid) for gram in grams])
+
+    def _delete(self, dll_id):
+        for table in ('type_ancestors', 'type_interfaces', 'attributes'):
+            self.db.execute("DELETE FROM {t} WHERE type_id IN (SELECT id FROM types WHERE dll_id = ?)".format(t=table),
+                            (dll_id,))
+        for table in ('type_uses', 'extensions'):
+            self.db.execute("DELETE FROM {t} WHERE member_id IN (SELECT m.rowid FROM members m "
+                            "JOIN types t ON t.id = m.type_id WHERE t.dll_id = ?)".format(t=table), (dll_id,))
+        self.db.execute("DELETE FROM members WHERE type_id IN (SELECT id FROM types WHERE dll_id = ?)", (dll_id,))
+        self.db.execute("DELETE FROM types WHERE dll_id = ?", (dll_id,))
+        self.db.execute("DELETE FROM dlls WHERE id = ?", (dll_id,))
+        self.deleted = True
+
+    def _prune_names(self):
+        # Names no indexed DLL declares any more
+        self.db.execute("CREATE TEMP TABLE dead_names AS SELECT id FROM names n "
+                        "WHERE NOT EXISTS (SELECT 1 FROM types WHERE name = n.name) "
+                        "AND NOT EXISTS (SELECT 1 FROM members WHERE name = n.name)")
+        self.db.execute("DELETE FROM name_grams WHERE name_id IN (SELECT id FROM dead_names)")
+        self.db.execute("DELETE FROM names WHERE id IN (SELECT id FROM dead_names)")
+        self.db.execute("DROP TABLE dead_names")
+
+    def uses(self, type_name, dll_paths, type_query, member_query):
+        # Yields (dll, (version, [TypeMatch])) for members whose signature mentions type_name
+        tokens = TYPE_TOKEN.findall(type_name)
+        token = tokens[-1].lower() if tokens else ""
+        for path in dll_paths:
+            row = self.dll_row(path)
+            if row is None:
+                continue
+            matches = []
+            for type_id, group in groupby(self.db.execute(
+                    "SELECT t.id, t.namespace, t.name, t.is_value_type, t.base_name, "
+                    "m.kind, m.name, m.is_static, m.type_name, m.params "
+                    "FROM type_uses u JOIN members m ON m.rowid = u.member_id JOIN types t ON t.id = m.type_id "
+                    "WHERE u.type = ? AND t.dll_id = ? ORDER BY t.id, m.rowid", (token, row[0])),
+                    key=lambda r: r[0]):
+                group = list(group)
+                info = TypeInfo(group[0][1], group[0][2], bool(group[0][3]), group[0][4])
+                if not type_query.match_type(info):
+                    continue
+                records = [index_member(*r[5:]) for r in group]
+                records = [r for r in records if member_query.match_name(r.name) and member_query.match_member(r)]
+                if records:
+                    matches.append(TypeMatch(info, records))
+            yield os.path.basename(path), (row[1], matches)
+
+    def attributed(self, attribute, dll_paths, type_query, member_query, kinds, require_members, with_args):
+        # Yields (dll, (version, [TypeMatch])) for the types carrying `attribute`, listed with their members
+        # like a normal search, and for the members carrying it; attribute texts travel in TypeMatch.attributes
+        name = attribute.strip('[]')
+        full = name.lower() if '.' in name else None
+        for path in dll_paths:
+            row = self.dll_row(path)
+            if row is None:
+                continue
+            matches = []
+            for type_id, group in groupby(self.db.execute(
+                    "SELECT t.id, t.namespace, t.name, t.is_value_type, t.base_name, a.member_id, a.name, a.args "
+                    "FROM attributes a JOIN types t ON t.id = a.type_id "
+                    "WHERE t.dll_id = ? AND a.short = ? ORDER BY t.id, a.rowid", (row[0], attribute_short(name))),
+                    key=lambda r: r[0]):
+                group = [r for r in group if full is None or r[6].lower() in (full, full + 'attribute')]
+                if not group:
+                    continue
+                info = TypeInfo(group[0][1], group[0][2], bool(group[0][3]), group[0][4])
+                if not type_query.match_type(info):
+                    continue
+                carried = {}
+                for r in group:
+                    carried.setdefault(r[5], []).append(format_attribute(r[6], r[7] if with_args else None))
+                on_type = None in carried
+                records = []
+                attributes = [(None, text) for text in carried.get(None, ())]
+                for member in self.db.execute(
+                        "SELECT rowid, kind, name, is_static, type_name, params FROM members WHERE type_id = ? "
+                        "ORDER BY rowid", (type_id,)):
+                    rec = index_member(*member[1:])
+                    if ((member[0] in carried or (on_type and rec.kind in kinds))
+                            and member_query.match_name(rec.name) and member_query.match_member(rec)):
+                        records.append(rec)
+                        attributes.extend((rec, text) for text in carried.get(member[0], ()))
+                if records or (on_type and not require_members):
+                    matches.append(TypeMatch(info, records, attributes=tuple(attributes)))
+            yield os.path.basename(path), (row[1], matches)
+
+    def extensions(self, dll_id, scanned, member_query):
+        # {type_id: [(declaring type, dll, MemberRecord)]} for the types of one DLL: the extension
+        # methods of the scanned DLLs whose `this` parameter is the type, a base class or an interface
+        # of it; for `this T` the type must satisfy every constraint of T. Extensions on object (and on
+        # an unconstrained T) are only listed under System.Object itself.
+        found = {}
+        satisfied = Counter()
+        for row in self.db.execute(
+                "SELECT c.type_id, m.rowid, d.path, o.namespace, o.name, "
+                "m.kind, m.name, m.is_static, m.type_name, m.params, "
+                "(SELECT count(*) FROM extensions x WHERE x.member_id = e.member_id) "
+                "FROM (SELECT id AS type_id, 1 AS own, "
+                "      CASE WHEN namespace IS NULL THEN name ELSE namespace || '.' || name END AS name "
+                "      FROM types WHERE dll_id = :dll "
+                "      UNION ALL SELECT a.type_id, 0, a.name FROM type_ancestors a "
+                "      JOIN types t ON t.id = a.type_id WHERE t.dll_id = :dll "
+                "      UNION ALL SELECT i.type_id, 0, i.name FROM type_interfaces i "
+                "      JOIN types t ON t.id = i.type_id WHERE t.dll_id = :dll) c "
+                "JOIN extensions e ON e.target = c.name JOIN members m ON m.rowid = e.member_id "
+                "JOIN types o ON o.id = m.type_id JOIN dlls d ON d.id = o.dll_id "
+                "WHERE c.own OR e.target <> 'System.Object' "
+                "ORDER BY c.type_id, d.path, o.id, m.rowid", {'dll': dll_id}):
+            satisfied[row[0], row[1]] += 1
+            if row[2] not in scanned or satisfied[row[0], row[1]] != row[10] or not member_query.match_name(row[6]):
+                continue
+            rec = index_member(*row[5:10])
+            if member_query.match_member(rec):
+                owner = "{ns}.{n}".format(ns=row[3], n=row[4]) if row[3] else row[4]
+                found.setdefault(row[0], []).append((owner, scanned[row[2]], rec))
+        return found
+
+    def with_extensions(self, results, dll_paths, type_query, member_query):
+        # Adds TypeMatch.extensions to (dll path, result) pairs of a -s / -f scan. A type matching -s
+        # is also listed when only extension methods match -f, with no members of its own.
+        scanned = dict((index_key(p), os.path.basename(p)) for p in dll_paths)
+        for path, result in results:
+            row = self.dll_row(path)
+            if result is None or row is None:
+                yield path, result
+                continue
+            listed = {}
+            for match in result[1]:
+                listed.setdefault(type_full_name(match.info), []).append(match)
+            extensions = self.extensions(row[0], scanned, member_query)
+            matches = []
+            for type_id, namespace, name, is_value_type, base_name in self.db.execute(
+                    "SELECT id, namespace, name, is_value_type, base_name FROM types WHERE dll_id = ? ORDER BY id",
+                    (row[0],)).fetchall():
+                info = TypeInfo(namespace, name, bool(is_value_type), base_name)
+                found = tuple(extensions.get(type_id, ()))
+                if listed.get(type_full_name(info)):
+                    matches.append(listed[type_full_name(info)].pop(0)._replace(extensions=found))
+                elif found and type_query.match_type(info):
+                    matches.append(TypeMatch(info, [], extensions=found))
+            for rest in listed.values():
+                matches.extend(rest)
+            yield path, (result[0], matches) + tuple(result[2:])
+
+    def hierarchy(self, type_id):
+        bases = [r[0] for r in self.db.execute(
+            "SELECT name FROM type_ancestors WHERE type_id = ? ORDER BY depth", (type_id,))]
+        interfaces = [r[0] for r in self.db.execute(
+            "SELECT name FROM type_interfaces WHERE type_id = ? ORDER BY rowid", (type_id,))]
+        return bases, interfaces
+
+    def hierarchy_types(self, table, name, dll_paths, type_query):
+        # Yields (dll, version, [(type_id, TypeInfo)]) per scanned DLL: types with `name` among
+        # their ancestors / interfaces, or (table None) the types called `name` themselves
+        short = short_type_name(name)
+        full = name.split('`')[0].lower() if '.' in name else None
+        if table is None:
+            sql = ("SELECT t.id, t.namespace, t.name, t.is_value_type, t.base_name, "
+                   "CASE WHEN t.namespace IS NULL THEN t.name ELSE t.namespace || '.' || t.name END "
+                   "FROM types t WHERE t.dll_id = ? AND (lower(t.name) = ? OR lower(t.name) LIKE ?) ORDER BY t.id")
+        else:
+            sql = ("SELECT t.id, t.namespace, t.name, t.is_value_type, t.base_name, r.name "
+                   "FROM {table} r JOIN types t ON t.id = r.type_id "
+                   "WHERE t.dll_id = ? AND r.short = ? ORDER BY t.id").format(table=table)
+        for path in dll_paths:
+            row = self.dll_row(path)
+            if row is None:
+                continue
+            args = (row[0], short, short + '`%') if table is None else (row[0], short)
+            found = []
+            for type_id, group in groupby(self.db.execute(sql, args), key=lambda r: r[0]):
+                group = list(group)
+                if table is None and short_type_name(group[0][5]) != short:
+                    continue
+                if full and not any(r[5].split('`')[0].lower() == full for r in group):
+                    continue
+                info = TypeInfo(group[0][1], group[0][2], bool(group[0][3]), group[0][4])
+                if type_query.match_type(info):
+                    found.append((type_id, info))
+            yield os.path.basename(path), row[1], found
+
+    def fuzzy(self, term, dll_paths, type_query, top, min_score):
+        # The `top` names most similar to term as (score, name, [(kind, owner TypeInfo, dll)]), and the
+        # number of candidate names; score = Jaccard similarity of the trigram sets of the two names
+        grams = name_trigrams(term.rsplit('.', 1)[-1])
+        scanned = dict((index_key(p), os.path.basename(p)) for p in dll_paths)
+        candidates = self.db.execute(
+            "SELECT n.name, count(*) * 1.0 / (? + n.grams - count(*)) AS score "
+            "FROM name_grams g JOIN names n ON n.id = g.name_id WHERE g.gram IN ({marks}) "
+            "GROUP BY g.name_id HAVING score >= ? ORDER BY score DESC, n.name".format(
+                marks=", ".join("?" * len(grams))),
+            [len(grams)] + sorted(grams) + [min_score]).fetchall()
+
+        found = []
+        for name, score in candidates:
+            owners = [("Struct" if r[3] else "Class",) + r for r in self.db.execute(
+                "SELECT d.path, t.namespace, t.name, t.is_value_type, t.base_name FROM types t "
+                "JOIN dlls d ON d.id = t.dll_id WHERE t.name = ? ORDER BY d.path, t.id", (name,))]
+            owners += [(KIND_NAMES[r[0]].capitalize(),) + r[1:] for r in self.db.execute(
+                "SELECT DISTINCT m.kind, d.path, t.namespace, t.name, t.is_value_type, t.base_name, t.id "
+                "FROM members m JOIN types t ON t.id = m.type_id JOIN dlls d ON d.id = t.dll_id "
+                "WHERE m.name = ? ORDER BY d.path, t.id, m.kind", (name,))]
+            listed = []
+            for kind, path, namespace, type_name, is_value_type, base_name in (o[:6] for o in owners):
+                info = TypeInfo(namespace, type_name, bool(is_value_type), base_name)
+                if path in scanned and type_query.match_type(info):
+                    listed.append((kind, info, scanned[path]))
+            if listed:
+                found.append((score, name, listed))
+                if len(found) == top:
+                    break
+        return found, len(candidates)
+
+    def locate(self, full_name, scanned):
+        # File name of the scanned DLL defining full_name, if any
+        ns, _, name = full_name.rpartition('.')
+        for (path,) in self.db.execute(
+                "SELECT d.path FROM types t JOIN dlls d ON d.id = t.dll_id "
+                "WHERE t.name = ? AND coalesce(t.namespace, '') = ?", (name, ns)):
+            if path in scanned:
+                return scanned[path]
+        return None
+
+    def _prune(self):
+        for dll_id, path in self.db.execute("SELECT id, path FROM dlls").fetchall():
+            if not os.path.exists(path):
+                self._delete(dll_id)
+
+
+class IndexBackend:
+
+    name = 'index'
+
+    def __init__(self, index):
+        self.index = index
+
+    def load(self, path):
+        row = self.index.dll_row(path)
+        if row is None:
+            raise LookupError("not indexed: {p}".format(p=path))
+        return row
+
+    def version(self, asm):
+        return asm[1]
+
+    def mvid(self, asm):
+        return asm[2]
+
+    def references(self, asm):
+        return json.loads(asm[3])
+
+    def load_errors(self, asm):
+        # The error that cut the DLL's extraction short when it was indexed
+        return json.loads(asm[4]) if asm[4] else []
+
+    def public_types(self, asm):
+        return self.index.db.execute(
+            "SELECT id, namespace, name, is_value_type, base_name FROM types WHERE dll_id = ? ORDER BY id",
+            (asm[0],)).fetchall()
+
+    def type_info(self, t):
+        return TypeInfo(t[1], t[2], bool(t[3]), t[4])
+
+    def hierarchy(self, t):
+        return self.index.hierarchy(t[0])
+
+    def base_type(self, t):
+        # The direct base wherever it is indexed; None when its DLL is not in the index
+        row = self.index.db.execute("SELECT name FROM type_ancestors WHERE type_id = ? AND depth = 1",
+                                    (t[0],)).fetchone()
+        if row is None:
+            return None
+        ns, _, name = row[0].rpartition('.')
+        return self.index.db.execute(
+            "SELECT id, namespace, name, is_value_type, base_name FROM types "
+            "WHERE name = ? AND coalesce(namespace, '') = ? ORDER BY id LIMIT 1", (name, ns)).fetchone()
+
+    def _members(self, t, kind, match):
+        rows = self.index.db.execute(
+            "SELECT name, is_static, type_name, params FROM members WHERE type_id = ? AND kind = ? ORDER BY rowid",
+            (t[0], kind))
+        return [index_member(kind, name, is_static, type_name, params)
+                for name, is_static, type_name, params in rows if match(name)]
+
+    def fields(self, t, match):
+        return self._members(t, 'F', match)
+
+    def methods(self, t, match):
+        return self._members(t, 'M', match)
+
+    def properties(self, t, match):
+        return self._members(t, 'P', match)
+
+
+# ============================================================
+# HIERARCHY
+# ============================================================
+
+HIERARCHY_QUERIES = {
+    '--derived': ('type_ancestors', "DERIVED FROM"),
+    '--implements': ('type_interfaces', "IMPLEMENTING"),
+    '--ancestors': (None, "ANCESTORS OF"),
+}
+
+
+def write_hierarchy(index, flag, name, dll_paths, type_query, target_dir, log_path):
+    # Answers --derived / --implements / --ancestors from the index; returns the number of types listed
+    table, title = HIERARCHY_QUERIES[flag]
+    scanned = dict((index_key(p), os.path.basename(p)) for p in dll_paths)
+    total = 0
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("REPORT: {d}\n{t}: {n}\n".format(d=target_dir, t=title, n=name))
+        f.write("=" * 60 + "\n")
+
+        for dll, version, found in index.hierarchy_types(table, name, dll_paths, type_query):
+            if not found:
+                continue
+            f.write("\nFILE: {dll} (v{v})\n".format(dll=dll, v=version))
+            f.write("-" * 60 + "\n")
+            for type_id, info in found:
+                total += 1
+                if table is not None:
+                    f.write(format_type_header(info) + "\n")
+                    continue
+                f.write("\n" + format_type_header(info) + "\n")
+                bases, interfaces = index.hierarchy(type_id)
+                for depth, base in enumerate(bases, start=1):
+                    where = index.locate(base, scanned)
+                    f.write("  {d}. {b}{w}\n".format(d=depth, b=base, w="  [{w}]".format(w=where) if where else ""))
+                if interfaces:
+                    f.write("  implements: {i}\n".format(i=", ".join(interfaces)))
+
+        if total == 0:
+            f.write("\nNo results found.\n")
+
+    return total
+
+
+# ============================================================
+# FUZZY SEARCH
+# ============================================================
+
+FUZZY_MIN_SCORE = 0.3
+
+
+def get_fuzzy_top(args):
+    pos = args.index("--fuzzy")
+    value = args[pos + 2] if pos + 2 < len(args) else None
+    return int(value) if value and value.isdigit() else 20
+
+
+def write_fuzzy(index, term, dll_paths, type_query, top, target_dir, log_path):
+    # Answers --fuzzy from the trigram index; prints the ranking and saves it, returns the row count
+    started = time.perf_counter()
+    found, compared = index.fuzzy(term, dll_paths, type_query, top, FUZZY_MIN_SCORE)
+    elapsed = time.perf_counter() - started
+
+    summary = "{n} of {c} similar name(s) listed ({t:.1f} ms)".format(n=len(found), c=compared, t=elapsed * 1000)
+
+    print("\nFUZZY: {n} (top {top})\n".format(n=term, top=top))
+    if found:
+        print("  {s:>5}  {k:<8} {n:<32} {t:<44} {d}".format(s="Score", k="Kind", n="Name", t="Type", d="DLL"))
+    for score, name, owners in found:
+        kind, info, dll = owners[0]
+        more = "  (+{n} more)".format(n=len(owners) - 1) if len(owners) > 1 else ""
+        print("  {s:>5.2f}  {k:<8} {n:<32} {t:<44} {d}{m}".format(
+            s=score, k=kind, n=name, t=type_full_name(info), d=dll, m=more))
+    print(summary if found else "  No similar names found.")
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("REPORT: {d}\nFUZZY: {n} (top {top})\n".format(d=target_dir, n=term, top=top))
+        f.write("=" * 60 + "\n")
+        for score, name, owners in found:
+            f.write("\n{s:.2f}  {n}\n".format(s=score, n=name))
+            for kind, info, dll in owners:
+                f.write("  {k:<8} {t}  [{d}]\n".format(k=kind, t=type_full_name(info), d=dll))
+        f.write("\n" + summary + "\n" if found else "\nNo results found.\n")
+
+    return len(found)
+
+
+# ============================================================
+# DEPENDENCIES
+# ============================================================
+
+FRAMEWORK_PREFIXES = ("System", "Microsoft.", "mscorlib", "netstandard", "WindowsBase",
+                      "PresentationCore", "PresentationFramework")
+
+
+class DependencyGraph:
+    # Assembly references read from the AssemblyRef table; nothing is loaded into a runtime
+
+    def __init__(self, directory, dll_files):
+        self.dlls = list(dll_files)
+        self.names = {}
+        self.refs = {}
+        self.errors = {}
+        self.read_times = {}
+
+        for dll in self.dlls:
+            self.names[os.path.splitext(dll)[0].lower()] = dll
+            started = time.perf_counter()
+            try:
+                reader = MetadataReader(os.path.join(directory, dll))
+            except (OSError, MetadataError) as e:
+                self.errors[dll] = str(e)
+                self.refs[dll] = []
+                self.read_times[dll] = time.perf_counter() - started
+                continue
+            try:
+                self.names[reader.assembly_name.lower()] = dll
+                self.refs[dll] = reader.assembly_refs()
+            except (MetadataError, IndexError, struct.error) as e:
+                self.errors[dll] = str(e) or type(e).__name__
+                self.refs[dll] = []
+            finally:
+                reader.close()
+                self.read_times[dll] = time.perf_counter() - started
+
+        self.edges = {dll: [] for dll in self.dlls}
+        self.missing = {}
+        for dll in self.dlls:
+            for ref in self.refs[dll]:
+                target = self.names.get(ref.lower())
+                if target is not None:
+                    if target != dll and target not in self.edges[dll]:
+                        self.edges[dll].append(target)
+                elif not ref.startswith(FRAMEWORK_PREFIXES):
+                    self.missing.setdefault(dll, []).append(ref)
+
+        self.reverse = {dll: [] for dll in self.dlls}
+        for dll, targets in self.edges.items():
+            for target in targets:
+                self.reverse[target].append(dll)
+
+    def find(self, name):
+        name = name.lower()
+        if name.endswith(".dll"):
+            name = name[:-4]
+        return self.names.get(name)
+
+    def closure(self, dll, reverse=False):
+        # Every DLL reachable from dll (its dependencies, or its dependents with reverse=True)
+        adjacency = self.reverse if reverse else self.edges
+        seen = []
+        stack = list(adjacency[dll])
+        while stack:
+            node = stack.pop()
+            if node in seen or node == dll:
+                continue
+            seen.append(node)
+            stack.extend(adjacency[node])
+        return sorted(seen, key=self.dlls.index)
+
+    def load_order(self):
+        # Dependencies before dependents; DLLs caught in a cycle are left out
+        pending = {dll: len(self.edges[dll]) for dll in self.dlls}
+        ready = deque(dll for dll in self.dlls if pending[dll] == 0)
+        order = []
+        while ready:
+            dll = ready.popleft()
+            order.append(dll)
+            for dependent in self.reverse[dll]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        return order
+
+    def cycles(self):
+        # Strongly connected components with more than one DLL (iterative Tarjan)
+        index = {}
+        low = {}
+        on_stack = set()
+        stack = []
+        found = []
+        counter = 0
+        for root in self.dlls:
+            if root in index:
+                continue
+            work = [(root, iter(self.edges[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.edges[child])))
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        found.append(sorted(component, key=self.dlls.index))
+        return found
+
+    def to_json(self):
+        return json.dumps({
+            'dlls': [{'dll': dll,
+                      'references': self.refs[dll],
+                      'depends_on': self.edges[dll],
+                      'used_by': self.reverse[dll],
+                      'missing': self.missing.get(dll, []),
+                      'error': self.errors.get(dll)} for dll in self.dlls],
+            'load_order': self.load_order(),
+            'cycles': self.cycles(),
+        }, indent=2)
+
+    def to_dot(self):
+        in_cycle = set(dll for component in self.cycles() for dll in component)
+        lines = ["digraph dependencies {", "  rankdir=LR;", "  node [shape=box];"]
+        for dll in self.dlls:
+            style = ' [color=red]' if dll in in_cycle else ' [style=dashed]' if dll in self.errors else ''
+            lines.append('  "{d}"{s};'.format(d=dll, s=style))
+        for dll in self.dlls:
+            for target in self.edges[dll]:
+                lines.append('  "{a}" -> "{b}";'.format(a=dll, b=target))
+            for ref in self.missing.get(dll, []):
+                lines.append('  "{a}" -> "{r}" [style=dashed, color=gray];'.format(a=dll, r=ref))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def print_dependencies(graph, deps_of=None, rdeps=None):
+    if deps_of or rdeps:
+        for name, reverse in ((deps_of, False), (rdeps, True)):
+            if not name:
+                continue
+            dll = graph.find(name)
+            if dll is None:
+                print("\n{n} is not one of the scanned DLLs.".format(n=name))
+                continue
+            found = graph.closure(dll, reverse)
+            title = "DLLs that depend on" if reverse else "Dependencies of"
+            print("\n{t} {d} (transitive, {c}):\n".format(t=title, d=dll, c=len(found)))
+            for other in found:
+                direct = other in (graph.reverse[dll] if reverse else graph.edges[dll])
+                print("  {m} {o}".format(m="->" if direct else "..", o=other))
+        return
+
+    print("\nDEPENDENCIES:\n")
+    for dll in graph.dlls:
+        print(dll)
+        for target in graph.edges[dll]:
+            print("  -> {r}".format(r=target))
+
+    order = graph.load_order()
+    print("\nLOAD ORDER ({n} of {t}):\n".format(n=len(order), t=len(graph.dlls)))
+    for i, dll in enumerate(order, start=1):
+        print("  {i:>3}. {d}".format(i=i, d=dll))
+
+    cycles = graph.cycles()
+    print("\nCYCLES: {n}".format(n=len(cycles) or "none"))
+    for component in cycles:
+        print("  " + " <-> ".join(component))
+
+    print("\nMISSING REFERENCES: {n}".format(n=len(graph.missing) or "none"))
+    for dll, refs in graph.missing.items():
+        print("  {d}: {r}".format(d=dll, r=", ".join(refs)))
+
+    if graph.errors:
+        print("\nUNREADABLE: {n}".format(n=len(graph.errors)))
+        for dll, error in graph.errors.items():
+            print("  {d}: {e}".format(d=dll, e=error))
+
+
+# ============================================================
+# PREFILTER
+# ============================================================
+
+HEAP_WORD = re.compile(r'[\w`]+')
+
+
+class _HeapParser(_QueryParser):
+    # Same grammar as -s/-f, evaluated against a DLL's lower-cased #Strings heap.
+    # A leaf only answers "could a matching name be in here", so NOT and the
+    # signature filters always answer yes.
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.take()
+            self.parse_not()
+            return lambda heap: True
+        return self.parse_atom()
+
+    def leaf(self, tok):
+        if tok.startswith('/') or ':' in tok or (self.members and tok in ('static', 'instance')):
+            return lambda heap: True
+        try:
+            term = tok.lower().encode('ascii')
+        except UnicodeEncodeError:
+            # bytes.lower() only folds ASCII
+            return lambda heap: True
+        # Namespace, type and nesting parts are separate heap strings, and glob
+        # wildcards can stand for anything, so only whole word runs are required
+        words = HEAP_WORD.findall(re.sub(r'\[[^\]]*\]', '*', term.decode('ascii')))
+        if not words:
+            return lambda heap: True
+        if self.exact and '*' not in tok and '?' not in tok and words == [tok.lower()]:
+            # Only the end is a word boundary: "List`1" may be stored as the tail of "IList`1"
+            rx = re.compile(re.escape(term) + rb'\b')
+            return lambda heap: rx.search(heap) is not None
+        words = [w.encode('ascii') for w in words]
+        return lambda heap: all(w in heap for w in words)
+
+
+_heap_tests = {}
+
+
+def heap_test(text, exact=False, members=True):
+    # test(lower_heap) -> False when no name in the heap can match the query; None without a query
+    key = (text, exact, members)
+    if key not in _heap_tests:
+        tokens = QUERY_TOKEN.findall(text or "")
+        _heap_tests[key] = _HeapParser(tokens, exact, members).parse() if tokens else None
+    return _heap_tests[key]
+
+
+def inherits_only_object(reader):
+    # True when every type's members are declared in this DLL or come from
+    # System.Object / System.ValueType, i.e. a missing member name means no match
+    typerefs = reader.rows(TBL_TYPEREF)
+    for td in reader.rows(TBL_TYPEDEF):
+        if not td[3]:
+            continue
+        table, row = reader.decode_coded('TypeDefOrRef', td[3])
+        if table == TBL_TYPEDEF:
+            continue
+        if table != TBL_TYPEREF:
+            return False
+        ref = typerefs[row - 1]
+        if reader.string(ref[2]) != 'System' or reader.string(ref[1]) not in ('Object', 'ValueType'):
+            return False
+    return True
+
+
+def prefilter_tests(search_term, member_filter, exact_mode):
+    # (type test, member test) for one query; None where the heap cannot rule anything out
+    type_test = heap_test(search_term, exact_mode, members=False)
+    member_test = heap_test(member_filter, exact_mode, members=True)
+    if member_test is not None:
+        member_query = compile_query(member_filter, exact_mode, members=True)
+        inherited = [e[0].name for members in FALLBACK_OBJECT_MEMBERS + FALLBACK_VALUETYPE_MEMBERS
+                     for e in members]
+        if member_query.uses_signature or any(member_query.match_name(name) for name in inherited):
+            member_test = None
+    return type_test, member_test
+
+
+def prefilter_dlls(dll_paths, queries):
+    # Returns the DLLs whose #Strings heap can satisfy -s (and -f where inherited members
+    # cannot match) of at least one (search_term, member_filter, exact_mode) query;
+    # DLLs that cannot be read are kept for the full inspection
+    tests = [prefilter_tests(*q) for q in queries]
+    if any(type_test is None and member_test is None for type_test, member_test in tests):
+        return list(dll_paths)
+
+    candidates = []
+    for path in dll_paths:
+        try:
+            reader = MetadataReader(path)
+        except (OSError, MetadataError):
+            candidates.append(path)
+            continue
+        try:
+            heap = reader.strings_heap().lower()
+            keep = False
+            only_object = None
+            for type_test, member_test in tests:
+                if type_test is not None and not type_test(heap):
+                    continue
+                if member_test is not None and not member_test(heap):
+                    if only_object is None:
+                        only_object = inherits_only_object(reader)
+                    if only_object:
+                        continue
+                keep = True
+                break
+        except (MetadataError, IndexError, struct.error):
+            keep = True
+        finally:
+            reader.close()
+        if keep:
+            candidates.append(path)
+    return candidates
+
+
+# ============================================================
+# INSPECT
+# ============================================================
+
+def inspect_dll(dll_path, search_term=None, member_filter=None,
+                ext_mode=False, deep_mode=False, exact_mode=False, backend=None, profile=None, declared=False):
+    # Returns (version, matches). The assembly is loaded here; matches is a lazy
+    # stream of TypeMatch records, so only one type's members are held at a time.
+    # profile (a DllProfile) receives the load/scan times and swallowed errors.
+
+    if backend is None:
+        backend = get_backend(DEFAULT_BACKEND)
+
+    started = time.perf_counter()
+    try:
+        assembly = backend.load(dll_path)
+        version = backend.version(assembly)
+    except Exception as e:
+        if profile is not None:
+            profile.load = time.perf_counter() - started
+            profile.error(e)
+        return "Unknown", iter(())
+
+    if profile is not None:
+        profile.load = time.perf_counter() - started
+        if backend.name == 'index':
+            profile.errors.extend(backend.load_errors(assembly))
+    return version, iter_matches(backend, assembly, search_term, member_filter,
+                                 ext_mode, deep_mode, exact_mode, profile, declared)
+
+
+def iter_matches(backend, assembly, search_term, member_filter, ext_mode, deep_mode, exact_mode,
+                 profile=None, declared=False):
+    started = time.perf_counter()
+    try:
+        type_query = compile_query(search_term, exact_mode, members=False)
+        member_query = compile_query(member_filter, exact_mode, members=True)
+        match = member_query.match_name
+        kinds = ('F', 'M', 'P') if deep_mode else ('M', 'P') if ext_mode else ('M',)
+        split = InheritedSplit(backend, kinds, member_query) if declared else None
+
+        for t in backend.public_types(assembly):
+            info = backend.type_info(t)
+            if profile is not None:
+                profile.types += 1
+
+            if not type_query.match_type(info):
+                continue
+
+            records = []
+
+            if deep_mode:
+                records.extend(backend.fields(t, match))
+
+            records.extend(backend.methods(t, match))
+
+            if ext_mode or deep_mode:
+                records.extend(backend.properties(t, match))
+
+            if member_query.uses_signature:
+                records = [r for r in records if member_query.match_member(r)]
+
+            if records:
+                if profile is not None:
+                    # Time spent by the consumer between yields is not scan time
+                    profile.scan += time.perf_counter() - started
+                yield split.type_match(t, info, records) if split else TypeMatch(info, records)
+                started = time.perf_counter()
+
+    except Exception as e:
+        if profile is not None:
+            profile.error(e)
+
+    if profile is not None:
+        profile.scan += time.perf_counter() - started
+
+
+def loose_member_key(rec):
+    return rec.kind, rec.name, rec.is_static, tuple(n for _, n in rec.params) if rec.params is not None else None
+
+
+class InheritedSplit:
+    # --declared: splits a type's flattened records into the ones it declares and the ones it
+    # inherits from its direct base. Each base type is split once per scanned DLL and its
+    # Ancestor entry is shared by every subclass, so a deep chain is walked only once.
+
+    def __init__(self, backend, kinds, member_query):
+        self.backend = backend
+        self.kinds = kinds
+        self.member_query = member_query
+        self.records = {}
+        self.ancestors = {}
+
+    def type_match(self, t, info, records):
+        return TypeMatch(info, *self.split(t, info, records))
+
+    def select(self, records):
+        records = [r for r in records if r.kind in self.kinds and self.member_query.match_name(r.name)]
+        if self.member_query.uses_signature:
+            records = [r for r in records if self.member_query.match_member(r)]
+        return records
+
+    def base_records(self, t):
+        if t not in self.records:
+            getters = {'F': self.backend.fields, 'M': self.backend.methods, 'P': self.backend.properties}
+            self.records[t] = self.select([r for kind in self.kinds for r in getters[kind](t, lambda name: True)])
+        return self.records[t]
+
+    def split(self, t, info, records):
+        base = self.backend.base_type(t)
+        if base is not None:
+            ancestor = self.ancestor(base)
+            base_records = self.base_records(base)
+        elif info.base_name in ('Object', 'ValueType', 'Enum'):
+            # Base outside the readable DLLs (e.g. System.Object when CoreLib is not indexed); any
+            # other unreadable base would wrongly credit its members to System.Object
+            ancestor = self.fallback(info.is_value_type)
+            base_records = ancestor.members
+        else:
+            ancestor = None
+        if ancestor is None:
+            return records, 0, None
+        # A generic base is split in its open form (T), so its records only match by name and parameter names
+        key = loose_member_key if '`' in ancestor.info.name else None
+        remaining = Counter(map(key, base_records) if key else base_records)
+        members = []
+        for rec in records:
+            k = key(rec) if key else rec
+            if remaining[k]:
+                remaining[k] -= 1
+            else:
+                members.append(rec)
+        inherited = len(records) - len(members)
+        return members, inherited, ancestor if inherited else None
+
+    def ancestor(self, t):
+        if t not in self.ancestors:
+            self.ancestors[t] = None
+            info = self.backend.type_info(t)
+            self.ancestors[t] = Ancestor(info, *self.split(t, info, self.base_records(t)))
+        return self.ancestors[t]
+
+    def fallback(self, value_type):
+        key = ('ValueType',) if value_type else ('Object',)
+        if key not in self.ancestors:
+            fallback = FALLBACK_VALUETYPE_MEMBERS if value_type else FALLBACK_OBJECT_MEMBERS
+            self.ancestors[key] = Ancestor(TypeInfo('System', key[0], False, None),
+                                           self.select([e[0] for members in fallback for e in members]), 0, None)
+        return self.ancestors[key]
+
+
+def inspect_task(dll_path, backend, search_term, member_filter, ext_mode, deep_mode, exact_mode,
+                 profile=False, declared=False):
+    # With profile=True the DllProfile travels back with the results (also from -j workers)
+    stats = DllProfile(os.path.basename(dll_path)) if profile else None
+    version, matches = inspect_dll(dll_path, search_term, member_filter,
+                                   ext_mode, deep_mode, exact_mode, backend, stats, declared)
+    if stats is not None:
+        return str(version), matches, stats
+    return str(version), matches
+
+
+def batch_task(dll_path, backend, queries):
+    # One pass for many (search_term, member_filter, ext_mode, deep_mode, exact_mode) queries:
+    # each public type is enumerated once and its member lists are read at most once, then
+    # filtered per query. Returns (version, [list of TypeMatch for each query], errors).
+    results = [[] for _ in queries]
+    try:
+        assembly = backend.load(dll_path)
+        version = backend.version(assembly)
+    except Exception as e:
+        return "Unknown", results, [error_text(e)]
+    errors = backend.load_errors(assembly) if backend.name == 'index' else []
+
+    compiled = [(compile_query(q[0], q[4], members=False), compile_query(q[1], q[4], members=True), q[2], q[3])
+                for q in queries]
+    getters = {'F': backend.fields, 'M': backend.methods, 'P': backend.properties}
+    try:
+        for t in backend.public_types(assembly):
+            info = backend.type_info(t)
+            wanted = [(i, c) for i, c in enumerate(compiled) if c[0].match_type(info)]
+            members = {}
+            for i, (type_query, member_query, ext_mode, deep_mode) in wanted:
+                kinds = ('F', 'M', 'P') if deep_mode else ('M', 'P') if ext_mode else ('M',)
+                records = []
+                for kind in kinds:
+                    if kind not in members:
+                        members[kind] = list(getters[kind](t, lambda name: True))
+                    records.extend(r for r in members[kind] if member_query.match_name(r.name))
+                if member_query.uses_signature:
+                    records = [r for r in records if member_query.match_member(r)]
+                if records:
+                    results[i].append(TypeMatch(info, records))
+    except Exception as e:
+        errors.append(error_text(e))
+    return str(version), results, errors
+
+
+# ============================================================
+# REPORT WRITERS
+# ============================================================
+
+KIND_NAMES = {'F': 'field', 'M': 'method', 'P': 'property'}
+
+
+def type_label(info):
+    t_type = "Struct" if info.is_value_type else "Class"
+    base_info = " : {n}".format(n=info.base_name) if info.base_name and info.base_name != "Object" else ""
+    return "{tt}: {tn}{bi}".format(tt=t_type, tn=info.name, bi=base_info)
+
+
+def format_type_header(info):
+    return "[NS: {ns}] -> {t}".format(ns=info.namespace, t=type_label(info))
+
+
+class TextWriter:
+
+    extension = ".txt"
+
+    def __init__(self, f):
+        self.f = f
+        self.rendered = set()
+
+    def begin(self, target_dir, search_term, member_filter):
+        self.f.write("REPORT: {d}\nSEARCH: {s} | FILTER: {mf}\n".format(
+            d=target_dir, s=search_term, mf=member_filter))
+        self.f.write("=" * 60 + "\n")
+
+    def file(self, dll, version):
+        self.f.write("\nFILE: {dll} (v{v})\n".format(dll=dll, v=version))
+        self.f.write("-" * 60 + "\n")
+
+    def type_match(self, dll, version, match):
+        self.f.write("\n" + format_type_header(match.info) + "\n")
+        for key, text in match.attributes:
+            if key is None:
+                self.f.write("  [@] {a}\n".format(a=text))
+        for rec in match.members:
+            self.f.write(format_member(rec) + "\n")
+            if match.attributes:
+                for text in member_attributes(match, rec):
+                    self.f.write("      [@] {a}\n".format(a=text))
+        for owner, dll, rec in match.extensions:
+            self.f.write(format_extension(owner, dll, rec) + "\n")
+        self.rendered.add(type_full_name(match.info))
+        if match.base is not None:
+            self.inherited(match)
+
+    def inherited(self, match):
+        # --declared: a back-reference per type; each base type's own members are written once per log
+        self.f.write("  ... inherits {n} member(s) from {b}\n".format(
+            n=match.inherited, b=type_full_name(match.base.info)))
+        base = match.base
+        while base is not None and type_full_name(base.info) not in self.rendered:
+            self.rendered.add(type_full_name(base.info))
+            self.f.write("\n{h} (base type)\n".format(h=format_type_header(base.info)))
+            for rec in base.members:
+                self.f.write(format_member(rec) + "\n")
+            if base.base is not None:
+                self.f.write("  ... inherits {n} member(s) from {b}\n".format(
+                    n=base.inherited, b=type_full_name(base.base.info)))
+            base = base.base
+
+    def end(self, total_matches):
+        if total_matches == 0:
+            self.f.write("\nNo results found.\n")
+
+
+def format_extension(owner, dll, rec):
+    # "  [X] bool Any(this IEnumerable<TSource> source)  <- System.Linq.Enumerable (System.Linq.dll)"
+    params = ", ".join("{t} {n}".format(t=t, n=n) for t, n in rec.params)
+    return "  [X] {rt} {n}(this {params})  <- {o} ({dll})".format(
+        rt=rec.type_name, n=rec.name, params=params, o=owner, dll=dll)
+
+
+def member_attributes(match, rec):
+    # TypeMatch.attributes names the record object itself: equal records (a hidden inherited
+    # member, indexer overloads) may carry different attributes
+    return [text for member, text in match.attributes if member is rec]
+
+
+def member_fields(dll, version, info, rec):
+    return {
+        'dll': dll,
+        'version': version,
+        'namespace': info.namespace,
+        'type': info.name,
+        'base': info.base_name,
+        'struct': info.is_value_type,
+        'kind': KIND_NAMES[rec.kind],
+        'static': rec.is_static,
+        'type_name': rec.type_name,
+        'name': rec.name,
+    }
+
+
+class JsonLinesWriter:
+    # One JSON object per member
+
+    extension = ".jsonl"
+
+    def __init__(self, f):
+        self.f = f
+
+    def begin(self, target_dir, search_term, member_filter):
+        pass
+
+    def file(self, dll, version):
+        pass
+
+    def type_match(self, dll, version, match):
+        for rec in match.members:
+            row = member_fields(dll, version, match.info, rec)
+            row['params'] = [{'type': t, 'name': n} for t, n in rec.params] if rec.params is not None else None
+            if match.attributes:
+                row['type_attributes'] = [text for member, text in match.attributes if member is None]
+                row['attributes'] = member_attributes(match, rec)
+            self.f.write(json.dumps(row) + "\n")
+        for owner, ext_dll, rec in match.extensions:
+            row = member_fields(dll, version, match.info, rec)
+            row['kind'] = 'extension'
+            row['params'] = [{'type': t, 'name': n} for t, n in rec.params]
+            row['declared_in'] = owner
+            row['declared_dll'] = ext_dll
+            self.f.write(json.dumps(row) + "\n")
+
+    def end(self, total_matches):
+        pass
+
+
+class CsvWriter:
+
+    extension = ".csv"
+    columns = ('dll', 'version', 'namespace', 'type', 'base', 'struct',
+               'kind', 'static', 'type_name', 'name', 'params')
+
+    def __init__(self, f):
+        self.writer = csv.writer(f)
+
+    def begin(self, target_dir, search_term, member_filter):
+        self.writer.writerow(self.columns)
+
+    def file(self, dll, version):
+        pass
+
+    def type_match(self, dll, version, match):
+        for rec in match.members:
+            row = member_fields(dll, version, match.info, rec)
+            row['params'] = ", ".join("{t} {n}".format(t=t, n=n) for t, n in rec.params or ())
+            self.writer.writerow([row[c] for c in self.columns])
+        for owner, _, rec in match.extensions:
+            row = member_fields(dll, version, match.info, rec)
+            row['kind'] = 'extension'
+            row['name'] = "{o}.{n}".format(o=owner, n=rec.name)
+            row['params'] = ", ".join("{t} {n}".format(t=t, n=n) for t, n in rec.params)
+            self.writer.writerow([row[c] for c in self.columns])
+
+    def end(self, total_matches):
+        pass
+
+
+WRITERS = {'text': TextWriter, 'jsonl': JsonLinesWriter, 'csv': CsvWriter}
+
+
+def get_writer(name, f):
+    return WRITERS[name](f)
+
+
+# ============================================================
+# PARALLEL SCAN
+# ============================================================
+
+class WorkerCrash(Exception):
+    pass
+
+
+_worker_backend = None
+
+# Worker processes started (pools) and the largest RSS a worker reported, for -v
+WORKER_STATS = {'pools': 0, 'peak_rss': 0}
+
+
+def process_rss():
+    # Current resident set size of this process in bytes, 0 if it cannot be read
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                       [(name, ctypes.c_size_t) for name in (
+                           'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                           'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                           'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return 0
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def _init_worker(backend_name):
+    global _worker_backend
+    _worker_backend = get_backend(backend_name)
+
+
+def _run_task(task, dll_path, args, report_rss=False):
+    # Lazy result streams cannot be pickled, so a worker sends its DLL's results as a list
+    result = task(dll_path, _worker_backend, *args)
+    if isinstance(result, tuple):
+        result = tuple(list(r) if isinstance(r, GeneratorType) else r for r in result)
+    if report_rss:
+        return result, process_rss()
+    return result
+
+
+def _worker_pool(jobs, backend_name):
+    # spawn: every worker boots its own CLR / metadata reader, never a forked copy
+    WORKER_STATS['pools'] += 1
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, initargs=(backend_name,))
+
+
+def run_in_workers(task, dll_paths, jobs, backend_name, args=(), recycle=None):
+    # Yields (position, result) in completion order. At most `jobs` DLLs are in
+    # flight, so when a worker process dies only those are suspects; each suspect
+    # is then re-run alone and the one that still kills its worker is reported.
+    # recycle=(batch, mem_limit): the workers are replaced by fresh processes after
+    # `batch` DLLs each, or once one of them reports an RSS above mem_limit bytes,
+    # so everything a runtime loaded is released with its process.
+    queue = deque(range(len(dll_paths)))
+    suspects = deque()
+    running = {}
+    pool = _worker_pool(jobs, backend_name)
+    submitted = 0
+    draining = False
+    solo = None
+    report_rss = recycle is not None
+
+    def unpack(result):
+        nonlocal draining
+        if not report_rss:
+            return result
+        result, rss = result
+        WORKER_STATS['peak_rss'] = max(WORKER_STATS['peak_rss'], rss)
+        if recycle[1] and rss > recycle[1]:
+            draining = True
+        return result
+
+    try:
+        while queue or running or suspects:
+            if suspects and not running:
+                pos = suspects.popleft()
+                if solo is None:
+                    solo = _worker_pool(1, backend_name)
+                try:
+                    result = unpack(solo.submit(_run_task, task, dll_paths[pos], args, report_rss).result())
+                    if report_rss:
+                        # A suspect gets a process of its own; nothing else shares it
+                        solo.shutdown()
+                        solo = None
+                except BrokenProcessPool:
+                    solo.shutdown()
+                    solo = None
+                    result = WorkerCrash("worker process crashed")
+                except Exception as e:
+                    result = WorkerCrash("{t}: {e}".format(t=type(e).__name__, e=e))
+                yield pos, result
+                continue
+
+            if draining and not running:
+                pool.shutdown()
+                pool = _worker_pool(jobs, backend_name)
+                submitted = 0
+                draining = False
+                continue
+
+            while queue and len(running) < jobs and not draining:
+                if recycle is not None and submitted >= recycle[0] * jobs:
+                    draining = True
+                    break
+                pos = queue.popleft()
+                running[pool.submit(_run_task, task, dll_paths[pos], args, report_rss)] = pos
+                submitted += 1
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            broken = False
+            for fut in done:
+                pos = running.pop(fut)
+                try:
+                    result = unpack(fut.result())
+                except BrokenProcessPool:
+                    suspects.append(pos)
+                    broken = True
+                    continue
+                except Exception as e:
+                    result = WorkerCrash("{t}: {e}".format(t=type(e).__name__, e=e))
+                yield pos, result
+
+            if broken:
+                suspects.extend(running.values())
+                running.clear()
+                pool.shutdown()
+                pool = _worker_pool(jobs, backend_name)
+                submitted = 0
+                draining = False
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if solo is not None:
+            solo.shutdown(cancel_futures=True)
+
+
+def print_progress(i, total, label, dll_path):
+    dll = os.path.basename(dll_path)
+    print("\r[{i}/{t}] {l} {dll}".format(i=i, t=total, l=label, dll=dll[:30].ljust(30)), end="", flush=True)
+
+
+def map_dlls(task, dll_paths, backend, jobs=1, label="Analyzing", args=(), isolate=False, recycle=None):
+    # Runs task(dll_path, backend, *args) for every DLL and yields (dll_path, result)
+    # in the original order. Results of crashed workers come back as None.
+    # isolate=True (or a recycle setting) always uses worker processes, even for a single job.
+    total = len(dll_paths)
+    isolate = isolate or recycle is not None
+
+    if backend.name in ('index', 'memory', 'snapshot') or (not isolate and (jobs <= 1 or total <= 1)):
+        for i, path in enumerate(dll_paths, start=1):
+            print_progress(i, total, label, path)
+            yield path, task(path, backend, *args)
+        return
+
+    finished = {}
+    next_pos = 0
+    for done, (pos, result) in enumerate(run_in_workers(task, dll_paths, jobs, backend.name, args, recycle),
+                                         start=1):
+        print_progress(done, total, label, dll_paths[pos])
+        if isinstance(result, WorkerCrash):
+            print("\n[!] {dll}: {e} (skipped)".format(dll=os.path.basename(dll_paths[pos]), e=result))
+            result = None
+        finished[pos] = result
+        while next_pos in finished:
+            yield dll_paths[next_pos], finished.pop(next_pos)
+            next_pos += 1
+
+
+# ============================================================
+# PROFILE
+# ============================================================
+
+def error_text(e):
+    # First line only: CLR exceptions carry the whole .NET stack trace
+    message = str(e).strip().split("\n")[0]
+    return "{t}: {m}".format(t=type(e).__name__, m=message) if message else type(e).__name__
+
+
+class DllProfile:
+    __slots__ = ('dll', 'load', 'scan', 'write', 'types', 'members', 'matched', 'bytes', 'errors')
+
+    def __init__(self, dll):
+        self.dll = dll
+        self.load = self.scan = self.write = 0.0
+        self.types = self.members = self.matched = self.bytes = 0
+        self.errors = []
+
+    def error(self, e):
+        self.errors.append(error_text(e))
+
+    @property
+    def total(self):
+        return self.load + self.scan + self.write
+
+    def to_dict(self):
+        d = dict((k, getattr(self, k)) for k in self.__slots__)
+        d['total'] = self.total
+        return d
+
+
+def get_profile_top(args):
+    value = get_arg_value(args, "--profile")
+    return int(value) if value and value.isdigit() else 10
+
+
+def print_profile(profiles, top):
+    ranked = sorted(profiles, key=lambda p: p.total, reverse=True)[:top]
+    print("\nPROFILE (slowest {n} of {t} DLLs):\n".format(n=len(ranked), t=len(profiles)))
+    print("  {d:<34} {l:>7} {s:>7} {w:>7} {ty:>6} {m:>7} {ma:>6} {kb:>8}  {e}".format(
+        d="DLL", l="Load", s="Scan", w="Write", ty="Types", m="Members", ma="Match", kb="KB", e="Errors"))
+    for p in ranked:
+        print("  {d:<34} {l:>7.3f} {s:>7.3f} {w:>7.3f} {ty:>6} {m:>7} {ma:>6} {kb:>8.1f}  {e}".format(
+            d=p.dll[:34], l=p.load, s=p.scan, w=p.write, ty=p.types, m=p.members,
+            ma=p.matched, kb=p.bytes / 1024.0, e=len(p.errors) or ""))
+
+    print("\nTotal: load {l:.2f}s, scan {s:.2f}s, write {w:.2f}s; {ty} types, {m} members, {kb:.1f} KB".format(
+        l=sum(p.load for p in profiles), s=sum(p.scan for p in profiles), w=sum(p.write for p in profiles),
+        ty=sum(p.types for p in profiles), m=sum(p.members for p in profiles),
+        kb=sum(p.bytes for p in profiles) / 1024.0))
+
+    failed = [p for p in profiles if p.errors]
+    if failed:
+        print("\nSWALLOWED ERRORS ({n} DLL(s)):".format(n=len(failed)))
+        for p in failed:
+            for error in p.errors:
+                print("  {d}: {e}".format(d=p.dll, e=error))
+
+
+def print_read_profile(graph, top):
+    # --deps only reads the metadata tables; unreadable DLLs are already listed
+    ranked = sorted(graph.dlls, key=lambda dll: graph.read_times.get(dll, 0.0), reverse=True)[:top]
+    print("\nPROFILE (slowest {n} of {t} DLLs):\n".format(n=len(ranked), t=len(graph.dlls)))
+    print("  {d:<34} {r:>8} {c:>5}".format(d="DLL", r="Read", c="Refs"))
+    for dll in ranked:
+        print("  {d:<34} {r:>8.4f} {c:>5}".format(d=dll[:34], r=graph.read_times.get(dll, 0.0),
+                                                 c=len(graph.refs[dll])))
+    print("\nTotal: read {t:.3f}s".format(t=sum(graph.read_times.values())))
+
+
+def save_profile(profiles, path, backend_name, elapsed):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({'backend': backend_name, 'elapsed': elapsed,
+                   'dlls': [p.to_dict() for p in profiles]}, f, indent=1)
+
+
+# ============================================================
+# SNAPSHOT
+# ============================================================
+
+# Binary API snapshot (--export-snapshot / --snapshot), little-endian, every field a u32:
+#   header   magic, string count, string blob size, then the row count of each table below
+#   strings  (count + 1) offsets into the UTF-8 blob, then the blob (each distinct string once)
+#   dlls     name, version, mvid, sha256, first ref, ref count, first type, type count
+#   types    namespace, name, base, is_value_type, first member, member count,
+#            first list entry, base count, interface count (bases, then interfaces)
+#   members  flags (kind 0-2 = F/M/P, 4 = static, 8 = no params), name, type name, first param, param count
+#   params   type, name
+#   lists    string ids: assembly references, base chains and interfaces
+SNAPSHOT_MAGIC = b"DLLSNAP1"
+SNAPSHOT_HEADER = struct.Struct('<8s8I')
+SNAPSHOT_DLL = struct.Struct('<8I')
+SNAPSHOT_TYPE = struct.Struct('<9I')
+SNAPSHOT_MEMBER = struct.Struct('<5I')
+SNAPSHOT_PARAM = struct.Struct('<2I')
+SNAPSHOT_NONE = 0xFFFFFFFF
+SNAPSHOT_KINDS = "FMP"
+
+
+def is_snapshot(path):
+    # Any format version: SnapshotBackend tells an older one apart from a corrupt file
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SNAPSHOT_MAGIC) - 1) == SNAPSHOT_MAGIC[:-1]
+    except OSError:
+        return False
+
+
+def write_snapshot(path, extracted_dlls):
+    # extracted_dlls: (dll file name, sha256 or None, extract_dll result) per DLL
+    strings = {}
+    dlls, types, members, params, lists = [], [], [], [], []
+
+    def sid(text):
+        if text is None:
+            return SNAPSHOT_NONE
+        return strings.setdefault(text, len(strings))
+
+    for dll, sha256, (version, mvid, refs, dll_types, hierarchy, _, _, _) in extracted_dlls:
+        dlls += [sid(dll), sid(version), sid(mvid), sid(sha256), len(lists), len(refs), len(types) // 9,
+                 len(dll_types)]
+        lists += [sid(r) for r in refs]
+        for (info, records), (bases, interfaces) in zip(dll_types, hierarchy):
+            types += [sid(info.namespace), sid(info.name), sid(info.base_name), int(info.is_value_type),
+                      len(members) // 5, len(records), len(lists), len(bases), len(interfaces)]
+            lists += [sid(name) for name in bases] + [sid(name) for name in interfaces]
+            for rec in records:
+                flags = SNAPSHOT_KINDS.index(rec.kind) | (4 if rec.is_static else 0) | (8 if rec.params is None else 0)
+                members += [flags, sid(rec.name), sid(rec.type_name), len(params) // 2, len(rec.params or ())]
+                for param_type, param_name in rec.params or ():
+                    params += [sid(param_type), sid(param_name)]
+
+    encoded = [text.encode('utf-8') for text in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    with open(path, 'wb') as f:
+        f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, len(encoded), offsets[-1], len(dlls) // 8, len(types) // 9,
+                                     len(members) // 5, len(params) // 2, len(lists), 0))
+        f.write(struct.pack('<{n}I'.format(n=len(offsets)), *offsets))
+        f.write(b"".join(encoded))
+        for table in (dlls, types, members, params, lists):
+            f.write(struct.pack('<{n}I'.format(n=len(table)), *table))
+    return len(dlls) // 8, len(types) // 9, len(members) // 5
+
+
+class SnapshotBackend:
+    # Answers queries from a memory-mapped --export-snapshot file; no .NET runtime, nothing is parsed up front
+
+    name = 'snapshot'
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("empty file, not a dll-check snapshot: {p}".format(p=path))
+        if len(self.data) < SNAPSHOT_HEADER.size or self.data[:len(SNAPSHOT_MAGIC) - 1] != SNAPSHOT_MAGIC[:-1]:
+            self._reject("not a dll-check snapshot: {p}".format(p=path))
+        magic, n_strings, blob_size, n_dlls, n_types, n_members, n_params, n_lists, _ = \
+            SNAPSHOT_HEADER.unpack_from(self.data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            self._reject("{p} is a format {old} snapshot, this version reads format {new}: export it again".format(
+                p=path, old=magic[-1:].decode('ascii', 'replace'), new=SNAPSHOT_MAGIC[-1:].decode('ascii')))
+        self.counts = (n_dlls, n_types, n_members)
+        self.string_offsets = SNAPSHOT_HEADER.size
+        self.blob = self.string_offsets + 4 * (n_strings + 1)
+        self.dll_table = self.blob + blob_size
+        self.type_table = self.dll_table + SNAPSHOT_DLL.size * n_dlls
+        self.member_table = self.type_table + SNAPSHOT_TYPE.size * n_types
+        self.param_table = self.member_table + SNAPSHOT_MEMBER.size * n_members
+        self.list_table = self.param_table + SNAPSHOT_PARAM.size * n_params
+        if self.list_table + 4 * n_lists != len(self.data):
+            self._reject("corrupt or truncated snapshot: {p}".format(p=path))
+        self._strings = {}
+        self.dlls = [self.string(SNAPSHOT_DLL.unpack_from(self.data, self.dll_table + i * SNAPSHOT_DLL.size)[0])
+                     for i in range(n_dlls)]
+        self._by_name = dict((dll.lower(), i) for i, dll in enumerate(self.dlls))
+        self._types_by_name = None
+
+    def _reject(self, message):
+        self.data.close()
+        raise ValueError(message)
+
+    def string(self, sid):
+        if sid == SNAPSHOT_NONE:
+            return None
+        text = self._strings.get(sid)
+        if text is None:
+            start, end = struct.unpack_from('<2I', self.data, self.string_offsets + 4 * sid)
+            text = self._strings[sid] = self.data[self.blob + start:self.blob + end].decode('utf-8')
+        return text
+
+    def _list(self, first, count):
+        return [self.string(sid) for sid in struct.unpack_from('<{n}I'.format(n=count), self.data,
+                                                              self.list_table + 4 * first)]
+
+    def load(self, dll):
+        pos = self._by_name.get(dll.lower())
+        if pos is None:
+            raise LookupError("not in the snapshot: {d}".format(d=dll))
+        return SNAPSHOT_DLL.unpack_from(self.data, self.dll_table + pos * SNAPSHOT_DLL.size)
+
+    def version(self, asm):
+        return self.string(asm[1])
+
+    def mvid(self, asm):
+        return self.string(asm[2])
+
+    def sha256(self, asm):
+        return self.string(asm[3])
+
+    def references(self, asm):
+        return self._list(asm[4], asm[5])
+
+    def public_types(self, asm):
+        return [SNAPSHOT_TYPE.unpack_from(self.data, self.type_table + i * SNAPSHOT_TYPE.size)
+                for i in range(asm[6], asm[6] + asm[7])]
+
+    def type_info(self, t):
+        return TypeInfo(self.string(t[0]), self.string(t[1]), bool(t[3]), self.string(t[2]))
+
+    def hierarchy(self, t):
+        return self._list(t[6], t[7]), self._list(t[6] + t[7], t[8])
+
+    def base_type(self, t):
+        if not t[7]:
+            return None
+        if self._types_by_name is None:
+            self._types_by_name = {}
+            for i in range(self.counts[1]):
+                other = SNAPSHOT_TYPE.unpack_from(self.data, self.type_table + i * SNAPSHOT_TYPE.size)
+                self._types_by_name.setdefault(type_full_name(self.type_info(other)), other)
+        return self._types_by_name.get(self._list(t[6], 1)[0])
+
+    def _members(self, t, kind, match):
+        code = SNAPSHOT_KINDS.index(kind)
+        found = []
+        for pos in range(t[4], t[4] + t[5]):
+            flags, name, type_name, first_param, n_params = SNAPSHOT_MEMBER.unpack_from(
+                self.data, self.member_table + pos * SNAPSHOT_MEMBER.size)
+            if flags & 3 != code:
+                continue
+            name = self.string(name)
+            if not match(name):
+                continue
+            params = None
+            if not flags & 8:
+                raw = struct.unpack_from('<{n}I'.format(n=2 * n_params), self.data,
+                                         self.param_table + first_param * SNAPSHOT_PARAM.size)
+                params = tuple((self.string(raw[i]), self.string(raw[i + 1])) for i in range(0, len(raw), 2))
+            found.append(MemberRecord(kind, name, bool(flags & 4), self.string(type_name), params))
+        return found
+
+    def fields(self, t, match):
+        return self._members(t, 'F', match)
+
+    def methods(self, t, match):
+        return self._members(t, 'M', match)
+
+    def properties(self, t, match):
+        return self._members(t, 'P', match)
+
+
+def export_snapshot(path, dll_paths, backend, jobs=1, recycle=None, label=os.path.basename):
+    # DLLs are stored under label(path); queries on the snapshot use these names as paths
+    def extracted():
+        for dll_path, result in map_dlls(extract_dll, dll_paths, backend, jobs, "Exporting", recycle=recycle):
+            yield label(dll_path), file_hash(dll_path), result or EMPTY_EXTRACT
+    counts = write_snapshot(path, extracted())
+    print()
+    return counts
+
+
+# ============================================================
+# DIFF
+# ============================================================
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_jsonl_snapshot(path):
+    # Public surface per DLL from a --format jsonl log: {dll: (version, [(TypeInfo, members)])}
+    dlls = {}
+    kinds = {v: k for k, v in KIND_NAMES.items()}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            version, types = dlls.setdefault(row['dll'], (row['version'], {}))
+            key = (row['namespace'], row['type'])
+            if key not in types:
+                types[key] = (TypeInfo(row['namespace'], row['type'], row['struct'], row['base']), [])
+            params = tuple((p['type'], p['name']) for p in row['params']) if row['params'] is not None else None
+            types[key][1].append(MemberRecord(kinds[row['kind']], row['name'], row['static'],
+                                              row['type_name'], params))
+    return {dll: (version, list(types.values())) for dll, (version, types) in dlls.items()}
+
+
+def api_surface(types, type_query, member_query, kinds, keep_empty):
+    # {(namespace, type): (TypeInfo, {(kind, name): {signature lines}})} for the -s/-f/-e/-d selection;
+    # keep_empty keeps the matching types that have no matching members
+    surface = {}
+    for info, members in types:
+        if not type_query.match_type(info):
+            continue
+        sigs = {}
+        for rec in members:
+            if rec.kind not in kinds or not member_query.match_name(rec.name):
+                continue
+            if member_query.uses_signature and not member_query.match_member(rec):
+                continue
+            sigs.setdefault((rec.kind, rec.name), set()).add(format_member(rec).strip())
+        if sigs or keep_empty:
+            surface[(info.namespace, info.name)] = (info, sigs)
+    return surface
+
+
+def diff_surfaces(old, new):
+    # Report lines grouped by namespace: added / removed / changed types
+    by_namespace = {}
+    for key in sorted(set(old) | set(new), key=lambda k: (k[0] or "", k[1])):
+        lines = []
+        if key not in old:
+            info, sigs = new[key]
+            lines.append("  ADDED   {t} ({n} members)".format(t=type_label(info), n=sum(map(len, sigs.values()))))
+        elif key not in new:
+            info, sigs = old[key]
+            lines.append("  REMOVED {t}".format(t=type_label(info)))
+        else:
+            old_info, old_sigs = old[key]
+            info, new_sigs = new[key]
+            members = []
+            for member in sorted(set(old_sigs) | set(new_sigs)):
+                gone = old_sigs.get(member, set()) - new_sigs.get(member, set())
+                added = new_sigs.get(member, set()) - old_sigs.get(member, set())
+                if gone and added:
+                    members.extend("    ~ was: " + s for s in sorted(gone))
+                    members.extend("    ~ now: " + s for s in sorted(added))
+                else:
+                    members.extend("    + " + s for s in sorted(added))
+                    members.extend("    - " + s for s in sorted(gone))
+            if members or type_label(old_info) != type_label(info):
+                label = type_label(info)
+                if type_label(old_info) != label:
+                    label += "  (was: {t})".format(t=type_label(old_info))
+                lines.append("  CHANGED " + label)
+                lines.extend(members)
+        if lines:
+            by_namespace.setdefault(key[0], []).extend(lines)
+    return by_namespace
+
+
+def run_diff(old_source, new_dir, backend_name, jobs, scan_all, query, log_path, recycle=None):
+    search_term, member_filter, ext_mode, deep_mode, exact_mode = query
+    type_query = compile_query(search_term, exact_mode, members=False)
+    member_query = compile_query(member_filter, exact_mode, members=True)
+    kinds = 'M' + ('P' if ext_mode or deep_mode else '') + ('F' if deep_mode else '')
+
+    # A jsonl log has one row per member, so types without members are missing from it
+    from_jsonl = not os.path.isdir(old_source) and not is_snapshot(old_source)
+
+    def surface(types):
+        return api_surface(types, type_query, member_query, kinds, not (member_filter or from_jsonl))
+
+    new_files = {f.lower(): f for f in select_dlls(os.listdir(new_dir), scan_all)}
+    unchanged = set()
+
+    if os.path.isdir(old_source):
+        old_files = {f.lower(): f for f in select_dlls(os.listdir(old_source), scan_all)}
+        for name in new_files:
+            if name in old_files and file_hash(os.path.join(old_source, old_files[name])) == \
+                    file_hash(os.path.join(new_dir, new_files[name])):
+                unchanged.add(name)
+        # Old and new builds share assembly names: each side gets its own backend,
+        # and clr extraction always runs in worker processes
+        old_paths = [os.path.join(old_source, old_files[n]) for n in sorted(old_files) if n not in unchanged]
+        old_side = {}
+        for path, extracted in map_dlls(extract_dll, old_paths, get_backend(backend_name), jobs,
+                                        "Reading old", isolate=backend_name == 'clr', recycle=recycle):
+            version, _, _, types, _, _, _, _ = extracted or EMPTY_EXTRACT
+            old_side[os.path.basename(path).lower()] = (os.path.basename(path), version, surface(types))
+        print()
+    elif is_snapshot(old_source):
+        try:
+            snapshot = SnapshotBackend(old_source)
+        except ValueError as e:
+            print("[--diff] {e}".format(e=e))
+            return
+        old_side = {}
+        for dll in select_dlls(snapshot.dlls, scan_all):
+            sha256 = snapshot.sha256(snapshot.load(dll))
+            if dll.lower() in new_files and sha256 == file_hash(os.path.join(new_dir, new_files[dll.lower()])):
+                unchanged.add(dll.lower())
+                continue
+            version, _, _, types, _, _, _, _ = extract_dll(dll, snapshot)
+            old_side[dll.lower()] = (dll, version, surface(types))
+    else:
+        old_side = {dll.lower(): (dll, version, surface(types))
+                    for dll, (version, types) in load_jsonl_snapshot(old_source).items()
+                    if dll in select_dlls([dll], scan_all)}
+
+    new_paths = [os.path.join(new_dir, new_files[n]) for n in sorted(new_files) if n not in unchanged]
+    changed = 0
+
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("DIFF: {o} -> {n}\nSEARCH: {s} | FILTER: {mf}\n".format(
+            o=old_source, n=new_dir, s=search_term, mf=member_filter))
+        f.write("=" * 60 + "\n")
+
+        def write_dll(title, by_namespace):
+            f.write("\nDLL: {t}\n".format(t=title))
+            f.write("-" * 60 + "\n")
+            for namespace in sorted(by_namespace, key=lambda n: n or ""):
+                f.write("\n[NS: {ns}]\n".format(ns=namespace))
+                f.write("\n".join(by_namespace[namespace]) + "\n")
+
+        for path, extracted in map_dlls(extract_dll, new_paths, get_backend(backend_name), jobs,
+                                        "Reading new", isolate=backend_name == 'clr', recycle=recycle):
+            dll = os.path.basename(path)
+            version, _, _, types, _, _, _, _ = extracted or EMPTY_EXTRACT
+            old = old_side.pop(dll.lower(), None)
+            if old is None:
+                title = "{d} (added, v{v})".format(d=dll, v=version)
+                by_namespace = diff_surfaces({}, surface(types))
+            else:
+                title = "{d} (v{o} -> v{v})".format(d=dll, o=old[1], v=version)
+                by_namespace = diff_surfaces(old[2], surface(types))
+            if by_namespace:
+                changed += 1
+                write_dll(title, by_namespace)
+
+        for name in sorted(old_side):
+            dll, version, old_surface = old_side[name]
+            by_namespace = diff_surfaces(old_surface, {})
+            if by_namespace:
+                changed += 1
+                write_dll("{d} (removed, v{v})".format(d=dll, v=version), by_namespace)
+
+        summary = "{u} unchanged DLL(s) skipped (same content hash), {c} DLL(s) with API changes.".format(
+            u=len(unchanged), c=changed)
+        f.write("\n" + summary + "\n")
+
+    print("\n\n" + summary)
+    print("Results saved: {f}".format(f=os.path.basename(log_path)))
+
+
+# ============================================================
+# DAEMON / REPL
+# ============================================================
+
+MemoryAssembly = namedtuple('MemoryAssembly', 'version mvid refs types')
+
+
+class MemoryBackend:
+    # Public surface of the served DLLs, extracted once and queried in pure Python
+
+    name = 'memory'
+
+    def __init__(self):
+        self.assemblies = {}
+        self.stamps = {}
+
+    def add(self, path, extracted):
+        version, mvid, refs, types, _, _, _, _ = extracted
+        entries = [(info,
+                    [m for m in members if m.kind == 'F'],
+                    [m for m in members if m.kind == 'M'],
+                    [m for m in members if m.kind == 'P']) for info, members in types]
+        key = index_key(path)
+        self.assemblies[key] = MemoryAssembly(version, mvid, refs, entries)
+        self.stamps[key] = file_stamp(path)
+
+    def stale(self, paths):
+        return [p for p in paths if file_stamp(p) != self.stamps.get(index_key(p))]
+
+    def load(self, path):
+        return self.assemblies[index_key(path)]
+
+    def version(self, asm):
+        return asm.version
+
+    def mvid(self, asm):
+        return asm.mvid
+
+    def references(self, asm):
+        return asm.refs
+
+    def public_types(self, asm):
+        return asm.types
+
+    def type_info(self, t):
+        return t[0]
+
+    def fields(self, t, match):
+        return [r for r in t[1] if match(r.name)]
+
+    def methods(self, t, match):
+        return [r for r in t[2] if match(r.name)]
+
+    def properties(self, t, match):
+        return [r for r in t[3] if match(r.name)]
+
+
+def file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def load_memory(dll_paths, backend):
+    memory = MemoryBackend()
+    for i, path in enumerate(dll_paths, start=1):
+        print_progress(i, len(dll_paths), "Loading", path)
+        memory.add(path, extract_dll(path, backend))
+    print()
+    return memory
+
+
+def sync_memory(memory, dll_paths, backend_name):
+    # A loaded assembly cannot be replaced inside this process, so changed
+    # DLLs are re-extracted in a fresh worker process
+    stale = memory.stale(dll_paths)
+    for pos, extracted in run_in_workers(extract_dll, stale, 1, backend_name):
+        if isinstance(extracted, WorkerCrash):
+            extracted = EMPTY_EXTRACT
+        memory.add(stale[pos], extracted)
+    return len(stale)
+
+
+def daemon_address(log_dir):
+    if sys.platform == 'win32':
+        digest = hashlib.sha1(index_key(log_dir).encode('utf-8')).hexdigest()[:16]
+        return r'\\.\pipe\dll-check-' + digest, 'AF_PIPE'
+    return os.path.join(log_dir, 'serve.sock'), 'AF_UNIX'
+
+
+def daemon_authkey(log_dir, create=False):
+    path = os.path.join(log_dir, 'serve.key')
+    if create:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def connect_daemon(log_dir):
+    address, family = daemon_address(log_dir)
+    if family == 'AF_UNIX' and not os.path.exists(address):
+        return None
+    authkey = daemon_authkey(log_dir)
+    if authkey is None:
+        return None
+    try:
+        return Client(address, family, authkey=authkey)
+    except (OSError, EOFError, AuthenticationError):
+        return None
+
+
+def query_daemon(log_dir, request):
+    # Returns the daemon's answer as (dll, (version, matches)) pairs, or None
+    # when no daemon is running for this directory / DLL selection
+    conn = connect_daemon(log_dir)
+    if conn is None:
+        return None
+    try:
+        conn.send(request)
+        reply = conn.recv()
+    except (OSError, EOFError):
+        conn.close()
+        return None
+    if reply[0] != 'ok':
+        conn.close()
+        if reply[0] == 'error':
+            print("[!] The daemon could not answer ({e}) - scanning locally.".format(e=reply[1]))
+        return None
+    return _daemon_results(conn)
+
+
+def _daemon_results(conn):
+    with conn:
+        while True:
+            item = conn.recv()
+            if item is None:
+                return
+            dll, version, matches = item
+            yield dll, (version, matches)
+
+
+def stop_daemon(log_dir):
+    conn = connect_daemon(log_dir)
+    if conn is None:
+        print("[--serve:stop] No daemon is running.")
+        return
+    with conn:
+        conn.send({'cmd': 'stop'})
+        conn.recv()
+    print("[--serve:stop] Daemon stopped.")
+
+
+def serve(memory, dll_paths, log_dir, target_dir, scan_all, backend_name):
+    conn = connect_daemon(log_dir)
+    if conn is not None:
+        conn.close()
+        print("A daemon is already running (stop it with --serve:stop).")
+        return
+
+    address, family = daemon_address(log_dir)
+    if family == 'AF_UNIX' and os.path.exists(address):
+        os.remove(address)
+    listener = Listener(address, family, authkey=daemon_authkey(log_dir, create=True))
+    print("Serving {n} DLL(s) from {d} on {a} (Ctrl+C or --serve:stop to quit)".format(
+        n=len(dll_paths), d=target_dir, a=address))
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            with conn:
+                try:
+                    request = conn.recv()
+                    if request.get('cmd') == 'stop':
+                        conn.send(('stopped',))
+                        return
+                    if (index_key(request['target_dir']) != index_key(target_dir)
+                            or request['scan_all'] != scan_all
+                            or request['backend'] not in (None, backend_name)):
+                        conn.send(('mismatch',))
+                        continue
+                    search_term, member_filter, ext_mode, deep_mode, exact_mode = request['query']
+                    compile_query(search_term, exact_mode, members=False)
+                    compile_query(member_filter, exact_mode, members=True)
+                    sync_memory(memory, dll_paths, backend_name)
+                    # The whole answer is built before 'ok' goes out, so a bad request
+                    # gets one error reply instead of a half-sent result
+                    answer = []
+                    for path in dll_paths:
+                        version, matches = inspect_dll(path, *request['query'], backend=memory)
+                        answer.append((os.path.basename(path), str(version), list(matches)))
+                    conn.send(('ok',))
+                    for item in answer:
+                        conn.send(item)
+                    conn.send(None)
+                except (OSError, EOFError):
+                    continue
+                except Exception as e:
+                    # A malformed request (missing key, bad query) must not take the daemon down
+                    try:
+                        conn.send(('error', error_text(e)))
+                    except (OSError, EOFError):
+                        pass
+    except KeyboardInterrupt:
+        print()
+    finally:
+        listener.close()
+
+
+def repl(memory, dll_paths, backend_name):
+    print("Enter queries as flags, e.g.: -s ContractBlock -f Get -d   (quit to exit)")
+    writer = TextWriter(sys.stdout)
+    while True:
+        try:
+            line = input("dll> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return
+        if line in ('quit', 'exit'):
+            return
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            print("Invalid input: {e}".format(e=e))
+            continue
+        if not words:
+            continue
+
+        search_term = get_arg_value(words, "-s")
+        member_filter = get_arg_value(words, "-f")
+        exact_mode = "-x" in words
+        try:
+            compile_query(search_term, exact_mode, members=False)
+            compile_query(member_filter, exact_mode, members=True)
+        except QueryError as e:
+            print("Invalid query: {e}".format(e=e))
+            continue
+
+        started = time.time()
+        reloaded = sync_memory(memory, dll_paths, backend_name)
+        total_matches = 0
+        for path in dll_paths:
+            version, matches = inspect_dll(path, search_term, member_filter,
+                                           "-e" in words, "-d" in words, exact_mode, memory)
+            matched = False
+            for match in matches:
+                if not matched:
+                    matched = True
+                    total_matches += 1
+                    writer.file(os.path.basename(path), version)
+                writer.type_match(os.path.basename(path), version, match)
+        print("\n{n} file(s) matched in {t:.0f} ms{r}".format(
+            n=total_matches, t=(time.time() - started) * 1000,
+            r=" ({c} changed DLL(s) reloaded)".format(c=reloaded) if reloaded else ""))
+
+
+# ============================================================
+# WATCH
+# ============================================================
+
+def dir_stamps(target_dir, scan_all):
+    try:
+        files = os.listdir(target_dir)
+    except OSError:
+        return {}
+    paths = [os.path.join(target_dir, dll) for dll in select_dlls(files, scan_all)]
+    return dict((path, file_stamp(path)) for path in paths)
+
+
+def parse_saved_query(name, text, default_format="text"):
+    # "-s ContractBlock -f Get -d" -> (name, query tuple, output format)
+    words = shlex.split(text)
+    search_term = get_arg_value(words, "-s")
+    member_filter = get_arg_value(words, "-f")
+    exact_mode = "-x" in words
+    output_format = get_arg_value(words, "--format") or default_format
+    compile_query(search_term, exact_mode, members=False)
+    compile_query(member_filter, exact_mode, members=True)
+    if output_format not in WRITERS:
+        raise QueryError("unknown format: {f}".format(f=output_format))
+    return name, (search_term, member_filter, "-e" in words, "-d" in words, exact_mode), output_format
+
+
+def write_watch_logs(queries, results, dll_paths, target_dir, log_dir):
+    for name, query, output_format in queries:
+        log_path = os.path.join(log_dir, "Watch_{n}{e}".format(n=re.sub(r'[^\w]', '', name),
+                                                              e=WRITERS[output_format].extension))
+        total_matches = 0
+        with open(log_path, "w", encoding="utf-8", newline="" if output_format == 'csv' else None) as f:
+            writer = get_writer(output_format, f)
+            writer.begin(target_dir, query[0], query[1])
+            for path in dll_paths:
+                version, matches = results[(name, path)]
+                dll = os.path.basename(path)
+                if matches:
+                    total_matches += 1
+                    writer.file(dll, version)
+                for match in matches:
+                    writer.type_match(dll, version, match)
+            writer.end(total_matches)
+
+
+def watch(memory, queries, target_dir, scan_all, backend_name, log_dir, interval):
+    # Polls the DLL stamps (size, mtime); after a change settles, only added / modified DLLs are
+    # re-extracted (in a worker, see sync_memory) and re-queried, then every query log is rewritten
+    stamps = dir_stamps(target_dir, scan_all)
+    results = {}
+
+    def run_queries(paths):
+        for name, query, _ in queries:
+            for path in paths:
+                version, matches = inspect_dll(path, *query, backend=memory)
+                results[(name, path)] = (str(version), list(matches))
+
+    run_queries(list(stamps))
+    write_watch_logs(queries, results, list(stamps), target_dir, log_dir)
+    print("Watching {d}: {n} DLL(s), {q} quer{y} -> {l}/Watch_*, polling every {s:g}s (Ctrl+C to stop)".format(
+        d=target_dir, n=len(stamps), q=len(queries), y="y" if len(queries) == 1 else "ies",
+        l=os.path.basename(log_dir), s=interval))
+
+    try:
+        while True:
+            time.sleep(interval)
+            current = dir_stamps(target_dir, scan_all)
+            if current == stamps:
+                continue
+            # A build writes its outputs in several steps: wait until one poll sees no further change
+            while True:
+                time.sleep(interval)
+                settled = dir_stamps(target_dir, scan_all)
+                if settled == current:
+                    break
+                current = settled
+
+            started = time.time()
+            changed = [path for path in current if stamps.get(path) != current[path]]
+            removed = [path for path in stamps if path not in current]
+            for path in removed:
+                memory.assemblies.pop(index_key(path), None)
+                memory.stamps.pop(index_key(path), None)
+                for name, _, _ in queries:
+                    results.pop((name, path), None)
+            sync_memory(memory, changed, backend_name)
+            run_queries(changed)
+            write_watch_logs(queries, results, list(current), target_dir, log_dir)
+
+            added = len([path for path in changed if path not in stamps])
+            print("[{ts}] {a} added, {m} modified, {r} removed: {q} log(s) refreshed in {t:.2f}s".format(
+                ts=datetime.now().strftime("%H:%M:%S"), a=added, m=len(changed) - added, r=len(removed),
+                q=len(queries), t=time.time() - started))
+            stamps = current
+    except KeyboardInterrupt:
+        print()
+
+
+# ============================================================
+# BATCH
+# ============================================================
+
+def read_batch_file(path, default_format):
+    # One query per line: "name = -s Contract -f Get -d" (or just the flags, named after -s / -f);
+    # blank lines and lines starting with # are skipped
+    queries = []
+    names = set()
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, sep, text = line.partition('=')
+            if not sep or name.strip().startswith('-'):
+                name, text = "", line
+            try:
+                words = shlex.split(text)
+                name = re.sub(r'[^\w]', '', name.strip()) or "_f_".join(
+                    re.sub(r'[^\w]', '', value) for value in (get_arg_value(words, "-s") or "All",
+                                                               get_arg_value(words, "-f")) if value)
+                if not (get_arg_value(words, "-s") or get_arg_value(words, "-f")):
+                    raise QueryError("needs -s and / or -f")
+                if name.lower() in names:
+                    raise QueryError("duplicate name \"{n}\"".format(n=name))
+                queries.append(parse_saved_query(name, text, default_format))
+            except (QueryError, ValueError) as e:
+                raise QueryError("{f}, line {n}: {e}".format(f=os.path.basename(path), n=line_no, e=e))
+            names.add(name.lower())
+    return queries
+
+
+def describe_batch_query(query, output_format):
+    search_term, member_filter, ext_mode, deep_mode, exact_mode = query
+    words = []
+    if search_term:
+        words += ["-s", search_term]
+    if member_filter:
+        words += ["-f", member_filter]
+    words += [flag for flag, on in (("-e", ext_mode), ("-d", deep_mode), ("-x", exact_mode)) if on]
+    if output_format != "text":
+        words += ["--format", output_format]
+    return shlex.join(words)
+
+
+def run_batch(queries, dll_paths, backend, jobs, recycle, label, target_dir, log_dir, batch_name, prefilter=True):
+    # Every DLL is loaded and enumerated once for all queries (batch_task); each query gets its
+    # own log, and <ts>_Batch_<name>.txt lists them. Returns the index path.
+    ts = datetime.now().strftime("%Y-%m-%d_%H%M%S")
+    base = os.path.join(log_dir, "{ts}_Batch_{b}".format(ts=ts, b=re.sub(r'[^\w]', '', batch_name)))
+    query_tuples = [query for _, query, _ in queries]
+
+    scan_paths = dll_paths
+    if prefilter:
+        started = time.time()
+        scan_paths = prefilter_dlls(dll_paths, [(q[0], q[1], q[4]) for q in query_tuples])
+        if len(scan_paths) < len(dll_paths):
+            print("Prefilter: skipped {n} of {t} DLLs no query can match ({s:.2f}s)".format(
+                n=len(dll_paths) - len(scan_paths), t=len(dll_paths), s=time.time() - started))
+
+    logs = []
+    writers = []
+    totals = [[0, 0] for _ in queries]
+    try:
+        for name, query, output_format in queries:
+            log_path = "{b}_{n}{e}".format(b=base, n=name, e=WRITERS[output_format].extension)
+            f = open(log_path, "w", encoding="utf-8", newline="" if output_format == 'csv' else None)
+            logs.append((log_path, f))
+            writers.append(get_writer(output_format, f))
+            writers[-1].begin(target_dir, query[0], query[1])
+
+        for path, result in map_dlls(batch_task, scan_paths, backend, jobs, "Analyzing", (query_tuples,),
+                                     recycle=recycle):
+            version, per_query, errors = result if result else ("Unknown", [()] * len(queries), [])
+            dll = label(path)
+            for error in errors:
+                print("\n[!] {dll}: {e} (results may be incomplete)".format(dll=dll, e=error))
+            for writer, total, matches in zip(writers, totals, per_query):
+                if matches:
+                    total[0] += 1
+                    total[1] += len(matches)
+                    writer.file(dll, version)
+                for match in matches:
+                    writer.type_match(dll, version, match)
+
+        for writer, total in zip(writers, totals):
+            writer.end(total[0])
+    finally:
+        for _, f in logs:
+            f.close()
+
+    width = max([20] + [len(name) for name, _, _ in queries])
+    lines = ["{n:<{w}} {f:>6} {t:>7}  {l}".format(n="QUERY", w=width, f="FILES", t="TYPES", l="LOG")]
+    for (name, _, _), (log_path, _), total in zip(queries, logs, totals):
+        lines.append("{n:<{w}} {f:>6} {t:>7}  {l}".format(n=name, w=width, f=total[0], t=total[1],
+                                                          l=os.path.basename(log_path)))
+    index_path = base + ".txt"
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write("REPORT: {d}\nBATCH: {b} ({n} quer{y}, {s} of {t} DLLs scanned)\n".format(
+            d=target_dir, b=batch_name, n=len(queries), y="y" if len(queries) == 1 else "ies",
+            s=len(scan_paths), t=len(dll_paths)))
+        f.write("=" * 60 + "\n\n")
+        f.write("\n".join(lines) + "\n\nQUERIES:\n")
+        for name, query, output_format in queries:
+            f.write("  {n}: {q}\n".format(n=name, q=describe_batch_query(query, output_format)))
+    print("\n\n" + "\n".join(lines))
+    return index_path
+
+
+# ============================================================
+# WORKSPACE
+# ============================================================
+
+class Workspace:
+    # DLLs under several roots; identical files (same size and SHA-256) are inspected once
+
+    def __init__(self, roots, scan_all):
+        self.roots = roots
+        self.files = []
+        self.labels = {}
+        self.missing = []
+        seen = set()
+        for name, root, recursive in roots:
+            if not os.path.isdir(root):
+                self.missing.append((name, root))
+                continue
+            for folder, dirs, files in os.walk(root) if recursive else [(root, [], os.listdir(root))]:
+                dirs.sort()
+                for dll in sorted(select_dlls(files, scan_all)):
+                    path = os.path.join(folder, dll)
+                    if index_key(path) in seen:
+                        continue
+                    seen.add(index_key(path))
+                    self.files.append(path)
+                    self.labels[path] = name + "/" + os.path.relpath(path, root).replace(os.sep, "/")
+
+        # Only files whose size occurs more than once can be copies, so only those are hashed
+        sizes = dict((path, os.path.getsize(path)) for path in self.files)
+        same_size = {}
+        for size in sizes.values():
+            same_size[size] = same_size.get(size, 0) + 1
+        by_content = {}
+        for path in self.files:
+            key = (sizes[path], file_hash(path)) if same_size[sizes[path]] > 1 else path
+            by_content.setdefault(key, []).append(path)
+        self.copies = dict((paths[0], paths) for paths in by_content.values())
+        self.dll_paths = list(self.copies)
+        self.conflicts = self._conflicts()
+
+    def _conflicts(self):
+        # Assembly name -> [(version, path)] for distinct files that claim the same assembly
+        by_name = {}
+        for path in self.dll_paths:
+            try:
+                reader = MetadataReader(path)
+            except (OSError, MetadataError):
+                continue
+            try:
+                by_name.setdefault(reader.assembly_name.lower(), []).append((reader.version, path))
+            except (MetadataError, IndexError, struct.error):
+                pass
+            finally:
+                reader.close()
+        return dict((name, found) for name, found in sorted(by_name.items()) if len(found) > 1)
+
+    def label(self, path):
+        return self.labels.get(path, os.path.basename(path))
+
+    def describe(self):
+        return "Workspace: {n} DLL(s) under {r} root(s), {u} distinct, {c} identical cop{y} skipped".format(
+            n=len(self.files), r=len(self.roots) - len(self.missing), u=len(self.dll_paths),
+            c=len(self.files) - len(self.dll_paths), y="y" if len(self.files) - len(self.dll_paths) == 1 else "ies")
+
+    def conflict_lines(self):
+        lines = []
+        for name, found in self.conflicts.items():
+            versions = set(version for version, _ in found)
+            lines.append("  {n}: {k}".format(
+                n=os.path.splitext(os.path.basename(found[0][1]))[0],
+                k="{v} versions".format(v=len(versions)) if len(versions) > 1 else "same version, different builds"))
+            for version, path in found:
+                others = len(self.copies[path]) - 1
+                lines.append("    v{v:<16} {p}{o}".format(
+                    v=version, p=self.label(path), o="  (+{n} identical)".format(n=others) if others else ""))
+        return lines
+
+    def summary(self):
+        lines = ["WORKSPACE", "=" * 60, self.describe()]
+        for name, root, recursive in self.roots:
+            state = " (missing)" if (name, root) in self.missing else " (recursive)" if recursive else ""
+            lines.append("  {n:<12} {p}{s}".format(n=name, p=root, s=state))
+
+        copied = [(path, paths) for path, paths in self.copies.items() if len(paths) > 1]
+        if copied:
+            lines += ["", "IDENTICAL COPIES (inspected once, at the first path):"]
+            for path, paths in copied:
+                lines.append("  " + os.path.basename(path))
+                lines += ["    " + self.label(p) for p in paths]
+        if self.conflicts:
+            lines += ["", "VERSION CONFLICTS (same assembly name, different content):"] + self.conflict_lines()
+        return lines
+
+
+# ============================================================
+# RESULT CACHE
+# ============================================================
+
+CACHE_MANIFEST = "cache.json"
+
+
+def result_cache_key(target_dir, dll_paths, settings):
+    # Normalized query flags + (name, size, mtime) of every selected DLL; any rebuilt DLL misses
+    digest = hashlib.sha256()
+    digest.update(json.dumps([VERSION, index_key(target_dir), sorted(settings.items())]).encode('utf-8'))
+    for path in sorted(dll_paths, key=lambda p: os.path.basename(p).lower()):
+        try:
+            st = os.stat(path)
+            stamp = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stamp = None
+        digest.update(json.dumps([os.path.basename(path).lower(), stamp]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    # Maps a result_cache_key to the log it produced; the manifest lives in LogDir/cache.json
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, CACHE_MANIFEST)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1)
+
+    def lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        path = os.path.join(self.log_dir, entry['file'])
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        # A later run in the same second may have overwritten the log under the same name
+        if st is None or st.st_size != entry['size'] or st.st_mtime_ns != entry['mtime']:
+            del self.entries[key]
+            self.save()
+            return None
+        entry['used'] = time.time()
+        self.save()
+        return path
+
+    def store(self, key, log_path):
+        st = os.stat(log_path)
+        name = os.path.basename(log_path)
+        for old in [k for k, e in self.entries.items() if e['file'] == name]:
+            del self.entries[old]
+        self.entries[key] = {'file': name, 'size': st.st_size, 'mtime': st.st_mtime_ns, 'used': time.time()}
+        self.save()
+
+    def evict(self, max_mb, max_files, max_days):
+        # LRU over the logs recorded in the manifest: last cache hit, else modification time.
+        # Anything else in LogDir (watch and usage reports, snapshots, the member index,
+        # the daemon files, files the user put there) is never touched.
+        files = []
+        missing = set()
+        for entry in self.entries.values():
+            name = entry['file']
+            try:
+                st = os.stat(os.path.join(self.log_dir, name))
+            except OSError:
+                missing.add(name)
+                continue
+            files.append((max(entry['used'], st.st_mtime), st.st_size, name))
+        files.sort(reverse=True)
+
+        now = time.time()
+        total = 0
+        removed = set(missing)
+        for position, (last, size, name) in enumerate(files):
+            total += size
+            if ((max_files and position >= max_files) or (max_mb and total > max_mb * 1048576)
+                    or (max_days and now - last > max_days * 86400)):
+                try:
+                    os.remove(os.path.join(self.log_dir, name))
+                    removed.add(name)
+                except OSError:
+                    pass
+        if removed:
+            self.entries = dict((k, e) for k, e in self.entries.items() if e['file'] not in removed)
+            self.save()
+        return len(removed - missing)
+
+
+# ============================================================
+# CLEAR
+# ============================================================
+
+def do_clear():
+    log_dir_full = os.path.join(script_dir, cfg['log_dir'])
+    if not os.path.exists(log_dir_full):
+        print("[--clear] Log directory does not exist: {d}".format(d=log_dir_full))
+        return
+    count = 0
+    for fname in os.listdir(log_dir_full):
+        fpath = os.path.join(log_dir_full, fname)
+        if os.path.isfile(fpath):
+            os.remove(fpath)
+            count += 1
+    # Optionally remove the directory itself if empty
+    try:
+        os.rmdir(log_dir_full)
+        print("[--clear] Removed {c} file(s) and deleted directory: {d}".format(c=count, d=log_dir_full))
+    except OSError:
+        print("[--clear] Removed {c} file(s) from: {d}".format(c=count, d=log_dir_full))
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main():
+    global cfg
+    cfg = load_config()
+
+    args = sys.argv[1:]
+    joined = " ".join(args)
+
+    # --- HELP VARIANTS ---
+    if "--help:rules:pb" in args:
+        print(HELP_RULES_PB)
+        return
+
+    if "--help:rules:plugin" in args:
+        print(HELP_RULES_PLUGIN)
+        return
+
+    if "--help:rules:mod" in args:
+        print(HELP_RULES_MOD)
+        return
+
+    if "--help:extend" in args:
+        print(HELP_EXTENDED)
+        return
+
+    if "-h" in args or "--help" in args:
+        print(HELP_SHORT)
+        return
+
+    # --- CLEAR ---
+    if "--clear" in args:
+        do_clear()
+        return
+
+    # --- DAEMON CONTROL ---
+    if "--serve:stop" in args:
+        stop_daemon(os.path.join(script_dir, cfg['log_dir']))
+        return
+
+    # --- PARSE STANDARD FLAGS ---
+    ext_mode   = "-e" in args
+    deep_mode  = "-d" in args
+    exact_mode = "-x" in args
+    scan_all   = "-a" in args
+    deps_mode  = any(flag in args for flag in ("--deps", "--deps:dot", "--deps:json", "--deps-of", "--rdeps"))
+    use_default = "-y" in args
+    open_vscode = "-o" in args
+    use_index  = "--no-index" not in args
+    verbose    = "-v" in args
+    serve_mode = "--serve" in args
+    repl_mode  = "--repl" in args
+    watch_mode = "--watch" in args
+    workspace_mode = "-w" in args
+    export_mode = "--export-snapshot" in args
+    declared_mode = "--declared" in args
+    with_ext   = "--with-ext" in args
+    profile_mode = any(flag in args for flag in ("--profile", "--profile:json", "--profile:cprofile"))
+
+    search_term  = get_arg_value(args, "-s")
+    member_filter = get_arg_value(args, "-f")
+    backend_name = get_arg_value(args, "--backend") or DEFAULT_BACKEND
+    jobs_value   = get_arg_value(args, "-j") if "-j" in args else "1"
+    output_format = get_arg_value(args, "--format") or "text"
+    uses_term    = get_arg_value(args, "--uses")
+    hierarchy_flag = next((flag for flag in HIERARCHY_QUERIES if flag in args), None)
+    hierarchy_term = get_arg_value(args, hierarchy_flag) if hierarchy_flag else None
+    fuzzy_term   = get_arg_value(args, "--fuzzy")
+    attr_flag    = "--attr:args" if "--attr:args" in args else "--attr" if "--attr" in args else None
+    attr_term    = get_arg_value(args, attr_flag) if attr_flag else None
+    snapshot_path = get_arg_value(args, "--snapshot")
+    batch_path   = get_arg_value(args, "--batch")
+
+    print("--- .NET DLL Inspector v{v} ---".format(v=VERSION))
+
+    try:
+        compile_query(search_term, exact_mode, members=False)
+        compile_query(member_filter, exact_mode, members=True)
+    except QueryError as e:
+        print("Invalid query: {e}".format(e=e))
+        return
+
+    if backend_name not in BACKENDS:
+        print("Unknown backend: {b} (choose from: {c})".format(b=backend_name, c=", ".join(BACKENDS)))
+        return
+    if backend_name == 'clr' and not HAS_CLR:
+        print("pythonnet is not available, use --backend meta")
+        return
+
+    index_flag = next((flag for flag in ("--uses", "--fuzzy", "--attr", "--attr:args", "--with-ext")
+                       + tuple(HIERARCHY_QUERIES)
+                       if flag in args), None)
+    if index_flag and not use_index:
+        print("{f} is answered from the member index and cannot be combined with --no-index".format(f=index_flag))
+        return
+    if "--fuzzy" in args and not fuzzy_term:
+        print("Usage: --fuzzy <Name> [N]")
+        return
+    if hierarchy_flag and not hierarchy_term:
+        print("Usage: {f} <TypeName>".format(f=hierarchy_flag))
+        return
+    if attr_flag and (not attr_term or attr_term.startswith('-')):
+        print("Usage: {f} <AttributeName> (e.g. MySessionComponentDescriptor)".format(f=attr_flag))
+        return
+    if attr_flag and (uses_term or declared_mode):
+        print("{f} cannot be combined with --uses or --declared".format(f=attr_flag))
+        return
+    if with_ext and (uses_term or attr_flag or hierarchy_flag or fuzzy_term):
+        print("--with-ext adds extension methods to -s / -f results and cannot be combined with "
+              "--uses, --attr, --fuzzy or the hierarchy queries")
+        return
+
+    if workspace_mode and (serve_mode or repl_mode or watch_mode or deps_mode or "--diff" in args):
+        print("-w scans the [WORKSPACE] roots and cannot be combined with --serve, --repl, --watch, --deps or --diff")
+        return
+
+    if "--snapshot" in args:
+        if not snapshot_path or not is_snapshot(snapshot_path):
+            print("Usage: --snapshot <file.snap> (a file written by --export-snapshot)")
+            return
+        if (serve_mode or repl_mode or watch_mode or deps_mode or uses_term or attr_flag or hierarchy_flag
+                or fuzzy_term or with_ext or workspace_mode or export_mode or "--diff" in args):
+            print("--snapshot answers -s / -f queries only and cannot be combined with the index, "
+                  "daemon, watch, workspace, dependency or diff modes")
+            return
+
+    if output_format not in WRITERS:
+        print("Unknown format: {f} (choose from: {c})".format(f=output_format, c=", ".join(WRITERS)))
+        return
+
+    if declared_mode and output_format != 'text':
+        print("--declared writes base types and back-references into the text log; drop --format")
+        return
+
+    batch_queries = None
+    if "--batch" in args:
+        if not batch_path or not os.path.isfile(batch_path):
+            print("Usage: --batch <queries.txt> (one \"name = -s ... -f ...\" per line)")
+            return
+        if (search_term or member_filter or serve_mode or repl_mode or watch_mode or deps_mode or uses_term
+                or attr_flag or hierarchy_flag or fuzzy_term or export_mode or snapshot_path or profile_mode
+                or declared_mode or with_ext or "--diff" in args):
+            print("--batch takes its -s / -f queries from the file and cannot be combined with -s, -f, "
+                  "--snapshot, --profile, --declared, --with-ext or the index, daemon, watch, export, dependency "
+                  "or diff modes")
+            return
+        try:
+            batch_queries = read_batch_file(batch_path, output_format)
+        except (QueryError, OSError) as e:
+            print("Invalid batch file: {e}".format(e=e))
+            return
+        if not batch_queries:
+            print("No queries in {f}".format(f=batch_path))
+            return
+
+    try:
+        jobs = int(jobs_value) if jobs_value is not None else 0
+    except ValueError:
+        print("Invalid -j value: {v}".format(v=jobs_value))
+        return
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    recycle = None
+    isolate_value = get_arg_value(args, "--isolate")
+    mem_limit_value = get_arg_value(args, "--mem-limit")
+    if "--isolate" in args or "--mem-limit" in args:
+        try:
+            mem_limit = int(mem_limit_value) if "--mem-limit" in args else 0
+        except (TypeError, ValueError):
+            print("Invalid --mem-limit value (megabytes): {v}".format(v=mem_limit_value))
+            return
+        batch = int(isolate_value) if isolate_value and isolate_value.isdigit() and int(isolate_value) > 0 else 25
+        recycle = (batch, mem_limit * 1024 * 1024)
+
+    # Print active param summary
+    print_active_params(args, cfg, search_term, member_filter)
+
+    # --- SAVED QUERIES / WATCH ---
+    if "--save-query" in args:
+        save_name = get_arg_value(args, "--save-query")
+        if not save_name or save_name.startswith('-') or not (search_term or member_filter):
+            print("Usage: -s <query> [-f <query>] ... --save-query <name>")
+            return
+        print("Saved query \"{n}\": {q}".format(n=save_name.lower(), q=save_query(save_name, args)))
+
+    if watch_mode:
+        watch_value = get_arg_value(args, "--watch")
+        try:
+            watch_interval = float(watch_value) if watch_value and watch_value[0].isdigit() else 2.0
+        except ValueError:
+            print("Invalid --watch interval (seconds): {v}".format(v=watch_value))
+            return
+        watch_queries = []
+        for name, text in saved_queries():
+            try:
+                watch_queries.append(parse_saved_query(name, text))
+            except (QueryError, ValueError) as e:
+                print("Skipping saved query \"{n}\": {e}".format(n=name, e=e))
+        if (search_term or member_filter) and "--save-query" not in args:
+            watch_queries.append(("current", (search_term, member_filter, ext_mode, deep_mode, exact_mode),
+                                  output_format))
+        if not watch_queries:
+            print("Nothing to watch: pass -s / -f, or save queries first with --save-query <name>")
+            return
+
+    # --- DIFF ---
+    if "--diff" in args:
+        pos = args.index("--diff")
+        if len(args[pos + 1:pos + 3]) < 2:
+            print("Usage: --diff <old_dir | old.snap | old.jsonl> <new_dir>")
+            return
+        old_source, new_dir = args[pos + 1], args[pos + 2]
+        if not os.path.exists(old_source) or not os.path.isdir(new_dir):
+            print("Invalid --diff paths: {o} {n}".format(o=old_source, n=new_dir))
+            return
+        log_dir_full = os.path.join(script_dir, cfg['log_dir'])
+        if not os.path.exists(log_dir_full):
+            os.makedirs(log_dir_full)
+        log_path = get_timestamp_log_path(log_dir_full, "Diff_" + (search_term or "All"), member_filter)
+        query = (search_term, member_filter, ext_mode, deep_mode, exact_mode)
+        run_diff(os.path.abspath(old_source), os.path.abspath(new_dir), backend_name, jobs, scan_all, query, log_path,
+                 recycle)
+        return
+
+    workspace = None
+    snapshot = None
+    if snapshot_path:
+        try:
+            snapshot = SnapshotBackend(snapshot_path)
+        except ValueError as e:
+            print("[--snapshot] {e}".format(e=e))
+            return
+        target_dir = os.path.abspath(snapshot_path)
+    elif workspace_mode:
+        roots = workspace_roots()
+        if not roots:
+            print("No workspace roots: add a [WORKSPACE] section to {c} (name = path, path/** = recursive)".format(
+                c=os.path.basename(config_file)))
+            return
+        started = time.time()
+        workspace = Workspace(roots, scan_all)
+        for name, root in workspace.missing:
+            print("[!] Workspace root {n} does not exist: {p}".format(n=name, p=root))
+        print("{w} ({t:.2f}s)".format(w=workspace.describe(), t=time.time() - started))
+        if workspace.conflicts:
+            print("Version conflicts:\n" + "\n".join(workspace.conflict_lines()))
+        target_dir = "workspace " + ", ".join(name for name, _, _ in roots)
+    else:
+        target_dir = os.path.abspath(cfg['path']) if use_default else input("Path: ").strip()
+
+        if not os.path.isdir(target_dir):
+            print("Invalid directory.")
+            return
+
+    log_dir_full = os.path.join(script_dir, cfg['log_dir'])
+    if not os.path.exists(log_dir_full):
+        os.makedirs(log_dir_full)
+
+    result_cache = ResultCache(log_dir_full)
+    evicted = result_cache.evict(cfg['cache_max_mb'], cfg['cache_max_files'], cfg['cache_max_days'])
+    if evicted:
+        print("Log cleanup: removed {n} least recently used file(s) (CacheMaxMB/Files/Days)".format(n=evicted))
+
+    if snapshot:
+        # The snapshot's DLL names stand in for paths
+        all_dlls = snapshot.dlls
+        dll_files = dll_paths = select_dlls(all_dlls, scan_all)
+    elif workspace:
+        # Absolute paths: joining them to target_dir (as the index refresh does) keeps them unchanged
+        all_dlls = [os.path.basename(path) for path in workspace.files]
+        dll_files = dll_paths = workspace.dll_paths
+    else:
+        all_dlls = select_dlls(os.listdir(target_dir), True)
+        dll_files = select_dlls(all_dlls, scan_all)
+        dll_paths = [os.path.join(target_dir, dll) for dll in dll_files]
+    dll_label = workspace.label if workspace else str if snapshot else os.path.basename
+
+    query = (search_term, member_filter, ext_mode, deep_mode, exact_mode)
+    results = None
+
+    # --- REUSE A CACHED RESULT ---
+    cache_key = None
+    if not (serve_mode or repl_mode or watch_mode or deps_mode or uses_term or attr_flag or hierarchy_flag
+            or fuzzy_term or profile_mode or export_mode or batch_queries or "--reindex" in args):
+        fingerprinted = [target_dir] if snapshot else workspace.files if workspace else dll_paths
+        cache_key = result_cache_key(target_dir, fingerprinted, {
+            'search': search_term,
+            'filter': member_filter,
+            'properties': ext_mode or deep_mode,
+            'fields': deep_mode,
+            'exact': exact_mode and bool(search_term or member_filter),
+            'declared': declared_mode,
+            'extensions': with_ext,
+            'all': scan_all,
+            'format': output_format,
+            'backend': backend_name,
+        })
+        cached = None if "--no-cache" in args else result_cache.lookup(cache_key)
+        if cached:
+            print("\nSame query, unchanged DLLs - cached result: {f} (--no-cache to rescan)".format(
+                f=os.path.basename(cached)))
+            if open_vscode:
+                open_log(cached)
+            return
+
+    # --- FORWARD TO A RUNNING DAEMON ---
+    if not (serve_mode or repl_mode or watch_mode or deps_mode or uses_term or attr_flag or hierarchy_flag
+            or fuzzy_term or profile_mode or export_mode or batch_queries or declared_mode or with_ext
+            or "--reindex" in args or not use_index or workspace or snapshot):
+        results = query_daemon(log_dir_full, {
+            'target_dir': target_dir,
+            'scan_all': scan_all,
+            'backend': get_arg_value(args, "--backend"),
+            'query': query,
+        })
+        if results is not None:
+            print("Answered by the running daemon (--serve).")
+
+    if snapshot:
+        backend = snapshot
+        task_args = query + (profile_mode, declared_mode)
+        results = ((dll, result) for dll, result in map_dlls(inspect_task, dll_paths, snapshot, 1, "Analyzing",
+                                                             task_args))
+
+    if results is None:
+        detected = detect_keywords_from_directory(all_dlls)
+        print('Found Keywords: "{kw}"'.format(kw=",".join(detected)))
+
+        if deps_mode:
+            started = time.time()
+            graph = DependencyGraph(target_dir, dll_files)
+            print_dependencies(graph, get_arg_value(args, "--deps-of"), get_arg_value(args, "--rdeps"))
+            for flag, ext in (("--deps:dot", ".dot"), ("--deps:json", ".json")):
+                if flag in args:
+                    export_path = get_timestamp_log_path(log_dir_full, "Deps", None, ext)
+                    with open(export_path, "w", encoding="utf-8") as f:
+                        f.write(graph.to_dot() if ext == ".dot" else graph.to_json())
+                    print("\nGraph saved: {f}".format(f=os.path.basename(export_path)))
+            if verbose:
+                print("Dependencies read in {t:.3f}s".format(t=time.time() - started))
+            if profile_mode:
+                print_read_profile(graph, get_profile_top(args))
+            return
+
+        try:
+            backend = get_backend(backend_name)
+        except Exception as e:
+            if get_arg_value(args, "--backend"):
+                print("Cannot start the {b} backend: {e}".format(b=backend_name, e=e))
+                return
+            print("pythonnet failed to start ({e}), using --backend meta".format(e=e))
+            backend_name = 'meta'
+            backend = get_backend(backend_name)
+
+        # A -s / -f search only inspects (and indexes) the DLLs whose #Strings heap can match
+        search_only = not (serve_mode or repl_mode or watch_mode or export_mode or batch_queries or uses_term
+                           or attr_flag or hierarchy_flag or fuzzy_term)
+        scan_paths = dll_paths
+        if search_only and "--no-prefilter" not in args:
+            started = time.time()
+            # With --with-ext, -f may match only extension methods declared in another DLL
+            scan_paths = prefilter_dlls(dll_paths, [(search_term, None if with_ext else member_filter, exact_mode)])
+            if len(scan_paths) < len(dll_paths):
+                print("Prefilter: skipped {n} of {t} DLLs with no matching name ({s:.2f}s)".format(
+                    n=len(dll_paths) - len(scan_paths), t=len(dll_paths), s=time.time() - started))
+
+        # --profile times the assemblies themselves, not index lookups, unless the query needs the index
+        if use_index and not (profile_mode and not index_flag):
+            member_index = MemberIndex(os.path.join(log_dir_full, cfg['index_file']))
+            started = time.time()
+            # --with-ext looks extension methods up in every scanned DLL and --declared walks base
+            # types into DLLs the prefilter skipped, so for both all of them are indexed
+            index_files = dll_files
+            if search_only and not (with_ext or declared_mode) and len(scan_paths) < len(dll_paths):
+                candidates = set(scan_paths)
+                index_files = [dll for dll, path in zip(dll_files, dll_paths) if path in candidates]
+            member_index.refresh(target_dir, index_files, backend, reindex="--reindex" in args, jobs=jobs,
+                                 recycle=recycle)
+            print("Index: {h} cached, {m} re-inspected ({t:.2f}s)".format(
+                h=member_index.hits, m=member_index.misses, t=time.time() - started))
+            live_name = backend.name
+            backend = IndexBackend(member_index)
+        else:
+            live_name = backend.name
+
+        if export_mode:
+            export_path = get_arg_value(args, "--export-snapshot")
+            if not export_path or export_path.startswith('-'):
+                export_path = get_timestamp_log_path(log_dir_full, "Snapshot", None, ".snap")
+            started = time.time()
+            n_dlls, n_types, n_members = export_snapshot(export_path, dll_paths, backend, jobs, recycle, dll_label)
+            print("Snapshot saved: {f} ({d} DLL(s), {t} types, {m} members, {kb:.0f} KB, {s:.2f}s)".format(
+                f=export_path, d=n_dlls, t=n_types, m=n_members, kb=os.path.getsize(export_path) / 1024.0,
+                s=time.time() - started))
+            return
+
+        if serve_mode or repl_mode or watch_mode:
+            memory = load_memory(dll_paths, backend)
+            if serve_mode:
+                serve(memory, dll_paths, log_dir_full, target_dir, scan_all, live_name)
+            elif repl_mode:
+                repl(memory, dll_paths, live_name)
+            else:
+                watch(memory, watch_queries, target_dir, scan_all, live_name, log_dir_full, watch_interval)
+            return
+
+        if batch_queries:
+            started = time.time()
+            index_path = run_batch(batch_queries, dll_paths, backend, jobs, recycle, dll_label, target_dir,
+                                   log_dir_full, os.path.splitext(os.path.basename(batch_path))[0],
+                                   "--no-prefilter" not in args)
+            print("\n{n} quer{y} answered in one pass ({t:.2f}s)".format(
+                n=len(batch_queries), y="y" if len(batch_queries) == 1 else "ies", t=time.time() - started))
+            print("Index saved: {f}".format(f=os.path.basename(index_path)))
+            if open_vscode:
+                open_log(index_path)
+            return
+
+        if fuzzy_term:
+            log_path = get_timestamp_log_path(log_dir_full, "Fuzzy_" + fuzzy_term, None)
+            write_fuzzy(member_index, fuzzy_term, dll_paths, compile_query(search_term, exact_mode, members=False),
+                        get_fuzzy_top(args), target_dir, log_path)
+            print("Results saved: {f}".format(f=os.path.basename(log_path)))
+            return
+
+        if hierarchy_flag:
+            log_path = get_timestamp_log_path(
+                log_dir_full, hierarchy_flag.strip('-').capitalize() + "_" + hierarchy_term, None)
+            total = write_hierarchy(member_index, hierarchy_flag, hierarchy_term, dll_paths,
+                                    compile_query(search_term, exact_mode, members=False), target_dir, log_path)
+            print("\n{n} type(s) found.".format(n=total))
+            print("Results saved: {f}".format(f=os.path.basename(log_path)))
+            return
+
+        if uses_term:
+            results = member_index.uses(uses_term, dll_paths,
+                                        compile_query(search_term, exact_mode, members=False),
+                                        compile_query(member_filter, exact_mode, members=True))
+        elif attr_term:
+            results = member_index.attributed(attr_term, dll_paths,
+                                              compile_query(search_term, exact_mode, members=False),
+                                              compile_query(member_filter, exact_mode, members=True),
+                                              ('F', 'M', 'P') if deep_mode else ('M', 'P') if ext_mode else ('M',),
+                                              member_filter is not None, attr_flag == "--attr:args")
+        else:
+            task_args = query + (profile_mode, declared_mode)
+            results = map_dlls(inspect_task, scan_paths, backend, jobs, "Analyzing", task_args, recycle=recycle)
+            if with_ext:
+                results = member_index.with_extensions(results, dll_paths,
+                                                       compile_query(search_term, exact_mode, members=False),
+                                                       compile_query(member_filter, exact_mode, members=True))
+            results = ((dll_label(path), result) for path, result in results)
+
+    log_name = "Uses_" + uses_term if uses_term else "Attr_" + attr_term if attr_term else search_term
+    log_path = get_timestamp_log_path(log_dir_full, log_name, member_filter, WRITERS[output_format].extension)
+
+    total_matches = 0
+    scan_started = time.time()
+    profiles = [] if profile_mode else None
+    profiler = None
+    if "--profile:cprofile" in args:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    with open(log_path, "w", encoding="utf-8", newline="" if output_format == 'csv' else None) as f:
+        writer = get_writer(output_format, f)
+        writer.begin(target_dir, search_term, member_filter)
+
+        for dll, result in results:
+            version, matches = result[:2] if result else ("Unknown", ())
+
+            if profiles is not None:
+                stats = result[2] if result and len(result) > 2 else DllProfile(dll)
+                if result is None:
+                    stats.errors.append("WorkerCrash: worker process died")
+                profiles.append(stats)
+                scan_before = stats.scan
+                started = time.perf_counter()
+                offset = f.tell()
+
+            matched = False
+            for match in matches:
+                if not matched:
+                    matched = True
+                    total_matches += 1
+                    writer.file(dll, version)
+                writer.type_match(dll, version, match)
+                if profiles is not None:
+                    stats.matched += 1
+                    stats.members += len(match.members)
+
+            if profiles is not None:
+                # A lazy stream scans while it is written; that share is already in stats.scan
+                stats.write = time.perf_counter() - started - (stats.scan - scan_before)
+                stats.bytes = f.tell() - offset
+
+        writer.end(total_matches)
+        if workspace and output_format == 'text':
+            f.write("\n" + "\n".join(workspace.summary()) + "\n")
+
+    if profiler is not None:
+        profiler.disable()
+
+    if workspace and output_format != 'text':
+        with open(os.path.splitext(log_path)[0] + ".workspace.txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(workspace.summary()) + "\n")
+
+    if total_matches == 0:
+        print("\n\n[!] No results found. (Log: {f})".format(f=os.path.basename(log_path)))
+    else:
+        print("\n\nDONE! {n} file(s) matched.".format(n=total_matches))
+        print("Results saved: {f}".format(f=os.path.basename(log_path)))
+
+    if cache_key:
+        result_cache.store(cache_key, log_path)
+
+    if verbose:
+        print("Scan: {t:.2f}s".format(t=time.time() - scan_started))
+        print("Type name cache: {s}".format(s=TYPE_NAME_STATS.describe()))
+        print("Member record cache: {s}".format(s=MEMBER_CACHE_STATS.describe()))
+        if jobs > 1 or recycle is not None:
+            print("(cache statistics cover this process only, not the worker processes)")
+        if recycle is not None:
+            print("Worker pools started: {p}, peak worker RSS: {w:.0f} MB, this process: {m:.0f} MB".format(
+                p=WORKER_STATS['pools'], w=WORKER_STATS['peak_rss'] / 1048576.0, m=process_rss() / 1048576.0))
+
+    if profiles is not None:
+        print_profile(profiles, get_profile_top(args))
+        log_base = os.path.splitext(log_path)[0]
+        if "--profile:json" in args:
+            save_profile(profiles, log_base + ".profile.json", backend.name, time.time() - scan_started)
+            print("Profile saved: {f}".format(f=os.path.basename(log_base + ".profile.json")))
+        if profiler is not None:
+            profiler.dump_stats(log_base + ".prof")
+            print("cProfile stats saved: {f} (python -m pstats {f})".format(f=os.path.basename(log_base + ".prof")))
+
+    if open_vscode:
+        open_log(log_path)
 
 
 if __name__ == "__main__":
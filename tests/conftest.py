@@ -0,0 +1,53 @@
+# tests/conftest.py
+# Shared fixtures: the synthetic corpus from benchmark.py and a way to run the CLI against it
+# with its own config file and LogDir, so nothing is written next to the script.
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import benchmark  # noqa: E402
+
+dc = benchmark.dc
+
+CORPUS = {'dlls': 4, 'types': 20, 'members': 12, 'depth': 4, 'seed': 7}
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(tmp_path_factory):
+    directory = os.path.join(str(tmp_path_factory.mktemp("corpus")), "dlls")
+    benchmark.generate_corpus(directory, CORPUS)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def corpus(corpus_dir):
+    return benchmark.list_corpus(corpus_dir)
+
+
+@pytest.fixture
+def run_cli(tmp_path, monkeypatch, capsys, corpus_dir):
+    # run_cli("-s", "Entity", ...) -> (console output, text of the log it saved or None);
+    # -y scans the corpus unless path= names another folder
+    config_path = tmp_path / "config_check.ini"
+    log_dir = tmp_path / "logs"
+    monkeypatch.setattr(dc, "config_file", str(config_path))
+
+    def run(*args, path=None):
+        config_path.write_text("[SETTINGS]\nDefaultPath = {p}\nLogDir = {l}\n".format(
+            p=path or corpus_dir, l=log_dir))
+        monkeypatch.setattr(sys, "argv", ["dll-check2.py", "-y", "-a", "--backend", "meta", "--no-cache"] + list(args))
+        capsys.readouterr()
+        dc.main()
+        out = capsys.readouterr().out
+        saved = re.findall(r'(?:Results saved|Log): (\S+?)\)?$', out, re.MULTILINE)
+        log = None
+        if saved:
+            with open(os.path.join(str(log_dir), os.path.basename(saved[-1])), encoding="utf-8") as f:
+                log = f.read()
+        return out, log
+
+    run.log_dir = str(log_dir)
+    return run
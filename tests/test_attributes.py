@@ -0,0 +1,93 @@
+# tests/test_attributes.py
+# Custom attributes and [Extension] methods, decoded from the CustomAttribute table of the
+# benchmark corpus (benchmark.CorpusAssembly._attributes puts them there).
+import os
+import re
+
+import pytest
+
+import benchmark
+
+dc = benchmark.dc
+
+
+@pytest.fixture(scope="module")
+def lib01(corpus):
+    path = [p for p in corpus if os.path.basename(p) == "Bench.Lib01.dll"][0]
+    reader = dc.MetadataReader(path)
+    decoder = dc.AttributeDecoder(reader)
+    found = decoder.read()
+    reader.close()
+    return found, decoder.extensions
+
+
+@pytest.mark.parametrize("owner,member,attribute,args", [
+    # string and bool, a null string
+    ("Entity0", None, "System.ObsoleteAttribute", '"Use Entity1", true'),
+    ("Entity3", None, "System.ObsoleteAttribute", 'null, false'),
+    # enum defined in another assembly: taken to be int
+    ("IMarker0", None, "System.ComponentModel.EditorBrowsableAttribute", "(EditorBrowsableState)1"),
+    # named property argument
+    ("Data2", None, "System.Diagnostics.DebuggerDisplayAttribute", '"{Value}", Name = "Data2"'),
+    # System.Type
+    ("Box0`1", None, "System.Diagnostics.DebuggerTypeProxyAttribute", "typeof(Bench.Lib01.Ns0.Entity0)"),
+    # string array on a method, enum on a property
+    ("Box1`1", (('M', 'Get', False, ()), 0), "System.Diagnostics.CodeAnalysis.MemberNotNullAttribute",
+     'new[] {"Value", "Current"}'),
+    ("Box1`1", (('P', 'Current', False, None), 0), "System.Diagnostics.DebuggerBrowsableAttribute",
+     "(DebuggerBrowsableState)0"),
+])
+def test_attribute_arguments(lib01, owner, member, attribute, args):
+    found, _ = lib01
+    decoded = [row[4] for row in found if row[1:4] == (owner, member, attribute)]
+    assert decoded == [args]
+
+
+def test_every_attribute_decodes(lib01):
+    found, _ = lib01
+    assert found and all(row[4] is not None for row in found)
+
+
+def test_extension_methods(lib01, corpus):
+    found, extensions = lib01
+    marked = [row[:3] for row in found if row[3] == dc.EXTENSION_ATTRIBUTE]
+    assert marked and [row[:3] for row in extensions] == marked
+
+    # The `this` parameter decides what is extended
+    targets = dict(((row[1], row[2][0][1]), row[3]) for row in extensions)
+    backend = dc.get_backend('meta')
+    path = [p for p in corpus if os.path.basename(p) == "Bench.Lib01.dll"][0]
+    _, matches = dc.inspect_dll(path, backend=backend, declared=True)
+    checked = 0
+    for m in matches:
+        for rec in m.members:
+            target = targets.get((m.info.name, rec.name))
+            if target is None:
+                continue
+            first = rec.params[0][0].rstrip('&')
+            if first.endswith('[]'):
+                assert target == ['System.Array']
+            elif first == 'U':
+                assert target == ['System.Object']
+            else:
+                name = target[0].rsplit('.', 1)[-1]
+                assert dc.TYPE_ALIASES.get(name, name) == first
+            checked += 1
+    assert checked == len(targets)
+
+
+def test_attr_query(run_cli, lib01):
+    found, _ = lib01
+    obsolete = sorted(row[1] for row in found if row[3] == "System.ObsoleteAttribute")
+    _, log = run_cli("--attr:args", "Obsolete")
+    section = log.split("FILE: Bench.Lib01.dll")[1].split("FILE:")[0]
+    assert sorted(re.findall(r'-> Class: (\S+)', section)) == obsolete
+    assert '[@] Obsolete("Use Entity1", true)' in section
+
+
+def test_with_ext_lists_extensions_under_the_extended_type(run_cli, lib01):
+    _, extensions = lib01
+    declared_in, member, targets = [(row[1], row[2][0][1], row[3]) for row in extensions
+                                    if row[3][0] == "Bench.Lib01.Ns0.Entity3"][0]
+    _, log = run_cli("-s", "Bench.Lib01.Ns0.Entity3", "-x", "--with-ext")
+    assert re.search(r'\[X\].*\b{m}\(.*{t}'.format(m=member, t=re.escape(declared_in)), log)
@@ -0,0 +1,26 @@
+# tests/test_cache.py
+import os
+import time
+
+import benchmark
+
+dc = benchmark.dc
+
+
+def test_evict_only_removes_logs_recorded_in_the_manifest(tmp_path):
+    log_dir = str(tmp_path)
+    cache = dc.ResultCache(log_dir)
+    old = time.time() - 90 * 86400
+    for name in ("Watch_report.txt", "Uses_Foo.txt", "mine.snap", "a_cached.txt", "b_cached.txt"):
+        path = os.path.join(log_dir, name)
+        with open(path, "w") as f:
+            f.write("x" * 100)
+        os.utime(path, (old, old))
+        if name.endswith("_cached.txt"):
+            cache.store(name, path)
+            cache.entries[name]['used'] = old
+    cache.entries["gone"] = dict(cache.entries["b_cached.txt"], file="deleted_by_hand.txt")
+
+    assert cache.evict(0, 0, 30) == 2
+    assert sorted(os.listdir(log_dir)) == ["Uses_Foo.txt", "Watch_report.txt", dc.CACHE_MANIFEST, "mine.snap"]
+    assert dc.ResultCache(log_dir).entries == {}
@@ -0,0 +1,35 @@
+# tests/test_daemon.py
+import os
+import threading
+import time
+
+import benchmark
+
+dc = benchmark.dc
+
+
+def test_bad_request_gets_an_error_reply_and_the_daemon_keeps_serving(tmp_path, corpus_dir, corpus):
+    log_dir = str(tmp_path)
+    memory = dc.load_memory(corpus, dc.get_backend("meta"))
+    daemon = threading.Thread(target=dc.serve, args=(memory, corpus, log_dir, corpus_dir, False, "meta"))
+    daemon.start()
+    deadline = time.time() + 10
+    while not os.path.exists(os.path.join(log_dir, "serve.sock")) and time.time() < deadline:
+        time.sleep(0.05)
+    try:
+        request = {'target_dir': corpus_dir, 'scan_all': False, 'backend': None}
+        for bad in ("not a dict", dict(request), dict(request, query=("Entity", "kind:event", False, False, False))):
+            conn = dc.connect_daemon(log_dir)
+            with conn:
+                conn.send(bad)
+                reply = conn.recv()
+            assert reply[0] == 'error'
+
+        results = dc.query_daemon(log_dir, dict(request, query=("Entity4", "Get", False, False, False)))
+        answered = dict(results)
+        assert sorted(answered) == sorted(os.path.basename(p) for p in corpus)
+        assert any(matches for version, matches in answered.values())
+    finally:
+        dc.stop_daemon(log_dir)
+        daemon.join(10)
+    assert not daemon.is_alive()
@@ -0,0 +1,105 @@
+# tests/test_diff.py
+# --diff between the corpus and a later "build" of it: Lib02 rebuilt, Lib03 (which inherits from it)
+# removed, a Lib04 added
+import os
+import re
+import shutil
+
+import pytest
+
+import benchmark
+from conftest import CORPUS
+
+dc = benchmark.dc
+
+
+@pytest.fixture(scope="module")
+def builds(corpus_dir, tmp_path_factory):
+    root = tmp_path_factory.mktemp("diff")
+    other = str(root / "other")
+    benchmark.generate_corpus(other, dict(CORPUS, dlls=5, seed=CORPUS['seed'] + 1))
+    new = str(root / "new")
+    os.makedirs(new)
+    for name in ("Bench.Lib00.dll", "Bench.Lib01.dll"):
+        shutil.copy2(os.path.join(corpus_dir, name), new)
+    for name in ("Bench.Lib02.dll", "Bench.Lib04.dll"):
+        shutil.copy2(os.path.join(other, name), new)
+    return corpus_dir, new
+
+
+def sections(log):
+    # {DLL title: report lines}, the summary line
+    parts = re.split(r'^DLL: (.*)\n-+\n', log, flags=re.MULTILINE)
+    found = dict((title, body.strip().split("\n")) for title, body in zip(parts[1::2], parts[2::2]))
+    summary = found[parts[-2]].pop().strip() if len(parts) > 1 else None
+    return found, summary
+
+
+def member_lines(path):
+    # {type name: set of member lines as the report prints them}
+    _, matches = dc.inspect_dll(path, deep_mode=True, backend=dc.get_backend('meta'))
+    return dict((m.info.name, set(dc.format_member(rec).strip() for rec in m.members)) for m in matches)
+
+
+def public_types(directory, dll):
+    backend = dc.get_backend('meta')
+    return len(backend.public_types(backend.load(os.path.join(directory, dll))))
+
+
+def test_diff_report(run_cli, builds):
+    old, new = builds
+    _, log = run_cli("-d", "--diff", old, new)
+    found, summary = sections(log)
+    assert summary == "2 unchanged DLL(s) skipped (same content hash), 3 DLL(s) with API changes."
+    assert sorted(found) == ["Bench.Lib02.dll (v1.0.0.0 -> v1.0.0.0)", "Bench.Lib03.dll (removed, v1.0.0.0)",
+                             "Bench.Lib04.dll (added, v1.0.0.0)"]
+
+    lines = found["Bench.Lib03.dll (removed, v1.0.0.0)"]
+    assert len([line for line in lines if line.startswith("  REMOVED ")]) == public_types(old, "Bench.Lib03.dll")
+
+    added = member_lines(os.path.join(new, "Bench.Lib04.dll"))
+    counts = re.findall(r'^  ADDED   .*?(\S+?)(?: : \S+)? \((\d+) members\)$',
+                        "\n".join(found["Bench.Lib04.dll (added, v1.0.0.0)"]), re.MULTILINE)
+    assert len(counts) == public_types(new, "Bench.Lib04.dll")
+    assert all(int(n) == len(added.get(name, ())) for name, n in counts)
+
+    # Every + / - / ~ line of the rebuilt DLL is a member only the new / old build has
+    before = member_lines(os.path.join(old, "Bench.Lib02.dll"))
+    after = member_lines(os.path.join(new, "Bench.Lib02.dll"))
+    current = None
+    checked = 0
+    for line in found["Bench.Lib02.dll (v1.0.0.0 -> v1.0.0.0)"]:
+        header = re.match(r'  (ADDED|REMOVED|CHANGED) \w+: (\S+)', line)
+        if header:
+            current = header.group(2)
+            assert (current in before, current in after) == {'ADDED': (False, True), 'REMOVED': (True, False),
+                                                              'CHANGED': (True, True)}[header.group(1)]
+            continue
+        change = re.match(r'    (\+|-|~ was:|~ now:) (.*)$', line)
+        if change is None:
+            continue
+        sig = change.group(2)
+        in_new = change.group(1) in ('+', '~ now:')
+        assert sig in (after if in_new else before)[current]
+        assert sig not in (before if in_new else after)[current]
+        checked += 1
+    assert checked
+
+
+def test_diff_against_a_snapshot_or_jsonl_log(run_cli, builds, tmp_path):
+    old, new = builds
+    _, from_dirs = run_cli("-d", "--diff", old, new)
+    snap = str(tmp_path / "old.snap")
+    run_cli("--export-snapshot", snap, path=old)
+    _, from_snapshot = run_cli("-d", "--diff", snap, new)
+    assert sections(from_snapshot) == sections(from_dirs)
+
+    out, jsonl = run_cli("-d", "--format", "jsonl", path=old)
+    saved = re.findall(r'Results saved: (\S+)', out)[-1]
+    found, summary = sections(run_cli("-d", "--diff", os.path.join(run_cli.log_dir, saved), new)[1])
+    # A jsonl log has no hashes: the two unchanged DLLs are read again, and show no changes.
+    # It has no types without members either (the corpus's marker interfaces), so those are not compared
+    without_empty = dict((title, [line for line in lines if "IMarker" not in line])
+                         for title, lines in sections(from_dirs)[0].items())
+    assert found == without_empty
+    assert summary == "0 unchanged DLL(s) skipped (same content hash), 3 DLL(s) with API changes."
@@ -0,0 +1,84 @@
+# tests/test_index.py
+# The member index re-reads a DLL only when its size/mtime changed and its MVID did too.
+import os
+import shutil
+
+import pytest
+
+import benchmark
+
+dc = benchmark.dc
+
+
+@pytest.fixture
+def indexed(corpus, tmp_path):
+    # A copy of the corpus (the tests rewrite DLLs) and a fresh index over it
+    directory = str(tmp_path / "dlls")
+    os.makedirs(directory)
+    for path in corpus:
+        shutil.copy2(path, directory)
+    index = dc.MemberIndex(str(tmp_path / "index.sqlite"))
+    dlls = sorted(os.listdir(directory))
+
+    def refresh(**kwargs):
+        # A new backend each time, as each run is a new process: a reader keeps its DLL mapped
+        index.hits = index.misses = 0
+        index.refresh(directory, dlls, dc.get_backend('meta'), **kwargs)
+        return index.hits, index.misses
+
+    refresh.index = index
+    refresh.path = lambda name: os.path.join(directory, name)
+    yield refresh
+    index.close()
+
+
+def type_names(index, path):
+    return sorted(index.db.execute("SELECT name FROM types WHERE dll_id = ?", (index.dll_row(path)[0],)))
+
+
+def test_unchanged_dlls_are_not_read_again(indexed):
+    assert indexed() == (0, 4)
+    assert indexed() == (4, 0)
+    assert indexed(reindex=True) == (0, 4)
+
+
+def test_new_mtime_or_size_with_the_same_mvid_keeps_the_rows(indexed):
+    indexed()
+    path = indexed.path("Bench.Lib01.dll")
+    row = indexed.index.dll_row(path)
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5 * 10 ** 9))
+    assert indexed() == (4, 0)
+    with open(path, 'ab') as f:
+        f.write(b'\0' * 512)
+    assert indexed() == (4, 0)
+
+    assert indexed.index.dll_row(path) == row
+    size, mtime = indexed.index.db.execute("SELECT size, mtime_ns FROM dlls WHERE id = ?", (row[0],)).fetchone()
+    assert (size, mtime) == (os.path.getsize(path), os.stat(path).st_mtime_ns)
+
+
+def test_a_rebuilt_dll_is_read_again(indexed, tmp_path):
+    indexed()
+    path = indexed.path("Bench.Lib01.dll")
+    old_row, old_types = indexed.index.dll_row(path), type_names(indexed.index, path)
+
+    rebuilt = str(tmp_path / "rebuilt")
+    benchmark.generate_corpus(rebuilt, dict(benchmark.DEFAULT_CORPUS, dlls=2, types=7, seed=99))
+    shutil.copy(os.path.join(rebuilt, "Bench.Lib01.dll"), path)
+    assert indexed() == (3, 1)
+
+    row = indexed.index.dll_row(path)
+    assert row[2] != old_row[2]
+    assert row[2] == dc.read_mvid(path)
+    assert len(type_names(indexed.index, path)) == 7 != len(old_types)
+
+
+def test_removed_dlls_leave_the_index(indexed):
+    indexed()
+    path = indexed.path("Bench.Lib02.dll")
+    os.remove(path)
+    indexed.index.refresh(os.path.dirname(path), [], dc.get_backend('meta'))
+    assert indexed.index.dll_row(path) is None
+    assert indexed.index.db.execute("SELECT COUNT(*) FROM dlls").fetchone()[0] == 3
@@ -0,0 +1,28 @@
+# tests/test_metadata.py
+import os
+
+import benchmark
+from conftest import CORPUS
+
+dc = benchmark.dc
+
+
+def test_unknown_tables_after_the_known_ones_are_ignored(tmp_path, monkeypatch):
+    # The same assembly twice, the second with rows in a table 0x2D this reader has no schema for
+    spec = dict(CORPUS, dlls=1)
+    plain = str(tmp_path / "plain.dll")
+    benchmark.CorpusAssembly(0, spec, None).build(plain, 0x5F000000)
+    with monkeypatch.context() as patch:
+        patch.setitem(dc.TABLE_SCHEMAS, 0x2D, ('4', 'S'))
+        future = benchmark.CorpusAssembly(0, spec, None)
+        future.mb.add(0x2D, 1, future.mb.string("Later"))
+        future.build(str(tmp_path / "future.dll"), 0x5F000000)
+    assert 0x2D not in dc.TABLE_SCHEMAS
+
+    backend = dc.get_backend('meta')
+    reports = []
+    for name in ("plain.dll", "future.dll"):
+        version, matches = dc.inspect_dll(os.path.join(str(tmp_path), name), deep_mode=True, backend=backend)
+        reports.append((version, [(m.info, list(m.members)) for m in matches]))
+    assert reports[0][1] and reports[1] == reports[0]
+    assert dc.read_mvid(str(tmp_path / "future.dll")) == dc.read_mvid(plain)
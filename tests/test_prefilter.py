@@ -0,0 +1,77 @@
+# tests/test_prefilter.py
+# The #Strings prefilter only narrows the DLLs a -s / -f search inspects: every report must
+# be the one a --no-prefilter run writes.
+import os
+
+import pytest
+
+import benchmark
+
+dc = benchmark.dc
+
+
+def test_declared_walks_bases_in_skipped_dlls(run_cli):
+    # Entity4 derives from a class in Lib02, whose names do not match the search
+    out, prefiltered = run_cli("-s", "Lib03.Ns1.Entity4", "-f", "Get", "--declared")
+    assert "Prefilter: skipped" in out
+    assert "inherits 10 member(s) from Bench.Lib02.Ns2.Entity5" in prefiltered
+    _, full = run_cli("-s", "Lib03.Ns1.Entity4", "-f", "Get", "--declared", "--no-prefilter")
+    assert prefiltered == full
+
+
+def test_declared_without_base_credits_nothing_to_object(corpus_dir, tmp_path):
+    # Only Lib03 indexed: Entity4's base cannot be read, which must not make its members System.Object's
+    index = dc.MemberIndex(str(tmp_path / "index.sqlite"))
+    index.refresh(corpus_dir, ["Bench.Lib03.dll"], dc.get_backend('meta'))
+    _, matches = dc.inspect_dll(os.path.join(corpus_dir, "Bench.Lib03.dll"), "Lib03.Ns1.Entity4", "Get",
+                                backend=dc.IndexBackend(index), declared=True)
+    match = [m for m in matches if m.info.name == "Entity4"][0]
+    index.close()
+    assert match.members and match.inherited == 0 and match.base is None
+
+
+PREFILTER_QUERIES = [
+    ("Lib02", None, False),
+    ("Lib01.Ns0.Entity*", None, False),
+    ("Entity AND NOT Lib00", None, False),
+    ("Lib0[12]", None, False),
+    ("/Lib0[23]\\./", None, False),
+    ("Bench.Lib03.Ns1.Entity4", None, True),
+    ("Box0`1", None, True),
+    ("Lib01", "Get", False),
+    (None, "RemovePower", False),
+    (None, "Zebra", False),
+    ("Lib03", "ConvertValue2", False),  # only declared by a base class in Lib02
+    (None, "ToString", False),
+    ("Entity", "Compute* AND NOT kind:field", False),
+    ("Lib03", "returns:int", False),
+    (None, "Nothing OR Load*", False),
+]
+
+
+@pytest.mark.parametrize("query", PREFILTER_QUERIES, ids=lambda q: " ".join(filter(None, q[:2])))
+def test_skipped_dlls_have_no_matches(corpus, query):
+    search_term, member_filter, exact_mode = query
+    kept = dc.prefilter_dlls(corpus, [query])
+    backend = dc.get_backend('meta')
+    for path in corpus:
+        _, matches = dc.inspect_dll(path, search_term, member_filter, deep_mode=True, exact_mode=exact_mode,
+                                    backend=backend)
+        if list(matches):
+            assert path in kept
+
+
+def test_prefilter_skips_dlls(corpus):
+    # ...and is not just keeping everything
+    kept = [dc.prefilter_dlls(corpus, [q]) for q in PREFILTER_QUERIES]
+    assert sum(len(k) < len(corpus) for k in kept) >= 4
+    # Several queries (--batch) keep a DLL that any one of them keeps
+    assert dc.prefilter_dlls(corpus, PREFILTER_QUERIES[:2]) == [p for p in corpus if p in kept[0] or p in kept[1]]
+
+
+@pytest.mark.parametrize("args", [("-s", "Lib02"), ("-s", "Lib01", "-f", "Get", "-d"), ("-s", "Lib03", "-f", "returns:int", "-e")])
+def test_report_equals_no_prefilter(run_cli, args):
+    out, prefiltered = run_cli(*args)
+    assert "Prefilter: skipped" in out
+    _, full = run_cli(*(args + ("--no-prefilter",)))
+    assert prefiltered == full
@@ -0,0 +1,41 @@
+# tests/test_profile.py
+# --profile times the DLLs themselves and reports the errors a scan or an index refresh swallows.
+import os
+import shutil
+
+import benchmark
+
+dc = benchmark.dc
+
+
+def broken_corpus(corpus, directory):
+    # The corpus with Lib03's metadata signature overwritten
+    os.makedirs(directory)
+    for path in corpus:
+        shutil.copy(path, directory)
+    path = os.path.join(directory, "Bench.Lib03.dll")
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    start = data.find(b'BSJB')
+    data[start:start + 4] = b'XXXX'
+    with open(path, 'wb') as f:
+        f.write(data)
+    return directory
+
+
+def test_profile_reads_the_dlls_and_lists_errors(run_cli, corpus, tmp_path):
+    broken = broken_corpus(corpus, str(tmp_path / "broken"))
+    out, _ = run_cli("-s", "Entity", "-f", "Get", "--profile", path=broken)
+    assert "Index:" not in out
+    assert "Bench.Lib03.dll: MetadataError: bad metadata signature" in out.split("SWALLOWED ERRORS")[1]
+
+
+def test_index_keeps_extraction_errors(corpus, tmp_path):
+    broken = broken_corpus(corpus, str(tmp_path / "broken"))
+    index = dc.MemberIndex(str(tmp_path / "index.sqlite"))
+    index.refresh(broken, sorted(os.listdir(broken)), dc.get_backend('meta'))
+    backend = dc.IndexBackend(index)
+    errors = {name: backend.load_errors(backend.load(os.path.join(broken, name))) for name in os.listdir(broken)}
+    index.close()
+    assert errors.pop("Bench.Lib03.dll") == ["MetadataError: bad metadata signature"]
+    assert not any(errors.values())
@@ -0,0 +1,103 @@
+# tests/test_query.py
+# The -s / -f query engine, checked against a small synthetic corpus from benchmark.py:
+# every filter must select exactly the member records a plain Python predicate selects.
+import re
+
+import pytest
+
+import benchmark
+
+dc = benchmark.dc
+
+
+def word(name):
+    rx = re.compile(r'\b' + re.escape(name) + r'\b', re.IGNORECASE)
+    return lambda text: rx.search(text) is not None
+
+
+@pytest.fixture(scope="module")
+def records(corpus):
+    # Every (type, member) of the corpus, deep mode
+    found = []
+    backend = dc.get_backend('meta')
+    for path in corpus:
+        _, matches = dc.inspect_dll(path, deep_mode=True, backend=backend)
+        found.extend((type_key(m.info), rec) for m in matches for rec in m.members)
+    return found
+
+
+def type_key(info):
+    return "{ns}.{n}".format(ns=info.namespace, n=info.name)
+
+
+def run_filter(corpus, member_filter, search_term=None):
+    backend = dc.get_backend('meta')
+    found = []
+    for path in corpus:
+        _, matches = dc.inspect_dll(path, search_term, member_filter, deep_mode=True, backend=backend)
+        found.extend((type_key(m.info), rec) for m in matches for rec in m.members)
+    return found
+
+
+MEMBER_FILTERS = [
+    ("Get", lambda r: 'get' in r.name.lower()),
+    ("returns:int", lambda r: word('int')(r.type_name)),
+    ("type:string", lambda r: word('string')(r.type_name)),
+    ("param:string", lambda r: any(word('string')(t) for t, _ in r.params or ())),
+    ("kind:method", lambda r: r.kind == 'M'),
+    ("kind:field", lambda r: r.kind == 'F'),
+    ("kind:property", lambda r: r.kind == 'P'),
+    ("arity:0", lambda r: r.params is not None and len(r.params) == 0),
+    ("arity:2", lambda r: r.params is not None and len(r.params) == 2),
+    ("static", lambda r: r.is_static),
+    ("instance", lambda r: not r.is_static),
+    ("is:static", lambda r: r.is_static),
+    ("returns:int AND arity:1", lambda r: word('int')(r.type_name) and r.params is not None and len(r.params) == 1),
+    ("kind:field static", lambda r: r.kind == 'F' and r.is_static),
+    ("kind:field OR kind:property", lambda r: r.kind in ('F', 'P')),
+    ("NOT kind:method", lambda r: r.kind != 'M'),
+    ("kind:method AND NOT returns:Void", lambda r: r.kind == 'M' and not word('Void')(r.type_name)),
+    ("(kind:field OR kind:property) AND NOT static",
+     lambda r: r.kind in ('F', 'P') and not r.is_static),
+]
+
+
+@pytest.mark.parametrize("member_filter,expected", MEMBER_FILTERS, ids=[f for f, _ in MEMBER_FILTERS])
+def test_member_filter(corpus, records, member_filter, expected):
+    want = [(t, r) for t, r in records if expected(r)]
+    assert want and len(want) < len(records), "filter does not discriminate in this corpus"
+    assert run_filter(corpus, member_filter) == want
+
+
+def test_returns_matches_whole_words(records):
+    query = dc.compile_query("returns:int", members=True)
+    assert not query.match_member(dc.MemberRecord('M', 'Next', False, 'uint', ()))
+    assert query.match_member(dc.MemberRecord('M', 'All', False, 'List<int>', ()))
+
+
+def test_type_search(corpus, records):
+    # The glob is anchored (full or bare name), the plain word is a substring: NOT Entity1 also drops Entity10..
+    want = [(t, r) for t, r in records if t.rsplit('.', 1)[-1].startswith('Entity') and 'entity1' not in t.lower()]
+    assert want
+    assert run_filter(corpus, None, "Entity* AND NOT Entity1") == want
+
+
+def test_words_are_anded(corpus, records):
+    # -s "Lib01 Entity" is two terms, not the text "Lib01 Entity" (no type name has a space)
+    want = [(t, r) for t, r in records if 'lib01' in t.lower() and 'entity' in t.lower()]
+    assert want
+    assert run_filter(corpus, None, "Lib01 Entity") == run_filter(corpus, None, "Lib01 AND Entity") == want
+
+
+@pytest.mark.parametrize("text,members", [
+    ("kind:event", True),
+    ("arity:two", True),
+    ("returns:", True),
+    ("shape:round", True),
+    ("(Get", True),
+    ("Get OR", True),
+    ("returns:int", False),
+])
+def test_invalid_queries(text, members):
+    with pytest.raises(dc.QueryError):
+        dc.Query(text, members=members)
@@ -0,0 +1,61 @@
+# tests/test_snapshot.py
+# --export-snapshot writes the API of the DLLs; --snapshot must answer from it exactly as the
+# DLLs do, and refuse a file it cannot trust instead of reading garbage.
+import os
+
+import pytest
+
+import benchmark
+
+dc = benchmark.dc
+
+
+@pytest.fixture
+def snapshot(run_cli, tmp_path):
+    path = str(tmp_path / "api.snap")
+    out, _ = run_cli("--export-snapshot", path)
+    assert "Snapshot saved: " + path in out
+    return path
+
+
+def body(log):
+    # Everything below the REPORT: <source> line
+    return log.split("\n", 1)[1]
+
+
+@pytest.mark.parametrize("args", [("-s", "Entity", "-f", "Get", "-d"), ("-s", "Data1", "-x", "-d"),
+                                  ("-f", "returns:int AND arity:1", "-e")])
+def test_snapshot_answers_like_the_dlls(run_cli, snapshot, args):
+    _, from_dlls = run_cli(*args)
+    _, from_snapshot = run_cli(*(args + ("--snapshot", snapshot)))
+    assert body(from_snapshot) == body(from_dlls)
+
+
+def test_snapshot_keeps_every_dll(snapshot, corpus):
+    backend = dc.SnapshotBackend(snapshot)
+    assert sorted(backend.dlls) == sorted(os.path.basename(p) for p in corpus)
+    for path in corpus:
+        assert backend.mvid(backend.load(os.path.basename(path))) == dc.read_mvid(path)
+
+
+def rewrite(path, edit):
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    data = edit(data)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize("edit,message", [
+    (lambda data: b"DLLSNAP0" + data[8:], "is a format 0 snapshot, this version reads format 1"),
+    (lambda data: data[:-4], "corrupt or truncated snapshot"),
+    (lambda data: data + b"\0" * 16, "corrupt or truncated snapshot"),
+    (lambda data: data[:20], "not a dll-check snapshot"),
+])
+def test_corrupt_or_old_snapshots_are_refused(run_cli, snapshot, edit, message):
+    rewrite(snapshot, edit)
+    with pytest.raises(ValueError, match=message):
+        dc.SnapshotBackend(snapshot)
+    out, log = run_cli("-s", "Entity", "--snapshot", snapshot)
+    assert message in out
+    assert log is None